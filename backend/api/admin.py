@@ -0,0 +1,111 @@
+from django.contrib import admin
+from django.http import FileResponse, Http404
+from django.shortcuts import get_object_or_404
+from django.urls import path, reverse
+from django.utils import timezone
+from django.utils.html import format_html, format_html_join
+
+from foodgram.db.estimates import EstimatedCountPaginator
+from recipes.admin_filters import UserInputFilter
+from .models import Job, RequestProfile
+from .profiling import get_profile_path
+
+
+@admin.register(RequestProfile)
+class RequestProfileAdmin(admin.ModelAdmin):
+    list_display = (
+        'created_at', 'method', 'path', 'status_code', 'mode',
+        'duration_ms', 'queries', 'user',
+    )
+    list_select_related = ('user',)
+    list_filter = ('mode', 'method', UserInputFilter)
+    search_fields = ('^path',)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    fields = (
+        'created_at', 'user', 'method', 'path', 'status_code', 'mode',
+        'duration_ms', 'queries', 'samples', 'peak_memory',
+        'get_downloads', 'get_report',
+    )
+    readonly_fields = fields
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def get_urls(self):
+        return [
+            path(
+                '<int:pk>/download/<str:name>/',
+                self.admin_site.admin_view(self.download_view),
+                name='api_requestprofile_download',
+            ),
+        ] + super().get_urls()
+
+    def download_view(self, request, pk, name):
+        if not self.has_view_permission(request):
+            raise Http404
+        profile = get_object_or_404(RequestProfile, pk=pk)
+        # Отдаём только файлы этого профиля, а не любой путь из URL
+        if name not in profile.get_files():
+            raise Http404
+        try:
+            return FileResponse(
+                get_profile_path(name).open('rb'),
+                as_attachment=True, filename=name,
+            )
+        except FileNotFoundError:
+            raise Http404
+
+    @admin.display(description='Файлы')
+    def get_downloads(self, obj):
+        return format_html_join(
+            ' ', '<a href="{}">{}</a>',
+            (
+                (
+                    reverse(
+                        'admin:api_requestprofile_download',
+                        args=(obj.pk, name),
+                    ),
+                    name,
+                )
+                for name in obj.get_files()
+            ),
+        )
+
+    @admin.display(description='Отчёт')
+    def get_report(self, obj):
+        try:
+            report = get_profile_path(obj.report_file).read_text()
+        except FileNotFoundError:
+            return 'Файл отчёта удалён'
+        return format_html('<pre style="white-space: pre">{}</pre>', report)
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = (
+        'created_at', 'name', 'status', 'attempts', 'run_at',
+        'wait_ms', 'duration_ms', 'worker',
+    )
+    list_filter = ('status', 'name')
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    readonly_fields = [field.name for field in Job._meta.fields]
+    actions = ('retry',)
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    @admin.action(description='Запустить заново')
+    def retry(self, request, queryset):
+        count = queryset.exclude(status=Job.RUNNING).update(
+            status=Job.QUEUED, run_at=timezone.now(), attempts=0,
+            finished_at=None, error='',
+        )
+        self.message_user(request, f'Поставлено в очередь: {count}')
@@ -0,0 +1,401 @@
+"""
+Асинхронные представления для чтения рецептов, тегов и ингредиентов.
+
+Подключаются только при запуске под ASGI (см. foodgram/urls_asgi.py):
+GET-запросы обслуживаются через асинхронный ORM, поэтому один процесс
+держит много медленных клиентов и ожиданий БД одновременно. Остальные
+методы передаются синхронным вьюсетам DRF без изменений.
+
+Рецепты читаются так же, как в RecipeViewSet: с реплики, если
+пользователь не закреплён за основной базой (ReplicaReadMixin), с
+ETag/Last-Modified и ответом 304 (ConditionalGetMixin), анонимным — из
+кэша ответов (AnonymousResponseCacheMixin) с теми же ключами, и с
+частичными представлениями (?fields=). Синхронные функции api.mixins и
+api.cache вызываются через sync_to_async.
+"""
+from functools import wraps
+from math import ceil
+
+from asgiref.sync import async_to_sync, sync_to_async
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.http import Http404, HttpResponse
+from django.utils.cache import patch_vary_headers
+from django_filters.utils import translate_validation
+from rest_framework import exceptions
+from rest_framework.renderers import BrowsableAPIRenderer
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+from api.cache import get_or_build_response
+from api.fast_serializers import (
+    DOCUMENT_RECIPE_FIELDS, author_rows, build_documents, get_recipe_fields,
+    get_recipes_fieldset, ingredient_rows, needs_subscriptions,
+    render_recipes, stored_document_rows, subscribed_rows, tag_rows
+)
+from api.filters import IngredientFilter, RecipeFilter
+from api.fragments import get_fragments, set_fragments
+from api.mixins import (
+    get_anonymous_response_key, get_anonymous_validators,
+    get_recipes_validators, is_not_modified, set_validators
+)
+from api.paginators import RecipePagination
+from foodgram.db.estimates import count_with_estimate
+from foodgram.db.routers import is_pinned, use_replica
+from api.views import IngredientViewSet, RecipeViewSet, TagViewSet
+from recipes.models import Ingredient, Recipe, Tag
+
+
+def negotiate(request):
+    """
+    Выбирает рендерер по Accept и ?format=, как APIView, и запоминает
+    его в request.accepted_renderer. Если подходящего нет, ответ об
+    ошибке рендерится первым рендерером, как у DRF.
+    """
+    renderers = [
+        renderer_class()
+        for renderer_class in api_settings.DEFAULT_RENDERER_CLASSES
+    ]
+    negotiator = api_settings.DEFAULT_CONTENT_NEGOTIATION_CLASS()
+    request.accepted_renderer = renderers[0]
+    request.accepted_renderer, _ = negotiator.select_renderer(
+        Request(request), renderers
+    )
+    return request.accepted_renderer
+
+
+def render(request, data, status=200):
+    """Рендерит ответ рендерером, выбранным negotiate."""
+    renderer = request.accepted_renderer
+    content_type = renderer.media_type
+    if renderer.charset:
+        content_type = f'{content_type}; charset={renderer.charset}'
+    return HttpResponse(
+        renderer.render(data), content_type=content_type, status=status
+    )
+
+
+def get_format(request):
+    """Формат рендерера для ETag, как request.accepted_renderer.format."""
+    return request.accepted_renderer.format
+
+
+def render_exception(request, exc):
+    """Ответ на исключение DRF, как у его обработчика по умолчанию."""
+    if isinstance(exc.detail, (list, dict)):
+        data = exc.detail
+    else:
+        data = {'detail': exc.detail}
+    response = render(request, data, status=exc.status_code)
+    if isinstance(exc, (exceptions.NotAuthenticated,
+                        exceptions.AuthenticationFailed)):
+        response['WWW-Authenticate'] = 'Token'
+    return response
+
+
+def async_read_view(sync_view):
+    """
+    Оборачивает асинхронную вьюху чтения: GET обрабатывается асинхронно,
+    остальные методы уходят в синхронный `sync_view`. Исключения DRF
+    превращаются в такие же ответы, как у обработчика DRF. Browsable API
+    рендерит страницу по самому вьюсету, поэтому GET с этим рендерером
+    тоже уходит в `sync_view`.
+    """
+    sync_view = sync_to_async(sync_view)
+
+    def decorator(view):
+        @wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            if request.method != 'GET':
+                return await sync_view(request, *args, **kwargs)
+            try:
+                if isinstance(negotiate(request), BrowsableAPIRenderer):
+                    return await sync_view(request, *args, **kwargs)
+                response = await view(request, *args, **kwargs)
+            except Http404 as error:
+                response = render_exception(
+                    request, exceptions.NotFound(*error.args)
+                )
+            except exceptions.APIException as error:
+                response = render_exception(request, error)
+            # Как APIView.finalize_response при согласовании формата
+            patch_vary_headers(response, ('Accept',))
+            return response
+        # csrf_exempt в Django 4.2 не умеет оборачивать корутины
+        wrapper.csrf_exempt = True
+        return wrapper
+    return decorator
+
+
+async def authenticate(request):
+    """Аутентификация теми же классами, что настроены для DRF."""
+    for authentication_class in api_settings.DEFAULT_AUTHENTICATION_CLASSES:
+        result = await sync_to_async(
+            authentication_class().authenticate
+        )(request)
+        if result is not None:
+            return result[0]
+    return AnonymousUser()
+
+
+async def aget_object_or_404(queryset, **kwargs):
+    """Асинхронный get_object_or_404 с тем же текстом ошибки."""
+    try:
+        return await queryset.aget(**kwargs)
+    except queryset.model.DoesNotExist:
+        raise Http404(
+            f'No {queryset.model._meta.object_name} matches the given query.'
+        )
+
+
+async def paginate(queryset, request):
+    """Асинхронный аналог RecipePagination (page/limit)."""
+    paginator = RecipePagination()
+    page_size = paginator.get_page_size(Request(request))
+    count, estimated = await sync_to_async(count_with_estimate)(queryset)
+    num_pages = max(1, ceil(count / page_size))
+    page_number = request.GET.get(paginator.page_query_param) or 1
+    if page_number in paginator.last_page_strings:
+        page_number = num_pages
+    try:
+        number = int(page_number)
+    except (TypeError, ValueError):
+        number = 0
+    # Оценка может быть занижена, поэтому дальние страницы не ошибка
+    if number < 1 or number > num_pages and not estimated:
+        raise exceptions.NotFound(paginator.invalid_page_message.format(
+            page_number=page_number, message='Invalid page.'
+        ))
+    offset = (number - 1) * page_size
+    page = [recipe async for recipe in queryset[offset:offset + page_size]]
+
+    url = request.build_absolute_uri()
+    next_url = previous_url = None
+    if number < num_pages:
+        next_url = replace_query_param(
+            url, paginator.page_query_param, number + 1
+        )
+    if number > 1:
+        previous_url = (
+            remove_query_param(url, paginator.page_query_param)
+            if number == 2
+            else replace_query_param(
+                url, paginator.page_query_param, number - 1
+            )
+        )
+    links = {'count': count, 'next': next_url, 'previous': previous_url}
+    if estimated:
+        links = {'count': count, 'count_is_approximate': True, **links}
+    return page, links
+
+
+async def serialize_recipes(recipes, request, user, fieldset):
+    """Собирает рецепты в том же виде, что RecipeReadSerializer."""
+    documents, versions = await sync_to_async(get_fragments)(
+        [recipe.id for recipe in recipes]
+    )
+    missing = [recipe for recipe in recipes if recipe.id not in documents]
+    if missing:
+        loaded = {
+            recipe_id: document
+            async for recipe_id, document in stored_document_rows(
+                [recipe.id for recipe in missing]
+            )
+        }
+        missing = [recipe for recipe in missing if recipe.id not in loaded]
+        if any(recipe.get_deferred_fields() for recipe in missing):
+            rows = [
+                row async for row in Recipe.objects.filter(
+                    pk__in=[recipe.id for recipe in missing]
+                ).values_list(*DOCUMENT_RECIPE_FIELDS)
+            ]
+        else:
+            rows = [get_recipe_fields(recipe) for recipe in missing]
+        if rows:
+            recipe_ids = [row[0] for row in rows]
+            loaded.update(build_documents(
+                rows,
+                [row async for row in tag_rows(recipe_ids)],
+                [row async for row in ingredient_rows(recipe_ids)],
+                [row async for row in author_rows({row[1] for row in rows})],
+            ))
+        await sync_to_async(set_fragments)(loaded, versions)
+        documents.update(loaded)
+    subscribed_ids = set()
+    if user.is_authenticated and needs_subscriptions(fieldset):
+        subscribed_ids = {
+            author_id
+            async for author_id in subscribed_rows(
+                user, {recipe.author_id for recipe in recipes}
+            )
+        }
+    return render_recipes(
+        recipes, documents, request, subscribed_ids, fieldset
+    )
+
+
+async def use_replica_for(user):
+    """
+    Как ReplicaReadMixin: чтение с реплики, если пользователь не закреплён
+    за основной базой. Возвращает токен для use_replica.reset или None.
+    """
+    if await sync_to_async(is_pinned)(user):
+        return None
+    return use_replica.set(True)
+
+
+async def anonymous_response(request, queryset, build, check_modified=True):
+    """
+    Ответ анонимному пользователю, как у ConditionalGetMixin и
+    AnonymousResponseCacheMixin: данные `build()` с ETag из `queryset`.
+    С кэшем ответов валидаторы хранятся в его записи и при попадании
+    база не читается. Ошибки `build` не кэшируются.
+    """
+    async def build_entry():
+        etag, last_modified = await sync_to_async(get_anonymous_validators)(
+            request, queryset, get_format(request)
+        )
+        return await build(), etag, last_modified
+
+    if settings.RECIPE_RESPONSE_CACHE['ENABLED']:
+        data, etag, last_modified = await sync_to_async(
+            get_or_build_response
+        )(get_anonymous_response_key(request), async_to_sync(build_entry))
+    else:
+        data = None
+        etag, last_modified = await sync_to_async(get_anonymous_validators)(
+            request, queryset, get_format(request)
+        )
+    if is_not_modified(
+        request, etag, last_modified if check_modified else None
+    ):
+        response = HttpResponse(status=304)
+    else:
+        response = render(request, await build() if data is None else data)
+    return set_validators(response, etag, last_modified)
+
+
+async def user_response(request, recipes, build, *extra):
+    """Ответ пользователю с рецептами `recipes`: 304 по ETag или `build()`."""
+    etag, last_modified = await sync_to_async(get_recipes_validators)(
+        request, recipes, get_format(request), *extra
+    )
+    if is_not_modified(request, etag):
+        response = HttpResponse(status=304)
+    else:
+        response = render(request, await build())
+    return set_validators(response, etag, last_modified)
+
+
+def filter_queryset(filterset_class, queryset, request):
+    """Применяет FilterSet так же, как DjangoFilterBackend."""
+    filterset = filterset_class(request.GET, queryset=queryset,
+                                request=request)
+    if not filterset.is_valid():
+        raise translate_validation(filterset.errors)
+    return filterset.qs
+
+
+@async_read_view(TagViewSet.as_view({'get': 'list'}))
+async def tag_list(request):
+    return render(request, [
+        tag async for tag in Tag.objects.values('id', 'name', 'slug')
+    ])
+
+
+@async_read_view(TagViewSet.as_view({'get': 'retrieve'}))
+async def tag_detail(request, pk):
+    return render(request, await aget_object_or_404(
+        Tag.objects.values('id', 'name', 'slug'), pk=pk
+    ))
+
+
+@async_read_view(IngredientViewSet.as_view({'get': 'list'}))
+async def ingredient_list(request):
+    queryset = await sync_to_async(filter_queryset)(
+        IngredientFilter, Ingredient.objects.all(), request
+    )
+    return render(request, [
+        ingredient async for ingredient in queryset.values(
+            'id', 'name', 'measurement_unit'
+        )
+    ])
+
+
+@async_read_view(IngredientViewSet.as_view({'get': 'retrieve'}))
+async def ingredient_detail(request, pk):
+    return render(request, await aget_object_or_404(
+        Ingredient.objects.values('id', 'name', 'measurement_unit'), pk=pk
+    ))
+
+
+async def get_recipe_page(request, user, fieldset):
+    queryset = await sync_to_async(filter_queryset)(
+        RecipeFilter, Recipe.objects.for_fieldset(user, fieldset), request
+    )
+    return await paginate(queryset, request)
+
+
+@async_read_view(RecipeViewSet.as_view({'get': 'list', 'post': 'create'}))
+async def recipe_list(request):
+    request.user = user = await authenticate(request)
+    fieldset = get_recipes_fieldset(request)
+    token = await use_replica_for(user)
+    try:
+        if user.is_anonymous:
+            async def build():
+                page, links = await get_recipe_page(request, user, fieldset)
+                results = await serialize_recipes(
+                    page, request, user, fieldset
+                )
+                return {**links, 'results': results}
+
+            return await anonymous_response(
+                request, Recipe.objects.all(), build, check_modified=False
+            )
+        page, links = await get_recipe_page(request, user, fieldset)
+
+        async def build():
+            results = await serialize_recipes(page, request, user, fieldset)
+            return {**links, 'results': results}
+
+        return await user_response(request, page, build, links['count'])
+    finally:
+        if token is not None:
+            use_replica.reset(token)
+
+
+@async_read_view(RecipeViewSet.as_view({
+    'get': 'retrieve', 'put': 'update',
+    'patch': 'partial_update', 'delete': 'destroy'
+}))
+async def recipe_detail(request, pk):
+    request.user = user = await authenticate(request)
+    fieldset = get_recipes_fieldset(request)
+    queryset = Recipe.objects.for_fieldset(user, fieldset)
+    token = await use_replica_for(user)
+    try:
+        if user.is_anonymous:
+            async def build():
+                recipe = await aget_object_or_404(queryset, pk=pk)
+                data, = await serialize_recipes(
+                    [recipe], request, user, fieldset
+                )
+                return data
+
+            return await anonymous_response(
+                request, Recipe.objects.filter(pk=pk), build
+            )
+        recipe = await aget_object_or_404(queryset, pk=pk)
+
+        async def build():
+            data, = await serialize_recipes(
+                [recipe], request, user, fieldset
+            )
+            return data
+
+        return await user_response(request, [recipe], build)
+    finally:
+        if token is not None:
+            use_replica.reset(token)
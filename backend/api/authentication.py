@@ -0,0 +1,128 @@
+import hashlib
+from functools import lru_cache
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import router
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+from api.cache import LRUCache
+
+SHARED_KEY_PREFIX = 'auth-token'
+
+# Только без общего кэша: отзыв токена другие воркеры увидят не позже
+# чем через LOCAL_TTL секунд
+token_cache = LRUCache(
+    max_size=settings.TOKEN_CACHE['MAX_SIZE'],
+    ttl=settings.TOKEN_CACHE['LOCAL_TTL'],
+)
+
+
+def get_shared_key(key):
+    """Ключ в общем кэше; сам токен в имени ключа не храним."""
+    digest = hashlib.sha256(key.encode()).hexdigest()
+    return f'{SHARED_KEY_PREFIX}:{digest}'
+
+
+def invalidate_tokens(keys):
+    """Удаляет токены из кэша: общего или LRU этого процесса."""
+    keys = list(keys)
+    if not keys:
+        return
+    if settings.TOKEN_CACHE['SHARED']:
+        cache.delete_many([get_shared_key(key) for key in keys])
+    else:
+        for key in keys:
+            token_cache.delete(key)
+
+
+@lru_cache(maxsize=None)
+def get_user_fields():
+    """Поля пользователя в записи кэша; хэш пароля туда не попадает."""
+    return tuple(
+        field.attname for field in get_user_model()._meta.concrete_fields
+        if field.attname != 'password'
+    )
+
+
+def make_entry(token):
+    """Запись кэша: неизменяемые значения полей токена и пользователя."""
+    user = token.user
+    return (
+        token.created,
+        tuple(getattr(user, attname) for attname in get_user_fields()),
+    )
+
+
+def load_entry(key, entry):
+    """Новые объекты токена и пользователя из записи кэша."""
+    created, values = entry
+    User = get_user_model()
+    # Как у загруженного из основной базы: save() пользователя обновит
+    # только поля из записи, без отложенного пароля
+    db = router.db_for_write(User)
+    user = User.from_db(db, get_user_fields(), values)
+    token = Token.from_db(
+        db, ('key', 'user_id', 'created'), (key, user.pk, created)
+    )
+    token.user = user
+    return token
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    TokenAuthentication, который кэширует соответствие токен -> пользователь.
+    С TOKEN_CACHE['SHARED'] запись хранится только в общем кэше: отзыв
+    токена сразу виден всем воркерам. Иначе — в LRU-кэше процесса с
+    коротким временем жизни, и отозванный токен в других воркерах
+    действует ещё до TOKEN_CACHE['LOCAL_TTL'] секунд.
+
+    В кэше лежат не объекты, а кортеж значений полей: каждый запрос
+    получает собственные токен и пользователя без копирования, а
+    изменение пользователя сбрасывает запись (api.signals).
+    """
+
+    def authenticate_credentials(self, key):
+        shared = settings.TOKEN_CACHE['SHARED']
+        if shared:
+            entry = cache.get(get_shared_key(key))
+        else:
+            entry = token_cache.get(key)
+        if entry is None:
+            user, token = super().authenticate_credentials(key)
+            if shared:
+                cache.set(
+                    get_shared_key(key), make_entry(token),
+                    settings.TOKEN_CACHE['TTL'],
+                )
+            else:
+                token_cache.set(key, make_entry(token))
+            return user, token
+        token = load_entry(key, entry)
+        if not token.user.is_active:
+            # Неактивные пользователи в кэш не попадают, проверка на всякий
+            # случай, если запись пришла из общего кэша
+            raise exceptions.AuthenticationFailed(
+                _('User inactive or deleted.')
+            )
+        return token.user, token
+
+
+def get_request_user(request):
+    """
+    Пользователь запроса в middleware: из сессии (админка) или по токену
+    API, иначе None. Токен проверяется здесь, потому что DRF
+    аутентифицирует запрос только в представлении.
+    """
+    user = getattr(request, 'user', None)
+    if user is not None and user.is_authenticated:
+        return user
+    try:
+        result = CachedTokenAuthentication().authenticate(request)
+    except exceptions.AuthenticationFailed:
+        return None
+    return result[0] if result else None
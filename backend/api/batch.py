@@ -0,0 +1,168 @@
+"""
+Пакетные GET-запросы к API.
+
+SPA при открытии страницы рецепта запрашивает сразу рецепт, теги,
+ингредиенты и текущего пользователя. /api/batch/ принимает эти
+подзапросы одним POST: пользователь аутентифицируется один раз, а
+подзапросы не проходят заново nginx, middleware и проверку токена —
+для каждого по пути находится представление и вызывается напрямую, со
+всеми его кэшами, ETag и чтением с реплик. Тела ответов уже собраны
+рендерером API и вставляются в общий ответ как есть, без повторного
+разбора JSON.
+
+С флагом concurrent подзапросы делятся между BATCH['MAX_WORKERS']
+потоками. Каждый поток берёт своё подключение к БД и закрывает его по
+окончании (с пулом подключений это возврат в пул), поэтому без пула
+параллельность окупается только на медленных подзапросах.
+"""
+import asyncio
+import io
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import copy_context
+from urllib.parse import unquote_to_bytes
+
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.core.handlers.wsgi import WSGIRequest
+from django.db import connections
+from django.http import HttpResponse
+from django.urls import Resolver404, resolve
+from django.utils.encoding import iri_to_uri
+from rest_framework import exceptions
+from rest_framework.settings import api_settings
+
+logger = logging.getLogger(__name__)
+
+# Условные заголовки, которые клиент может передать подзапросу
+FORWARDED_HEADERS = ('If-None-Match', 'If-Modified-Since')
+# Заголовки ответов подзапросов, которые возвращаются клиенту
+RESPONSE_HEADERS = ('ETag', 'Last-Modified')
+# Заголовки пакета, которые не относятся к подзапросам
+SKIPPED_META_PREFIXES = ('HTTP_IF_', 'CONTENT_')
+
+
+def get_renderer():
+    return api_settings.DEFAULT_RENDERER_CLASSES[0]()
+
+
+def make_sub_request(request, item):
+    """
+    GET-запрос `item['path']` с окружением пакета. Пользователь уже
+    известен, поэтому DRF подзапроса его не аутентифицирует заново.
+    """
+    path, _, query = item['path'].partition('?')
+    environ = {
+        key: value for key, value in request.META.items()
+        if not key.startswith(SKIPPED_META_PREFIXES)
+    }
+    environ.update({
+        'REQUEST_METHOD': 'GET',
+        'PATH_INFO': unquote_to_bytes(path).decode('iso-8859-1'),
+        'QUERY_STRING': iri_to_uri(query),
+        'HTTP_ACCEPT': 'application/json',
+        'wsgi.input': io.BytesIO(),
+        'wsgi.url_scheme': request.scheme,
+    })
+    for name, value in item['headers'].items():
+        environ['HTTP_' + name.upper().replace('-', '_')] = value
+    sub_request = WSGIRequest(environ)
+    sub_request.user = request.user
+    if request.user.is_authenticated:
+        sub_request._force_auth_user = request.user
+        sub_request._force_auth_token = request.auth
+    for name in ('session', 'urlconf'):
+        if hasattr(request._request, name):
+            setattr(sub_request, name, getattr(request._request, name))
+    return sub_request
+
+
+def error_response(exc):
+    return HttpResponse(
+        get_renderer().render({'detail': exc.detail}),
+        content_type='application/json', status=exc.status_code,
+    )
+
+
+def get_sub_response(sub_request):
+    """Ответ представления, которому соответствует путь подзапроса."""
+    try:
+        match = resolve(
+            sub_request.path_info, getattr(sub_request, 'urlconf', None)
+        )
+    except Resolver404:
+        return error_response(exceptions.NotFound())
+    sub_request.resolver_match = match
+    view = match.func
+    if asyncio.iscoroutinefunction(view):
+        # Под ASGI чтение обслуживают асинхронные представления
+        view = async_to_sync(view)
+    try:
+        response = view(sub_request, *match.args, **match.kwargs)
+        if hasattr(response, 'render') and callable(response.render):
+            response.render()
+    except Exception:
+        logger.exception('Ошибка подзапроса %s', sub_request.get_full_path())
+        return error_response(exceptions.APIException())
+    return response
+
+
+def encode_response(response):
+    """
+    Ответ подзапроса в JSON {"status", "headers", "body"}. JSON-тело
+    вставляется готовыми байтами, остальные — строкой.
+    """
+    renderer = get_renderer()
+    head = {'status': response.status_code}
+    headers = {
+        name: response[name] for name in RESPONSE_HEADERS
+        if response.has_header(name)
+    }
+    if headers:
+        head['headers'] = headers
+    if response.streaming:
+        content = b''.join(response.streaming_content)
+    else:
+        content = response.content
+    if not content:
+        body = b'null'
+    elif response.get('Content-Type', '').startswith('application/json'):
+        body = content
+    else:
+        body = renderer.render(content.decode(response.charset, 'replace'))
+    return renderer.render(head)[:-1] + b',"body":' + body + b'}'
+
+
+def run_in_thread(sub_requests):
+    """Подзапросы в отдельном потоке; его подключения к БД закрываются."""
+    try:
+        return [
+            encode_response(get_sub_response(sub_request))
+            for sub_request in sub_requests
+        ]
+    finally:
+        connections.close_all()
+
+
+def run_batch(request, items, concurrent=False):
+    """Выполняет подзапросы и возвращает тело общего ответа."""
+    sub_requests = [make_sub_request(request, item) for item in items]
+    workers = min(settings.BATCH['MAX_WORKERS'], len(sub_requests))
+    if not concurrent or workers <= 1:
+        parts = [
+            encode_response(get_sub_response(sub_request))
+            for sub_request in sub_requests
+        ]
+    else:
+        # Подзапросы раздаются потокам по кругу, порядок ответов сохраняется
+        groups = [sub_requests[start::workers] for start in range(workers)]
+        with ThreadPoolExecutor(workers) as executor:
+            results = [
+                executor.submit(copy_context().run, run_in_thread, group)
+                for group in groups
+            ]
+            results = [future.result() for future in results]
+        parts = [None] * len(sub_requests)
+        for start, group in enumerate(results):
+            parts[start::workers] = group
+    return b'{"responses":[' + b','.join(parts) + b']}'
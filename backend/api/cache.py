@@ -0,0 +1,160 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from recipes.models import Tag
+
+TAG_MAP_KEY = 'tag-map'
+# Страховка на случай кэша, не общего для воркеров (LocMemCache)
+TAG_MAP_TIMEOUT = 60
+
+RECIPES_VERSION_KEY = 'recipes-version'
+INGREDIENTS_VERSION_KEY = 'ingredients-version'
+RESPONSE_KEY_PREFIX = 'recipes-response'
+# Как часто ждущий воркер проверяет, не собрал ли ответ другой
+RESPONSE_WAIT_INTERVAL = 0.05
+
+
+class LRUCache:
+    """
+    Потокобезопасный LRU-кэш с ограниченным временем жизни записей.
+    Живёт в памяти процесса, поэтому у каждого воркера он свой.
+    """
+
+    def __init__(self, max_size, ttl):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            value, expires_at = item
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + self.ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+def get_tag_map():
+    """
+    Соответствие slug -> id всех тегов. Тегов мало и меняются они редко,
+    поэтому словарь хранится в кэше и сбрасывается при изменении тегов.
+    """
+    tag_map = cache.get(TAG_MAP_KEY)
+    if tag_map is None:
+        tag_map = dict(Tag.objects.values_list('slug', 'id'))
+        cache.set(TAG_MAP_KEY, tag_map, TAG_MAP_TIMEOUT)
+    return tag_map
+
+
+def invalidate_tag_map():
+    cache.delete(TAG_MAP_KEY)
+
+
+def get_version(key):
+    """
+    Версия данных. Это время последнего изменения в микросекундах,
+    поэтому после вытеснения ключа из кэша версия не повторяет старую.
+    """
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, time.time_ns() // 1000, None)
+        version = cache.get(key)
+    return version
+
+
+def bump_version(key):
+    transaction.on_commit(lambda: cache.set(
+        key, time.time_ns() // 1000, None
+    ))
+
+
+def get_recipes_version():
+    return get_version(RECIPES_VERSION_KEY)
+
+
+def bump_recipes_version():
+    """
+    Делает устаревшими все закэшированные ответы с рецептами.
+    Срабатывает после коммита, чтобы ответ не собрали со старыми данными
+    под новой версией.
+    """
+    bump_version(RECIPES_VERSION_KEY)
+
+
+def get_ingredients_version():
+    """Версия каталога ингредиентов для индексов поиска в памяти."""
+    return get_version(INGREDIENTS_VERSION_KEY)
+
+
+def bump_ingredients_version():
+    bump_version(INGREDIENTS_VERSION_KEY)
+
+
+def get_response_key(url, query_params):
+    """Ключ ответа: адрес и параметры запроса без учёта их порядка."""
+    params = sorted(
+        (name, sorted(query_params.getlist(name)))
+        for name in query_params
+    )
+    digest = hashlib.md5(repr((url, params)).encode()).hexdigest()
+    return f'{RESPONSE_KEY_PREFIX}:{digest}'
+
+
+def get_or_build_response(key, build):
+    """
+    Данные ответа из кэша или из `build()`. Запись хранит версию набора
+    рецептов; после её смены ответ пересобирает только воркер, взявший
+    блокировку, а остальные отдают предыдущую версию (или ждут, если её
+    нет). `build` возвращает None для ответов, которые не кэшируются.
+    """
+    options = settings.RECIPE_RESPONSE_CACHE
+    version = get_recipes_version()
+    entry = cache.get(key)
+    if entry is not None and entry[0] == version:
+        return entry[1]
+    lock_key = f'{key}:lock'
+    deadline = time.monotonic() + options['LOCK_TIMEOUT']
+    while True:
+        if cache.add(lock_key, True, options['LOCK_TIMEOUT']):
+            try:
+                data = build()
+                if data is not None:
+                    cache.set(key, (version, data), options['TIMEOUT'])
+                return data
+            finally:
+                cache.delete(lock_key)
+        if entry is not None:
+            return entry[1]
+        if time.monotonic() > deadline:
+            return build()
+        time.sleep(RESPONSE_WAIT_INTERVAL)
+        entry = cache.get(key)
+        if entry is not None and entry[0] == version:
+            return entry[1]
+        entry = None
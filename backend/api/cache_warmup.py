@@ -0,0 +1,111 @@
+"""
+Прогрев общих кэшей после развёртывания или массовой правки.
+
+После смены версии набора рецептов (api.cache) кэш ответов пуст, после
+перезапуска базы холодны её буферы, и за это платят первые посетители
+самых популярных страниц. Здесь эти запросы выполняются заранее через
+тестовый клиент Django — весь стек, как у настоящего запроса, —
+анонимно, потому что общий кэш ответов хранит именно анонимные ответы.
+Адреса повторяют запросы фронтенда, иначе ключи кэша (адрес и
+параметры) не совпадут.
+"""
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from math import ceil
+from time import perf_counter
+from urllib.parse import urlencode
+
+from django.db import connections
+from django.db.models import Count
+from django.test import Client
+
+from foodgram.db.estimates import count_with_estimate
+from recipes.models import Favorite, Recipe, ShoppingList, Tag
+
+
+def get_recipe_list_paths(pages, limit):
+    """
+    Первые страницы списка рецептов: без фильтра, со всеми тегами (так
+    список открывает фронтенд) и с каждым тегом отдельно.
+    """
+    total = count_with_estimate(Recipe.objects.all())[0]
+    tags = list(Tag.objects.annotate(count=Count('recipes')).values_list(
+        'slug', 'count'
+    ))
+    filters = [((), total)]
+    if tags:
+        filters.append(([slug for slug, _ in tags], total))
+    if len(tags) > 1:
+        filters.extend(((slug,), count) for slug, count in tags)
+    paths = []
+    for slugs, count in filters:
+        for page in range(1, min(pages, ceil(count / limit)) + 1):
+            params = [('page', page), ('limit', limit)]
+            params.extend(('tags', slug) for slug in slugs)
+            paths.append(f'/api/recipes/?{urlencode(params)}')
+    return paths
+
+
+def get_popular_recipe_ids(count):
+    """Рецепты, чаще всего добавляемые в избранное и списки покупок."""
+    popularity = Counter()
+    for model in (Favorite, ShoppingList):
+        popularity.update(dict(
+            model.objects.values_list('recipe_id')
+            .annotate(count=Count('pk'))
+            .order_by('-count')[:count]
+        ))
+    recipe_ids = [recipe_id for recipe_id, _ in popularity.most_common(count)]
+    if len(recipe_ids) < count:
+        # Новые рецепты видны на первых страницах, их тоже открывают
+        recipe_ids.extend(
+            Recipe.objects.exclude(pk__in=recipe_ids)
+            .values_list('pk', flat=True)[:count - len(recipe_ids)]
+        )
+    return recipe_ids
+
+
+def get_hot_paths(pages, limit, recipes):
+    """Адреса для прогрева, от общих для всех страниц к частным."""
+    return [
+        '/api/tags/',
+        '/api/ingredients/',
+        *get_recipe_list_paths(pages, limit),
+        *(
+            f'/api/recipes/{recipe_id}/'
+            for recipe_id in get_popular_recipe_ids(recipes)
+        ),
+    ]
+
+
+def fetch(client, path, secure):
+    started = perf_counter()
+    status = client.get(path, secure=secure).status_code
+    return path, status, (perf_counter() - started) * 1000
+
+
+def fetch_all(host, secure, paths):
+    """Запросы одного потока; его подключения к БД закрываются."""
+    client = Client(HTTP_HOST=host, raise_request_exception=False)
+    try:
+        return [fetch(client, path, secure) for path in paths]
+    finally:
+        connections.close_all()
+
+
+def warm_caches(paths, host, secure=False, concurrency=1):
+    """Выполняет запросы `paths`, возвращает [(адрес, статус, мс)]."""
+    workers = max(1, min(concurrency, len(paths)))
+    if workers == 1:
+        client = Client(HTTP_HOST=host, raise_request_exception=False)
+        return [fetch(client, path, secure) for path in paths]
+    # Адреса раздаются потокам по кругу, как в api.batch
+    groups = [paths[start::workers] for start in range(workers)]
+    with ThreadPoolExecutor(workers) as executor:
+        results = list(executor.map(
+            lambda group: fetch_all(host, secure, group), groups
+        ))
+    report = [None] * len(paths)
+    for start, group in enumerate(results):
+        report[start::workers] = group
+    return report
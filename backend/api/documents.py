@@ -0,0 +1,89 @@
+"""
+Модель чтения рецептов: таблица RecipeDocument.
+
+Документ — результат `build_documents` для одного рецепта. Он
+пересобирается в той же транзакции, что и изменение рецепта, его тегов,
+ингредиентов или профиля автора, поэтому при чтении остаётся одним
+запросом достать документы страницы и подставить флаги пользователя.
+Каждая пересборка меняет Recipe.updated_at и версию рецепта в кэше
+фрагментов.
+
+Изменение тега, ингредиента или автора затрагивает все их рецепты.
+Если рецептов не больше INLINE_REBUILD_SIZE, документы пересобираются
+в той же транзакции, иначе пересборку выполняет воркер (api.tasks), а
+в транзакции документы удаляются (`discard_documents`): до прихода
+воркера чтение собирает их из основных таблиц, а не отдаёт устаревшие.
+"""
+from django.db import transaction
+from django.utils import timezone
+
+from api.fast_serializers import (
+    DOCUMENT_RECIPE_FIELDS, author_rows, build_documents, ingredient_rows,
+    tag_rows
+)
+from api.fragments import bump_versions
+from recipes.models import Recipe, RecipeDocument
+
+REBUILD_BATCH_SIZE = 500
+INLINE_REBUILD_SIZE = 50
+
+
+def collect_documents(recipe_ids):
+    """Документы рецептов, собранные из основных таблиц."""
+    rows = list(
+        Recipe.objects.filter(pk__in=recipe_ids)
+        .values_list(*DOCUMENT_RECIPE_FIELDS)
+    )
+    recipe_ids = [row[0] for row in rows]
+    return build_documents(
+        rows,
+        tag_rows(recipe_ids),
+        ingredient_rows(recipe_ids),
+        author_rows({row[1] for row in rows}),
+    )
+
+
+@transaction.atomic
+def rebuild_documents(recipe_ids):
+    """Пересобирает документы рецептов; удалённые рецепты пропускаются."""
+    documents = collect_documents(list(recipe_ids))
+    RecipeDocument.objects.bulk_create(
+        [
+            RecipeDocument(recipe_id=recipe_id, data=document)
+            for recipe_id, document in documents.items()
+        ],
+        update_conflicts=True,
+        unique_fields=['recipe'],
+        update_fields=['data', 'updated_at'],
+    )
+    Recipe.objects.filter(pk__in=documents).update(updated_at=timezone.now())
+    bump_versions(documents)
+    return len(documents)
+
+
+@transaction.atomic
+def discard_documents(recipe_ids):
+    """Удаляет документы рецептов, которые пересоберёт воркер."""
+    recipe_ids = list(recipe_ids)
+    RecipeDocument.objects.filter(recipe_id__in=recipe_ids).delete()
+    Recipe.objects.filter(pk__in=recipe_ids).update(updated_at=timezone.now())
+    bump_versions(recipe_ids)
+
+
+def rebuild_documents_for(queryset, batch_size=REBUILD_BATCH_SIZE):
+    """
+    Пересобирает документы рецептов из `queryset` пачками по первичному
+    ключу, не загружая все рецепты в память. Возвращает их количество.
+    """
+    queryset = queryset.order_by('pk')
+    rebuilt = 0
+    last_id = 0
+    while True:
+        recipe_ids = list(
+            queryset.filter(pk__gt=last_id)
+            .values_list('pk', flat=True)[:batch_size]
+        )
+        if not recipe_ids:
+            return rebuilt
+        rebuilt += rebuild_documents(recipe_ids)
+        last_id = recipe_ids[-1]
@@ -0,0 +1,320 @@
+"""
+Быстрая сериализация рецептов для чтения.
+
+RecipeReadSerializer строит ответ через вложенные сериализаторы и
+`to_representation` каждого поля, что на больших страницах занимает
+основное время. Здесь тот же JSON собирается из строк `.values_list()`
+несколькими запросами на всю страницу:
+
+1. `build_documents` — часть рецепта, не зависящая от пользователя
+   (теги, автор, ингредиенты; ссылки на файлы относительные). Готовые
+   документы хранятся в RecipeDocument (см. api/documents.py) и
+   кэшируются по версиям рецептов (api/fragments.py);
+2. `render_document` — подстановка флагов текущего пользователя
+   и абсолютных ссылок.
+"""
+from collections import defaultdict
+from operator import attrgetter
+
+from django.contrib.auth import get_user_model
+from django.db import models
+from rest_framework import serializers
+
+from api.fieldsets import ALL_FIELDS, get_fieldset
+from api.fragments import get_fragments, set_fragments
+from recipes.models import Recipe, RecipeDocument, RecipeIngredient
+from users.models import Subscription
+
+User = get_user_model()
+
+TAG_FIELDS = ('id', 'name', 'slug')
+INGREDIENT_FIELDS = ('id', 'name', 'measurement_unit', 'amount')
+AUTHOR_FIELDS = ('email', 'id', 'username', 'first_name', 'last_name')
+
+DOCUMENT_RECIPE_FIELDS = (
+    'id', 'author_id', 'name', 'image', 'text', 'cooking_time'
+)
+get_recipe_fields = attrgetter(
+    'id', 'author_id', 'name', 'image.name', 'text', 'cooking_time'
+)
+recipe_storage = Recipe._meta.get_field('image').storage
+avatar_storage = User._meta.get_field('avatar').storage
+
+
+def tag_rows(recipe_ids):
+    return (
+        Recipe.tags.through.objects
+        .filter(recipe_id__in=recipe_ids)
+        .order_by('tag__name')
+        .values_list('recipe_id', 'tag_id', 'tag__name', 'tag__slug')
+    )
+
+
+def ingredient_rows(recipe_ids):
+    return (
+        RecipeIngredient.objects
+        .filter(recipe_id__in=recipe_ids)
+        .order_by('pk')
+        .values_list(
+            'recipe_id', 'ingredient_id', 'ingredient__name',
+            'ingredient__measurement_unit', 'quantity'
+        )
+    )
+
+
+def author_rows(author_ids):
+    return User.objects.filter(id__in=author_ids).values_list(
+        *AUTHOR_FIELDS, 'avatar'
+    )
+
+
+def subscribed_rows(user, author_ids):
+    return Subscription.objects.filter(
+        user=user, subscribed_to_id__in=author_ids
+    ).values_list('subscribed_to_id', flat=True)
+
+
+def build_documents(recipes, tags, ingredients, authors):
+    """
+    Собирает независимую от пользователя часть рецептов.
+    `recipes` — кортежи в порядке get_recipe_fields, остальные аргументы —
+    строки запросов tag_rows, ingredient_rows и author_rows.
+    """
+    recipe_tags = defaultdict(list)
+    for recipe_id, *tag in tags:
+        recipe_tags[recipe_id].append(dict(zip(TAG_FIELDS, tag)))
+
+    recipe_ingredients = defaultdict(list)
+    for recipe_id, *ingredient, quantity in ingredients:
+        ingredient.append(float(quantity))
+        recipe_ingredients[recipe_id].append(
+            dict(zip(INGREDIENT_FIELDS, ingredient))
+        )
+
+    author_documents = {}
+    for *author, avatar in authors:
+        document = dict(zip(AUTHOR_FIELDS, author))
+        document['avatar'] = avatar_storage.url(avatar) if avatar else None
+        author_documents[document['id']] = document
+
+    return {
+        recipe_id: {
+            'id': recipe_id,
+            'tags': recipe_tags[recipe_id],
+            'author': author_documents[author_id],
+            'ingredients': recipe_ingredients[recipe_id],
+            'name': name,
+            'image': recipe_storage.url(image) if image else None,
+            'text': text,
+            'cooking_time': cooking_time,
+        }
+        for recipe_id, author_id, name, image, text, cooking_time in recipes
+    }
+
+
+def stored_document_rows(recipe_ids):
+    return RecipeDocument.objects.filter(
+        recipe_id__in=recipe_ids
+    ).values_list('recipe_id', 'data')
+
+
+def get_documents(recipes):
+    """
+    Документы для рецептов (объектов модели): сначала из кэша фрагментов,
+    затем из RecipeDocument, недостающие собираются из таблиц на всю пачку.
+    """
+    documents, versions = get_fragments([recipe.id for recipe in recipes])
+    recipes = [recipe for recipe in recipes if recipe.id not in documents]
+    if not recipes:
+        return documents
+    loaded = dict(stored_document_rows([recipe.id for recipe in recipes]))
+    recipes = [recipe for recipe in recipes if recipe.id not in loaded]
+    if any(recipe.get_deferred_fields() for recipe in recipes):
+        # Текст и другие поля не загружены (?fields=), читаем их пачкой
+        rows = list(Recipe.objects.filter(
+            pk__in=[recipe.id for recipe in recipes]
+        ).values_list(*DOCUMENT_RECIPE_FIELDS))
+    else:
+        rows = [get_recipe_fields(recipe) for recipe in recipes]
+    if rows:
+        recipe_ids = [row[0] for row in rows]
+        loaded.update(build_documents(
+            rows,
+            tag_rows(recipe_ids),
+            ingredient_rows(recipe_ids),
+            author_rows({row[1] for row in rows}),
+        ))
+    set_fragments(loaded, versions)
+    documents.update(loaded)
+    return documents
+
+
+def absolute_url(request, url):
+    if url is None or request is None:
+        return url
+    return request.build_absolute_uri(url)
+
+
+def render_tags(tags):
+    return [
+        {'id': tag['id'], 'name': tag['name'], 'slug': tag['slug']}
+        for tag in tags
+    ]
+
+
+def render_author(author, request, is_subscribed):
+    return {
+        'email': author['email'],
+        'id': author['id'],
+        'username': author['username'],
+        'first_name': author['first_name'],
+        'last_name': author['last_name'],
+        'is_subscribed': is_subscribed,
+        'avatar': absolute_url(request, author['avatar']),
+    }
+
+
+def render_ingredients(ingredients):
+    return [
+        {
+            'id': ingredient['id'],
+            'name': ingredient['name'],
+            'measurement_unit': ingredient['measurement_unit'],
+            'amount': ingredient['amount'],
+        }
+        for ingredient in ingredients
+    ]
+
+
+# Поля ответа в порядке RecipeReadSerializer для частичных представлений:
+# (документ, запрос, флаги)
+FIELD_RENDERERS = {
+    'id': lambda document, request, flags: document['id'],
+    'tags': lambda document, request, flags: render_tags(document['tags']),
+    'author': lambda document, request, flags: render_author(
+        document['author'], request, flags['is_subscribed']
+    ),
+    'ingredients': lambda document, request, flags: render_ingredients(
+        document['ingredients']
+    ),
+    'is_favorited': lambda document, request, flags: flags['is_favorited'],
+    'is_in_shopping_cart': (
+        lambda document, request, flags: flags['is_in_shopping_cart']
+    ),
+    'name': lambda document, request, flags: document['name'],
+    'image': lambda document, request, flags: absolute_url(
+        request, document['image']
+    ),
+    'text': lambda document, request, flags: document['text'],
+    'cooking_time': lambda document, request, flags: document['cooking_time'],
+}
+
+
+def render_document(document, request, is_favorited=False,
+                    is_in_shopping_cart=False, is_subscribed=False,
+                    fieldset=ALL_FIELDS):
+    """
+    Ответ RecipeReadSerializer из документа и флагов пользователя.
+    Словари пересобираются явно: jsonb не сохраняет порядок ключей.
+    Поля не из `fieldset` не собираются.
+    """
+    if fieldset.is_all:
+        return {
+            'id': document['id'],
+            'tags': render_tags(document['tags']),
+            'author': render_author(
+                document['author'], request, is_subscribed
+            ),
+            'ingredients': render_ingredients(document['ingredients']),
+            'is_favorited': is_favorited,
+            'is_in_shopping_cart': is_in_shopping_cart,
+            'name': document['name'],
+            'image': absolute_url(request, document['image']),
+            'text': document['text'],
+            'cooking_time': document['cooking_time'],
+        }
+    flags = {
+        'is_favorited': is_favorited,
+        'is_in_shopping_cart': is_in_shopping_cart,
+        'is_subscribed': is_subscribed,
+    }
+    return fieldset.apply({
+        name: render(document, request, flags)
+        for name, render in FIELD_RENDERERS.items() if name in fieldset
+    })
+
+
+def get_subscribed(request, subscribed_ids, author_id):
+    """Значение is_subscribed так же, как в UserSerializer."""
+    if request is None:
+        return None
+    if request.user.is_anonymous:
+        return False
+    return author_id in subscribed_ids
+
+
+def render_recipes(recipes, documents, request, subscribed_ids,
+                   fieldset=ALL_FIELDS):
+    return [
+        render_document(
+            documents[recipe.id], request,
+            is_favorited=bool(getattr(recipe, 'is_favorited', False)),
+            is_in_shopping_cart=bool(
+                getattr(recipe, 'is_in_shopping_cart', False)
+            ),
+            is_subscribed=get_subscribed(
+                request, subscribed_ids, recipe.author_id
+            ),
+            fieldset=fieldset,
+        )
+        for recipe in recipes
+    ]
+
+
+def get_recipes_fieldset(request):
+    """Поля рецептов из ?fields= / ?omit= (см. api.fieldsets)."""
+    return get_fieldset(request).check(FIELD_RENDERERS)
+
+
+def needs_subscriptions(fieldset):
+    return 'author' in fieldset and 'is_subscribed' in fieldset.nested(
+        'author'
+    )
+
+
+def represent_recipes(recipes, request):
+    """Представление списка рецептов, совпадающее с RecipeReadSerializer."""
+    fieldset = get_recipes_fieldset(request)
+    documents = get_documents(recipes)
+    subscribed_ids = set()
+    if (
+        request is not None
+        and request.user.is_authenticated
+        and needs_subscriptions(fieldset)
+    ):
+        subscribed_ids = set(subscribed_rows(
+            request.user, {recipe.author_id for recipe in recipes}
+        ))
+    return render_recipes(
+        recipes, documents, request, subscribed_ids, fieldset
+    )
+
+
+class RecipeFastListSerializer(serializers.ListSerializer):
+    def to_representation(self, data):
+        if isinstance(data, models.manager.BaseManager):
+            data = data.all()
+        return represent_recipes(list(data), self.context.get('request'))
+
+
+class RecipeFastReadSerializer(serializers.BaseSerializer):
+    """
+    Только для чтения: тот же результат, что у RecipeReadSerializer,
+    но при many=True вся страница собирается пачкой запросов.
+    """
+
+    class Meta:
+        list_serializer_class = RecipeFastListSerializer
+
+    def to_representation(self, instance):
+        return represent_recipes([instance], self.context.get('request'))[0]
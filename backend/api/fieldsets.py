@@ -0,0 +1,160 @@
+"""
+Частичные представления: ?fields= и ?omit=.
+
+`?fields=id,name,author.username` оставляет в ответе только указанные
+поля, `?omit=text,ingredients` убирает указанные. Вложенные поля
+задаются через точку, параметры можно повторять. Имена верхнего уровня
+проверяются, неизвестное имя — ошибка 400.
+
+Набор полей влияет не только на вывод: представления по нему не
+запрашивают лишнего (флаги избранного и корзины, текст рецепта,
+подписки авторов), см. RecipeViewSet.get_queryset и
+api.fast_serializers. Учитывается только в безопасных запросах.
+"""
+from rest_framework import serializers
+from rest_framework.permissions import SAFE_METHODS
+
+FIELDS_PARAM = 'fields'
+OMIT_PARAM = 'omit'
+
+
+def parse_names(values):
+    return frozenset(
+        name.strip()
+        for value in values for name in value.split(',')
+        if name.strip()
+    )
+
+
+class FieldSet:
+    """Какие поля нужны в ответе; `fields=None` — все, кроме `omit`."""
+
+    def __init__(self, fields=None, omit=frozenset()):
+        self.fields = fields
+        self.omit = omit
+        self.is_all = fields is None and not omit
+        # Ответ проверяет одни и те же имена у каждого объекта:
+        # имя -> (нужно ли поле, набор полей вложенного или None — все)
+        self.plan = {}
+
+    def get_plan(self, name):
+        try:
+            return self.plan[name]
+        except KeyError:
+            pass
+        prefix = f'{name}.'
+        included = name not in self.omit and (
+            self.fields is None
+            or name in self.fields
+            or any(field.startswith(prefix) for field in self.fields)
+        )
+        fields = None
+        if self.fields is not None and name not in self.fields:
+            fields = frozenset(
+                field[len(prefix):] for field in self.fields
+                if field.startswith(prefix)
+            )
+        nested = FieldSet(fields, frozenset(
+            field[len(prefix):] for field in self.omit
+            if field.startswith(prefix)
+        ))
+        plan = self.plan[name] = (
+            included, None if nested.is_all else nested
+        )
+        return plan
+
+    def __contains__(self, name):
+        return self.is_all or self.get_plan(name)[0]
+
+    def nested(self, name):
+        """Набор полей вложенного объекта `name`."""
+        if self.is_all:
+            return self
+        return self.get_plan(name)[1] or ALL_FIELDS
+
+    def check(self, names):
+        """Ошибка 400, если запрошены поля верхнего уровня не из `names`."""
+        requested = {
+            field.split('.', 1)[0]
+            for field in (*(self.fields or ()), *self.omit)
+        }
+        unknown = sorted(requested - set(names))
+        if unknown:
+            raise serializers.ValidationError({
+                FIELDS_PARAM: [f'Неизвестные поля: {", ".join(unknown)}.']
+            })
+        return self
+
+    def apply(self, data):
+        """Оставляет в готовом представлении (словари и списки) нужные поля."""
+        if self.is_all:
+            return data
+        if isinstance(data, list):
+            return [self.apply(item) for item in data]
+        if not isinstance(data, dict):
+            return data
+        result = {}
+        for name, value in data.items():
+            included, nested = self.get_plan(name)
+            if included:
+                result[name] = value if nested is None else nested.apply(value)
+        return result
+
+
+ALL_FIELDS = FieldSet()
+
+
+def get_fieldset(request):
+    """Набор полей из параметров безопасного запроса (без них — все)."""
+    if request is None or request.method not in SAFE_METHODS:
+        return ALL_FIELDS
+    fields = request.GET.getlist(FIELDS_PARAM)
+    omit = request.GET.getlist(OMIT_PARAM)
+    if not fields and not omit:
+        return ALL_FIELDS
+    return FieldSet(
+        parse_names(fields) if fields else None, parse_names(omit)
+    )
+
+
+class SparseFieldsMixin:
+    """
+    Оставляет у сериализатора поля из ?fields= / ?omit= запроса. Для
+    вложенного сериализатора набор берётся у родителя по имени поля.
+    """
+
+    def get_owner(self):
+        """Сериализатор, в который вложен этот, и имя поля в нём."""
+        owner, name = self.parent, self.field_name
+        if isinstance(owner, serializers.ListSerializer):
+            owner, name = owner.parent, owner.field_name
+        return owner, name
+
+    def get_fieldset(self):
+        if not hasattr(self, '_fieldset'):
+            owner, name = self.get_owner()
+            if owner is None:
+                self._fieldset = get_fieldset(self.context.get('request'))
+            elif isinstance(owner, SparseFieldsMixin):
+                self._fieldset = owner.get_fieldset().nested(name)
+            else:
+                self._fieldset = ALL_FIELDS
+        return self._fieldset
+
+    def get_fields(self):
+        fields = super().get_fields()
+        fieldset = self.get_fieldset()
+        if fieldset.is_all:
+            return fields
+        if self.get_owner()[0] is None:
+            fieldset.check(fields)
+        return {
+            name: field for name, field in fields.items() if name in fieldset
+        }
+
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        if self.get_owner()[0] is None:
+            # Поля вложенных сериализаторов без SparseFieldsMixin (теги)
+            return self.get_fieldset().apply(data)
+        return data
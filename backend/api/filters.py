@@ -1,30 +1,78 @@
+from django.db.models import Exists, F, OuterRef
 from django_filters import rest_framework as filters
 
-from recipes.models import Ingredient, Recipe, Tag
+from api.cache import get_tag_map
+from api.ingredient_search import search_ingredients
+from recipes.models import Favorite, Ingredient, Recipe, ShoppingList
+from recipes.utils.tags_mask import get_tag_masks, tags_to_mask
+
+
+def get_tag_choices():
+    return [(slug, slug) for slug in get_tag_map()]
 
 
 class RecipeFilter(filters.FilterSet):
     """Фильтры для модели Recipe."""
 
-    tags = filters.ModelMultipleChoiceFilter(
-        field_name='tags__slug',  # Фильтрация по slug тегов
-        to_field_name='slug',  # Сравнение по slug
-        queryset=Tag.objects.all(),  # Проверяем только существующие теги
+    # Slug проверяются по закэшированному списку тегов, а фильтрация
+    # идёт по Recipe.tags_mask без соединения с таблицей тегов
+    tags = filters.MultipleChoiceFilter(
+        choices=get_tag_choices, method='filter_tags'
     )
-    is_favorited = filters.BooleanFilter(field_name='is_favorited')
+    is_favorited = filters.BooleanFilter(method='filter_is_favorited')
     is_in_shopping_cart = filters.BooleanFilter(
-        field_name='is_in_shopping_cart'
+        method='filter_is_in_shopping_cart'
     )
 
     class Meta:
         model = Recipe
         fields = ['tags', 'author', ]
 
+    def filter_tags(self, queryset, name, value):
+        tag_map = get_tag_map()
+        tag_ids = [tag_map[slug] for slug in value if slug in tag_map]
+        mask = tags_to_mask(tag_ids)
+        if mask is None:
+            # Есть теги без бита в маске: фильтруем через подзапрос
+            return queryset.filter(id__in=Recipe.tags.through.objects.filter(
+                tag_id__in=tag_ids
+            ).values('recipe_id'))
+        masks = get_tag_masks()
+        if masks is not None:
+            return queryset.filter(
+                tags_mask__in=[known for known in masks if known & mask]
+            )
+        return queryset.alias(
+            matched_tags=F('tags_mask').bitand(mask)
+        ).exclude(matched_tags=0)
+
+    def filter_user_recipes(self, queryset, model, value):
+        """Рецепты, которые есть (или нет) у пользователя в `model`."""
+        user = getattr(self.request, 'user', None)
+        if user is None or not user.is_authenticated:
+            return queryset.none() if value else queryset
+        in_user_recipes = Exists(
+            model.objects.filter(user=user, recipe=OuterRef('pk'))
+        )
+        return queryset.filter(
+            in_user_recipes if value else ~in_user_recipes
+        )
+
+    def filter_is_favorited(self, queryset, name, value):
+        return self.filter_user_recipes(queryset, Favorite, value)
+
+    def filter_is_in_shopping_cart(self, queryset, name, value):
+        return self.filter_user_recipes(queryset, ShoppingList, value)
+
 
 class IngredientFilter(filters.FilterSet):
     """Фильтр для модели Ingredient."""
-    name = filters.CharFilter(field_name='name', lookup_expr='istartswith')
+    # Ранжированный поиск с учётом опечаток (api.ingredient_search)
+    name = filters.CharFilter(method='filter_name')
 
     class Meta:
         model = Ingredient
         fields = ['name']
+
+    def filter_name(self, queryset, name, value):
+        return search_ingredients(queryset, value)
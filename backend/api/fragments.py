@@ -0,0 +1,144 @@
+"""
+Кэш документов рецептов (независимой от пользователя части ответа).
+
+Ключ фрагмента содержит версию рецепта, которая меняется при каждой
+пересборке документа (api.documents). Содержимое ключа поэтому никогда
+не устаревает, и перед общим кэшем можно держать LRU процесса:
+
+    LRU процесса -> общий кэш (CACHES) -> таблица RecipeDocument
+
+Версии хранятся только в общем кэше и читаются одним get_many на
+страницу, так что изменение сразу видно всем воркерам.
+"""
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+from api.cache import LRUCache
+
+VERSION_KEY_PREFIX = 'recipe-version'
+FRAGMENT_KEY_PREFIX = 'recipe-fragment'
+
+local_fragments = LRUCache(
+    max_size=settings.RECIPE_FRAGMENT_CACHE['LOCAL_SIZE'],
+    ttl=settings.RECIPE_FRAGMENT_CACHE['LOCAL_TTL'],
+)
+_stats = Counter()
+_stats_lock = threading.Lock()
+
+
+def get_shared_cache():
+    return caches[settings.RECIPE_FRAGMENT_CACHE['ALIAS']]
+
+
+def get_version_key(recipe_id):
+    return f'{VERSION_KEY_PREFIX}:{recipe_id}'
+
+
+def get_fragment_key(recipe_id, version):
+    return f'{FRAGMENT_KEY_PREFIX}:{recipe_id}:{version}'
+
+
+def new_version():
+    return time.time_ns() // 1000
+
+
+def get_versions(recipe_ids):
+    """Версии рецептов; недостающие (вытесненные) заводятся заново."""
+    shared = get_shared_cache()
+    version_keys = {get_version_key(pk): pk for pk in recipe_ids}
+    found = shared.get_many(version_keys)
+    missing = {
+        key: new_version() for key in version_keys if key not in found
+    }
+    if missing:
+        for key, version in missing.items():
+            shared.add(key, version, None)
+        found.update(shared.get_many(missing))
+    return {version_keys[key]: version for key, version in found.items()}
+
+
+def bump_versions(recipe_ids):
+    """Новые версии рецептов после коммита транзакции с изменениями."""
+    recipe_ids = list(recipe_ids)
+
+    def bump():
+        version = new_version()
+        get_shared_cache().set_many(
+            {get_version_key(pk): version for pk in recipe_ids}, None
+        )
+
+    if recipe_ids:
+        transaction.on_commit(bump)
+
+
+def count(**counters):
+    with _stats_lock:
+        _stats.update(counters)
+
+
+def get_fragments(recipe_ids):
+    """
+    Закэшированные документы рецептов. Возвращает найденные документы
+    и версии всех рецептов (нужны, чтобы сохранить недостающие).
+    """
+    if (
+        not settings.RECIPE_FRAGMENT_CACHE['ENABLED']
+        # Внутри транзакции документ может быть уже пересобран, а версия
+        # сменится только после коммита (ответ на создание/изменение)
+        or transaction.get_connection().in_atomic_block
+    ):
+        return {}, {}
+    versions = get_versions(recipe_ids)
+    documents = {}
+    shared_keys = {}
+    for pk, version in versions.items():
+        document = local_fragments.get(get_fragment_key(pk, version))
+        if document is None:
+            shared_keys[get_fragment_key(pk, version)] = pk
+        else:
+            documents[pk] = document
+    local_hits = len(documents)
+    if shared_keys:
+        for key, document in get_shared_cache().get_many(
+            shared_keys
+        ).items():
+            local_fragments.set(key, document)
+            documents[shared_keys[key]] = document
+    count(
+        local_hits=local_hits,
+        shared_hits=len(documents) - local_hits,
+        misses=len(recipe_ids) - len(documents),
+    )
+    return documents, versions
+
+
+def set_fragments(documents, versions):
+    """Сохраняет документы, загруженные из базы, в оба уровня кэша."""
+    if not versions:
+        return
+    fragments = {}
+    for pk, document in documents.items():
+        if pk in versions:
+            key = get_fragment_key(pk, versions[pk])
+            local_fragments.set(key, document)
+            fragments[key] = document
+    get_shared_cache().set_many(
+        fragments, settings.RECIPE_FRAGMENT_CACHE['TIMEOUT']
+    )
+
+
+def get_fragment_stats():
+    """Счётчики попаданий текущего процесса."""
+    with _stats_lock:
+        stats = dict(_stats)
+    requests = sum(stats.values())
+    stats['hit_ratio'] = (
+        round((requests - stats.get('misses', 0)) / requests, 4)
+        if requests else None
+    )
+    return stats
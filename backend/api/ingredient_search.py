@@ -0,0 +1,215 @@
+"""
+Поиск ингредиентов по названию с учётом опечаток.
+
+Результаты ранжируются: сначала названия, начинающиеся с запроса, затем
+те, где с запроса начинается одно из слов, затем содержащие его где-то
+внутри и, наконец, похожие по триграммам (опечатки, пропущенные буквы).
+Похожесть считается как в pg_trgm: слова дополняются пробелами (два в
+начале, один в конце) и режутся на тройки символов; similarity — доля
+общих триграмм всего названия, word_similarity — лучшая доля для
+непрерывного куска названия, поэтому короткий запрос находит длинное
+название. Пороги — значения pg_trgm по умолчанию.
+
+На PostgreSQL всё делает один запрос, отбор кандидатов идёт по
+GIN-индексам gin_trgm_ops (миграция recipes 0009). На остальных базах
+ищет индекс триграмм в памяти процесса: каталог — пара тысяч строк, он
+перечитывается при смене версии ингредиентов (api.cache) и не реже раза
+в INGREDIENT_INDEX_REBUILD_INTERVAL секунд.
+"""
+import re
+import threading
+from collections import Counter, defaultdict
+from time import monotonic
+
+from django.conf import settings
+from django.contrib.postgres.lookups import TrigramSimilar, TrigramWordSimilar
+from django.contrib.postgres.search import (
+    TrigramSimilarity, TrigramWordSimilarity
+)
+from django.db import connections
+from django.db.models import Case, F, IntegerField, Q, Value, When
+from django.db.models.functions import Greatest, Length
+
+from api.cache import get_ingredients_version
+from recipes.models import Ingredient
+
+SIMILARITY_THRESHOLD = 0.3
+WORD_SIMILARITY_THRESHOLD = 0.6
+INGREDIENT_INDEX_REBUILD_INTERVAL = 600
+# Ранги совпадений, от лучшего
+PREFIX, WORD_PREFIX, SUBSTRING, SIMILAR = range(4)
+
+# Разделители слов в pg_trgm — всё, кроме букв и цифр
+WORD_RE = re.compile(r'[^\W_]+')
+
+
+def get_trigrams(text):
+    """Триграммы строки по порядку (с повторами), как их строит pg_trgm."""
+    trigrams = []
+    for word in WORD_RE.findall(text.lower()):
+        padded = f'  {word} '
+        trigrams.extend(
+            padded[start:start + 3] for start in range(len(padded) - 2)
+        )
+    return trigrams
+
+
+def word_similarity(query_trigrams, trigrams):
+    """
+    Лучшая похожесть запроса на непрерывный кусок `trigrams`. Кусок
+    выгодно начинать и заканчивать триграммами запроса, перебираются
+    только такие.
+    """
+    size = len(query_trigrams)
+    positions = [
+        index for index, trigram in enumerate(trigrams)
+        if trigram in query_trigrams
+    ]
+    best = 0
+    for start_index, start in enumerate(positions):
+        extent = set()
+        end = start
+        for stop in positions[start_index:]:
+            extent.update(trigrams[end:stop + 1])
+            end = stop + 1
+            shared = len(extent & query_trigrams)
+            best = max(best, shared / (size + len(extent) - shared))
+    return best
+
+
+class TrigramIndex:
+    """Неизменяемый индекс каталога: пересобирается целиком."""
+
+    def __init__(self, ingredients):
+        self.ids = []
+        self.names = []  # в нижнем регистре
+        self.trigrams = []  # по порядку, для word_similarity
+        self.sizes = []  # число разных триграмм названия
+        self.postings = defaultdict(list)  # триграмма -> номера названий
+        for position, (ingredient_id, name) in enumerate(ingredients):
+            trigrams = get_trigrams(name)
+            self.ids.append(ingredient_id)
+            self.names.append(name.lower())
+            self.trigrams.append(trigrams)
+            self.sizes.append(len(set(trigrams)))
+            for trigram in set(trigrams):
+                self.postings[trigram].append(position)
+
+    def search(self, query, limit):
+        """id ингредиентов по убыванию релевантности, не больше `limit`."""
+        query = query.lower()
+        word_start = f' {query}'
+        # (ранг, -похожесть, длина, название, номер): при равных
+        # ранге и похожести короткие названия — более общие — выше
+        found = []
+        for position, name in enumerate(self.names):
+            if query in name:
+                rank = (
+                    PREFIX if name.startswith(query)
+                    else WORD_PREFIX if word_start in name
+                    else SUBSTRING
+                )
+                found.append((rank, 0, len(name), name, position))
+        if len(found) < limit:
+            found.extend(self.search_similar(
+                query, {position for *_, position in found}
+            ))
+        found.sort()
+        return [self.ids[position] for *_, position in found[:limit]]
+
+    def search_similar(self, query, skipped):
+        query_trigrams = set(get_trigrams(query))
+        if not query_trigrams:
+            return []
+        size = len(query_trigrams)
+        shared = Counter()
+        for trigram in query_trigrams:
+            shared.update(self.postings.get(trigram, ()))
+        found = []
+        for position, count in shared.items():
+            # Обе похожести не больше доли общих триграмм в запросе
+            if position in skipped or count < size * SIMILARITY_THRESHOLD:
+                continue
+            similarity = count / (size + self.sizes[position] - count)
+            word_score = word_similarity(
+                query_trigrams, self.trigrams[position]
+            )
+            if (
+                similarity < SIMILARITY_THRESHOLD
+                and word_score < WORD_SIMILARITY_THRESHOLD
+            ):
+                continue
+            name = self.names[position]
+            found.append((
+                SIMILAR, -max(similarity, word_score), len(name), name,
+                position,
+            ))
+        return found
+
+
+class IngredientIndex:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.index = None
+        self.version = None
+        self.built_at = None
+
+    def get(self):
+        version = get_ingredients_version()
+        with self.lock:
+            if (
+                self.index is None
+                or version != self.version
+                or monotonic() - self.built_at
+                > INGREDIENT_INDEX_REBUILD_INTERVAL
+            ):
+                self.index = TrigramIndex(
+                    Ingredient.objects.values_list('pk', 'name')
+                )
+                self.version = version
+                self.built_at = monotonic()
+            return self.index
+
+
+ingredient_index = IngredientIndex()
+
+
+def search_postgresql(queryset, query):
+    contains = Q(name__icontains=query)
+    return queryset.annotate(
+        search_rank=Case(
+            When(name__istartswith=query, then=Value(PREFIX)),
+            When(name__icontains=f' {query}', then=Value(WORD_PREFIX)),
+            When(contains, then=Value(SUBSTRING)),
+            default=Value(SIMILAR),
+            output_field=IntegerField(),
+        ),
+        search_score=Greatest(
+            TrigramSimilarity('name', query),
+            TrigramWordSimilarity(query, 'name'),
+        ),
+    ).filter(
+        # Все три условия ускоряют индексы gin_trgm_ops (icontains — это
+        # UPPER(name) LIKE), пороги похожести — настройки
+        # pg_trgm.similarity_threshold и word_similarity_threshold
+        contains
+        | Q(TrigramSimilar(F('name'), Value(query)))
+        | Q(TrigramWordSimilar(F('name'), Value(query)))
+    ).order_by('search_rank', '-search_score', Length('name'), 'name')
+
+
+def search_ingredients(queryset, query, limit=None):
+    """Ингредиенты из `queryset`, подходящие под запрос, по релевантности."""
+    query = query.strip()
+    if not query:
+        return queryset
+    limit = limit or settings.INGREDIENT_SEARCH_LIMIT
+    if connections[queryset.db].vendor == 'postgresql':
+        return search_postgresql(queryset, query)[:limit]
+    ids = ingredient_index.get().search(query, limit)
+    if not ids:
+        return queryset.none()
+    return queryset.filter(pk__in=ids).order_by(Case(
+        *(When(pk=pk, then=Value(order)) for order, pk in enumerate(ids)),
+        output_field=IntegerField(),
+    ))
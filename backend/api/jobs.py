@@ -0,0 +1,314 @@
+"""
+Фоновые задачи в таблице api_job, без отдельного брокера.
+
+Функция-задача регистрируется декоратором `task`, а `enqueue` добавляет
+её запуск в очередь в текущей транзакции: задача появится у воркеров
+только вместе с изменениями, ради которых поставлена. Выполняют задачи
+потоки команды run_worker.
+
+Воркер забирает задачу одним коротким запросом. На PostgreSQL это
+SELECT ... FOR UPDATE SKIP LOCKED: воркеры не ждут друг друга и не
+получают одну задачу дважды. SQLite не умеет блокировать строки, но
+выполняет записи по очереди, поэтому задача достаётся тому, чей UPDATE
+с проверкой статуса изменил строку.
+
+Транзакциями задача управляет сама, поэтому повторный запуск после
+частичного выполнения должен быть безопасен. Упавшая задача
+повторяется с экспоненциальной задержкой, пока не исчерпает попытки.
+Задача, которая выполняется дольше JOBS['TIMEOUT'] (воркер упал или
+завис), снова считается готовой к запуску. У каждой выполненной задачи
+сохраняются ожидание в очереди и время выполнения, сводку по ним
+отдаёт get_job_stats.
+"""
+import logging
+import os
+import random
+import socket
+import threading
+import traceback
+from collections import defaultdict
+from datetime import timedelta
+from time import monotonic, perf_counter
+
+from django.conf import settings
+from django.db import (
+    DatabaseError, close_old_connections, connections, transaction
+)
+from django.db.models import Count, F, Min, Q
+from django.utils import timezone
+
+from api.models import Job
+
+logger = logging.getLogger(__name__)
+
+# Имя задачи -> функция
+TASKS = {}
+# Из скольких готовых задач выбирать на SQLite, если первые уже заняты
+CLAIM_CANDIDATES = 10
+STATS_WINDOW = timedelta(hours=1)
+STATS_LIMIT = 10000
+PURGE_INTERVAL = 3600
+
+
+def task(func):
+    """Регистрирует функцию как задачу; аргументы должны быть JSON."""
+    func.job_name = f'{func.__module__}.{func.__name__}'
+    TASKS[func.job_name] = func
+    return func
+
+
+def enqueue(func, *args, delay=None, max_attempts=None, unique=False):
+    """
+    Ставит задачу в очередь. С `unique` не добавляет вторую такую же
+    (то же имя и аргументы), если первая ещё ждёт запуска.
+    """
+    if func.job_name not in TASKS:
+        raise LookupError(f'{func.job_name} не зарегистрирована как задача')
+    args = list(args)
+    if unique and Job.objects.filter(
+        name=func.job_name, args=args, status=Job.QUEUED
+    ).exists():
+        return None
+    job = Job.objects.create(
+        name=func.job_name,
+        args=args,
+        run_at=timezone.now() + (delay or timedelta()),
+        max_attempts=max_attempts or settings.JOBS['MAX_ATTEMPTS'],
+    )
+    if settings.JOBS['EAGER']:
+        # Без воркера (разработка): сразу после коммита в этом процессе
+        transaction.on_commit(lambda: run_job(job.pk, 'eager'))
+    return job
+
+
+def get_ready_jobs(now):
+    return Job.objects.filter(
+        Q(status=Job.QUEUED, run_at__lte=now)
+        | Q(
+            status=Job.RUNNING,
+            started_at__lt=now - timedelta(seconds=settings.JOBS['TIMEOUT']),
+        )
+    ).order_by('run_at', 'pk')
+
+
+def mark_claimed(job, worker, now):
+    job.status = Job.RUNNING
+    job.attempts += 1
+    job.started_at = now
+    job.worker = worker
+
+
+def claim_job(worker):
+    """Забирает следующую готовую задачу или возвращает None."""
+    now = timezone.now()
+    ready = get_ready_jobs(now)
+    if connections[Job.objects.db].features.has_select_for_update_skip_locked:
+        with transaction.atomic():
+            job = ready.select_for_update(skip_locked=True).first()
+            if job is None:
+                return None
+            mark_claimed(job, worker, now)
+            job.save(update_fields=(
+                'status', 'attempts', 'started_at', 'worker'
+            ))
+            return job
+    for job in ready[:CLAIM_CANDIDATES]:
+        claimed = Job.objects.filter(
+            pk=job.pk, status=job.status, attempts=job.attempts
+        ).update(
+            status=Job.RUNNING, attempts=F('attempts') + 1,
+            started_at=now, worker=worker,
+        )
+        if claimed:
+            mark_claimed(job, worker, now)
+            return job
+    return None
+
+
+def get_retry_delay(attempts):
+    """Экспоненциальная задержка с разбросом, чтобы повторы не совпадали."""
+    delay = min(
+        settings.JOBS['RETRY_DELAY'] * 2 ** (attempts - 1),
+        settings.JOBS['MAX_RETRY_DELAY'],
+    )
+    return timedelta(seconds=delay * random.uniform(1, 1.25))
+
+
+def finish_job(job, **fields):
+    """Записывает итог, если задачу за это время не забрал другой воркер."""
+    if fields['status'] != Job.QUEUED:
+        fields['finished_at'] = timezone.now()
+    return Job.objects.filter(
+        pk=job.pk, worker=job.worker, attempts=job.attempts
+    ).update(**fields)
+
+
+def execute_job(job):
+    """Выполняет забранную задачу и записывает результат."""
+    wait_ms = (job.started_at - job.run_at).total_seconds() * 1000
+    func = TASKS.get(job.name)
+    if job.attempts > job.max_attempts:
+        # Забрана повторно после JOBS['TIMEOUT'] на последней попытке
+        error = 'Превышено время выполнения'
+    elif func is None:
+        error = f'Неизвестная задача {job.name}'
+    else:
+        started = perf_counter()
+        try:
+            func(*job.args)
+        except Exception:
+            error = traceback.format_exc()
+            logger.exception('Задача %s #%s упала', job.name, job.pk)
+        else:
+            duration_ms = (perf_counter() - started) * 1000
+            finish_job(
+                job, status=Job.DONE, wait_ms=wait_ms,
+                duration_ms=duration_ms, error='',
+            )
+            logger.info(
+                'Задача %s #%s: ожидание %.0f мс, выполнение %.0f мс',
+                job.name, job.pk, wait_ms, duration_ms,
+            )
+            return True
+    if func is not None and job.attempts < job.max_attempts:
+        finish_job(
+            job, status=Job.QUEUED, error=error,
+            run_at=timezone.now() + get_retry_delay(job.attempts),
+        )
+    else:
+        finish_job(job, status=Job.FAILED, wait_ms=wait_ms, error=error)
+    return False
+
+
+def run_job(pk, worker):
+    """Выполняет задачу `pk` в этом процессе, если её никто не забрал."""
+    job = Job.objects.filter(pk=pk, status=Job.QUEUED).first()
+    if job is None:
+        return
+    now = timezone.now()
+    if Job.objects.filter(pk=pk, status=Job.QUEUED).update(
+        status=Job.RUNNING, attempts=F('attempts') + 1,
+        started_at=now, worker=worker,
+    ):
+        mark_claimed(job, worker, now)
+        execute_job(job)
+
+
+def purge_jobs():
+    """Удаляет выполненные задачи старше JOBS['KEEP_DONE_HOURS']."""
+    deleted, _ = Job.objects.filter(
+        status=Job.DONE,
+        finished_at__lt=timezone.now() - timedelta(
+            hours=settings.JOBS['KEEP_DONE_HOURS']
+        ),
+    ).delete()
+    return deleted
+
+
+def percentile(values, share):
+    return values[min(len(values) - 1, int(len(values) * share))]
+
+
+def get_job_stats():
+    """
+    По каждой задаче: число задач по статусам, задержка самой старой
+    готовой к запуску (с) и перцентили ожидания и выполнения (мс)
+    выполненных за последний час.
+    """
+    now = timezone.now()
+    stats = defaultdict(lambda: {
+        'counts': dict.fromkeys((status for status, _ in Job.STATUSES), 0)
+    })
+    for name, status, count in Job.objects.order_by().values_list(
+        'name', 'status'
+    ).annotate(count=Count('pk')):
+        stats[name]['counts'][status] = count
+    for name, oldest in Job.objects.filter(
+        status=Job.QUEUED, run_at__lte=now
+    ).order_by().values_list('name').annotate(oldest=Min('run_at')):
+        stats[name]['lag'] = (now - oldest).total_seconds()
+    timings = defaultdict(lambda: ([], []))
+    for name, wait_ms, duration_ms in Job.objects.filter(
+        status=Job.DONE, finished_at__gte=now - STATS_WINDOW
+    ).order_by('-finished_at').values_list(
+        'name', 'wait_ms', 'duration_ms'
+    )[:STATS_LIMIT]:
+        timings[name][0].append(wait_ms)
+        timings[name][1].append(duration_ms)
+    for name, values in timings.items():
+        for key, series in zip(('wait_ms', 'duration_ms'), values):
+            series.sort()
+            stats[name][key] = {
+                'p50': percentile(series, 0.5),
+                'p95': percentile(series, 0.95),
+                'max': series[-1],
+            }
+    return dict(stats)
+
+
+class Worker:
+    """
+    Потоки, выполняющие задачи из очереди. `burst` — выйти, когда готовых
+    задач не осталось, иначе работать до вызова stop().
+    """
+
+    def __init__(self, concurrency, burst=False):
+        self.concurrency = concurrency
+        self.burst = burst
+        self.stopping = threading.Event()
+        self.name = f'{socket.gethostname()}:{os.getpid()}'
+        self.done = self.failed = 0
+        self.counters_lock = threading.Lock()
+
+    def stop(self):
+        self.stopping.set()
+
+    def run_thread(self, number):
+        worker = f'{self.name}/{number}'
+        try:
+            while not self.stopping.is_set():
+                close_old_connections()
+                try:
+                    job = claim_job(worker)
+                    succeeded = job is not None and execute_job(job)
+                except DatabaseError:
+                    # База недоступна или занята: задача, если её успели
+                    # забрать, вернётся в очередь через JOBS['TIMEOUT']
+                    logger.exception('Ошибка базы в воркере %s', worker)
+                    self.stopping.wait(settings.JOBS['POLL_INTERVAL'])
+                    continue
+                if job is None:
+                    if self.burst:
+                        return
+                    self.stopping.wait(settings.JOBS['POLL_INTERVAL'])
+                    continue
+                with self.counters_lock:
+                    if succeeded:
+                        self.done += 1
+                    else:
+                        self.failed += 1
+        finally:
+            connections.close_all()
+
+    def run(self):
+        threads = [
+            threading.Thread(
+                target=self.run_thread, args=(number,),
+                name=f'job-worker-{number}', daemon=True,
+            )
+            for number in range(1, self.concurrency + 1)
+        ]
+        for thread in threads:
+            thread.start()
+        next_purge = monotonic()
+        while True:
+            alive = [thread for thread in threads if thread.is_alive()]
+            if not alive:
+                break
+            if not self.burst and monotonic() >= next_purge:
+                purged = purge_jobs()
+                if purged:
+                    logger.info('Удалено выполненных задач: %s', purged)
+                connections.close_all()
+                next_purge = monotonic() + PURGE_INTERVAL
+            alive[0].join(1)
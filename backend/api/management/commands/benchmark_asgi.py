@@ -0,0 +1,178 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from time import perf_counter
+
+from asgiref.sync import ThreadSensitiveContext, async_to_sync, sync_to_async
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections, transaction
+from django.test import AsyncClient, Client, override_settings
+from rest_framework.authtoken.models import Token
+
+from api.cache import bump_recipes_version
+from api.management.commands.benchmark_recipe_serializers import (
+    Command as SerializerBenchmark
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Создаёт N рецептов и сравнивает время одних и тех же запросов к '
+        'рецептам через синхронные вьюсеты (WSGI) и асинхронные '
+        'представления (ASGI, foodgram.urls_asgi): для анонима и '
+        'пользователя, полный ответ и 304 по If-None-Match. С '
+        '--concurrency больше 1 одновременно выполняется столько '
+        'запросов: под WSGI в потоках, под ASGI в корутинах, у каждой из '
+        'которых свой поток для синхронного кода, как у ASGIHandler.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--recipes', type=int, default=100)
+        parser.add_argument('--iterations', type=int, default=50)
+        parser.add_argument('--concurrency', type=int, default=1)
+
+    def measure_wsgi(self, url, headers, iterations, concurrency):
+        def run(count):
+            client = Client()
+            try:
+                for _ in range(count):
+                    response = client.get(url, headers=headers)
+                return response
+            finally:
+                if concurrency > 1:
+                    connections.close_all()
+
+        started = perf_counter()
+        if concurrency == 1:
+            response = run(iterations)
+        else:
+            with ThreadPoolExecutor(concurrency) as executor:
+                response, *_ = executor.map(
+                    run, self.split(iterations, concurrency)
+                )
+        return response, (perf_counter() - started) / iterations
+
+    @async_to_sync
+    async def measure_asgi(self, url, headers, iterations, concurrency):
+        client = AsyncClient()
+
+        async def run(count):
+            for _ in range(count):
+                response = await client.get(url, headers=headers)
+            return response
+
+        async def run_in_context(count):
+            # Синхронный код корутины — в своём потоке и соединении
+            async with ThreadSensitiveContext():
+                response = await run(count)
+                await sync_to_async(connections.close_all)()
+            return response
+
+        started = perf_counter()
+        if concurrency == 1:
+            # В потоке команды, где открыта транзакция с данными замера
+            response = await run(iterations)
+        else:
+            response, *_ = await asyncio.gather(*(
+                run_in_context(count)
+                for count in self.split(iterations, concurrency)
+            ))
+        return response, (perf_counter() - started) / iterations
+
+    def split(self, iterations, concurrency):
+        """Запросы поровну между одновременными клиентами."""
+        return [
+            iterations // concurrency + (index < iterations % concurrency)
+            for index in range(concurrency)
+        ]
+
+    @contextmanager
+    def benchmark_data(self, recipes, concurrency):
+        """
+        Пользователь с N рецептами. Для одного клиента данные живут во
+        временной транзакции. Одновременные клиенты работают в других
+        потоках со своими соединениями и чужой транзакции не видят,
+        поэтому тогда данные записываются в базу и удаляются после замера.
+        """
+        benchmark = SerializerBenchmark()
+        try:
+            if concurrency == 1:
+                with transaction.atomic():
+                    yield benchmark.create_data(recipes)
+                    transaction.set_rollback(True)
+            else:
+                with transaction.atomic():
+                    user = benchmark.create_data(recipes)
+                yield user
+        finally:
+            if concurrency > 1:
+                benchmark.delete_data()
+            # Кэш ответов не должен отдавать рецепты замера
+            bump_recipes_version()
+
+    def handle(self, *args, **options):
+        # AsyncClient всегда передаёт Host: testserver
+        with override_settings(
+            ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']
+        ):
+            self.compare(
+                options['recipes'], options['iterations'],
+                max(1, options['concurrency']),
+            )
+
+    def compare(self, recipes, iterations, concurrency):
+        self.stdout.write(
+            'Кэш анонимных ответов '
+            + ('включён' if settings.RECIPE_RESPONSE_CACHE['ENABLED']
+               else 'выключен (нет общего CACHE_BACKEND)')
+            + f'; одновременных запросов: {concurrency}'
+        )
+        with self.benchmark_data(recipes, concurrency) as user:
+            token = Token.objects.create(user=user)
+            recipe_id = user.recipes.values_list('pk', flat=True)[0]
+            for title, headers in (
+                ('аноним', {}),
+                ('пользователь', {'Authorization': f'Token {token}'}),
+            ):
+                for url in (
+                    '/api/recipes/?limit=50', f'/api/recipes/{recipe_id}/'
+                ):
+                    self.compare_url(
+                        title, url, headers, iterations, concurrency
+                    )
+
+    def compare_url(self, title, url, headers, iterations, concurrency):
+        wsgi, wsgi_time = self.measure_wsgi(
+            url, headers, iterations, concurrency
+        )
+        with override_settings(ROOT_URLCONF='foodgram.urls_asgi'):
+            asgi, asgi_time = self.measure_asgi(
+                url, headers, iterations, concurrency
+            )
+            not_modified, not_modified_time = self.measure_asgi(
+                url, {**headers, 'If-None-Match': wsgi['ETag']},
+                iterations, concurrency,
+            )
+        _, wsgi_not_modified_time = self.measure_wsgi(
+            url, {**headers, 'If-None-Match': asgi['ETag']},
+            iterations, concurrency,
+        )
+        same = (
+            wsgi.content == asgi.content
+            and wsgi['ETag'] == asgi['ETag']
+            and not_modified.status_code == 304
+        )
+        full = self.format_time(wsgi_time, asgi_time)
+        short = self.format_time(wsgi_not_modified_time, not_modified_time)
+        self.stdout.write(
+            f'{title} {url}: {full}; 304: {short}'
+            + ('' if same else ' — ответы различаются!')
+        )
+
+    def format_time(self, wsgi_time, asgi_time):
+        """Время на запрос и запросов в секунду: WSGI | ASGI."""
+        return ' | '.join(
+            f'{name} {seconds * 1000:.2f} мс ({1 / seconds:.0f} в с)'
+            for name, seconds in (('WSGI', wsgi_time), ('ASGI', asgi_time))
+        )
@@ -0,0 +1,59 @@
+from time import perf_counter
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from api.management.commands.benchmark_recipe_serializers import (
+    Command as SerializerBenchmark
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Создаёт во временной транзакции N рецептов и сравнивает запросы '
+        'страницы рецепта (рецепт, теги, ингредиенты, текущий пользователь) '
+        'по отдельности и одним /api/batch/. Запросы идут в процессе, без '
+        'сети и nginx, поэтому экономия на них здесь не видна. Подзапросы '
+        'выполняются по очереди: данные транзакции не видны другим потокам.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--recipes', type=int, default=100)
+        parser.add_argument('--iterations', type=int, default=50)
+
+    def measure(self, send, iterations):
+        started = perf_counter()
+        for _ in range(iterations):
+            send()
+        return (perf_counter() - started) / iterations * 1000
+
+    def handle(self, *args, **options):
+        iterations = options['iterations']
+        host = next(filter(None, settings.ALLOWED_HOSTS), 'localhost')
+        with transaction.atomic():
+            user = SerializerBenchmark().create_data(options['recipes'])
+            client = APIClient(SERVER_NAME=host)
+            client.credentials(
+                HTTP_AUTHORIZATION=f'Token {Token.objects.create(user=user)}'
+            )
+            recipe_id = user.recipes.values_list('pk', flat=True)[0]
+            paths = [
+                f'/api/recipes/{recipe_id}/', '/api/tags/',
+                '/api/ingredients/?name=a', '/api/users/me/',
+            ]
+            separate = self.measure(
+                lambda: [client.get(path) for path in paths], iterations
+            )
+            batch = {'requests': [{'path': path} for path in paths]}
+            batched = self.measure(
+                lambda: client.post('/api/batch/', batch, format='json'),
+                iterations,
+            )
+            self.stdout.write(
+                f'{len(paths)} запроса по отдельности {separate:.2f} мс, '
+                f'одним пакетом {batched:.2f} мс'
+            )
+            transaction.set_rollback(True)
@@ -0,0 +1,60 @@
+from time import perf_counter
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from api.management.commands.benchmark_recipe_serializers import (
+    Command as SerializerBenchmark
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Создаёт во временной транзакции N рецептов и сравнивает повторные '
+        'запросы списка и рецепта с If-None-Match и без него: байты ответа '
+        'и время на запрос, для анонима и пользователя.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--recipes', type=int, default=100)
+        parser.add_argument('--iterations', type=int, default=50)
+
+    def measure(self, client, url, iterations, headers=None):
+        started = perf_counter()
+        for _ in range(iterations):
+            response = client.get(url, headers=headers)
+        elapsed = (perf_counter() - started) / iterations
+        return response, elapsed
+
+    def handle(self, *args, **options):
+        iterations = options['iterations']
+        host = next(filter(None, settings.ALLOWED_HOSTS), 'localhost')
+        with transaction.atomic():
+            user = SerializerBenchmark().create_data(options['recipes'])
+            authenticated = APIClient(SERVER_NAME=host)
+            authenticated.credentials(
+                HTTP_AUTHORIZATION=f'Token {Token.objects.create(user=user)}'
+            )
+            anonymous = APIClient(SERVER_NAME=host)
+            recipe_id = user.recipes.values_list('pk', flat=True)[0]
+            for title, client in (
+                ('аноним', anonymous), ('пользователь', authenticated)
+            ):
+                for url in (
+                    '/api/recipes/?limit=50', f'/api/recipes/{recipe_id}/'
+                ):
+                    full, full_time = self.measure(client, url, iterations)
+                    cached, cached_time = self.measure(
+                        client, url, iterations,
+                        headers={'If-None-Match': full['ETag']},
+                    )
+                    self.stdout.write(
+                        f'{title} {url}: {len(full.content)} байт за '
+                        f'{full_time * 1000:.2f} мс -> {cached.status_code}, '
+                        f'{len(cached.content)} байт за '
+                        f'{cached_time * 1000:.2f} мс'
+                    )
+            transaction.set_rollback(True)
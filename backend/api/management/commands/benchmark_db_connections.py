@@ -0,0 +1,57 @@
+import statistics
+from time import perf_counter
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+POOL_ENGINE = 'foodgram.db.postgresql_pool'
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает время простого запроса к БД, когда соединение '
+        'закрывается после каждого запроса (как при CONN_MAX_AGE=0), '
+        'и когда оно остаётся открытым. Разница — стоимость установки '
+        'соединения, которую убирает пул (foodgram.db.postgresql_pool).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=200)
+        parser.add_argument('--database', default='default')
+
+    def measure(self, connection, iterations, reconnect):
+        timings = []
+        for _ in range(iterations):
+            started = perf_counter()
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT 1')
+                cursor.fetchone()
+            if reconnect:
+                connection.close()
+            timings.append((perf_counter() - started) * 1000)
+        connection.close()
+        return timings
+
+    def report(self, title, timings):
+        timings = sorted(timings)
+        self.stdout.write(
+            f'{title}: среднее {statistics.mean(timings):.3f} мс, '
+            f'p50 {timings[len(timings) // 2]:.3f} мс, '
+            f'p95 {timings[int(len(timings) * 0.95)]:.3f} мс'
+        )
+
+    def handle(self, *args, **options):
+        connection = connections[options['database']]
+        iterations = options['iterations']
+        self.stdout.write(f'Бэкенд: {connection.settings_dict["ENGINE"]}')
+        self.report(
+            'С закрытием соединения',
+            self.measure(connection, iterations, reconnect=True)
+        )
+        self.report(
+            'Постоянное соединение',
+            self.measure(connection, iterations, reconnect=False)
+        )
+        if connection.settings_dict['ENGINE'] == POOL_ENGINE:
+            from foodgram.db.postgresql_pool.base import get_pool_stats
+            self.stdout.write(f'Пулы: {get_pool_stats()}')
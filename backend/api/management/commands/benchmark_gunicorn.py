@@ -0,0 +1,121 @@
+import os
+import socket
+import subprocess
+import sys
+import time
+from pathlib import Path
+from urllib.request import Request, urlopen
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+CONFIG = Path(settings.BASE_DIR) / 'gunicorn.conf.py'
+
+
+def get_free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def wait_for_port(port, timeout=60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(('127.0.0.1', port), 0.1).close()
+            return
+        except OSError:
+            time.sleep(0.02)
+    raise TimeoutError(f'Порт {port} не открылся за {timeout} с')
+
+
+def get_children(pid):
+    path = Path(f'/proc/{pid}/task/{pid}/children')
+    return [int(child) for child in path.read_text().split()]
+
+
+def get_memory(pid):
+    """RSS, PSS и собственная память процесса (КБ) из smaps_rollup."""
+    values = {}
+    for line in Path(f'/proc/{pid}/smaps_rollup').read_text().splitlines():
+        name, _, rest = line.partition(':')
+        if rest.strip().endswith('kB'):
+            values[name] = int(rest.split()[0])
+    return (
+        values['Rss'], values['Pss'],
+        values['Private_Clean'] + values['Private_Dirty'],
+    )
+
+
+class Command(BaseCommand):
+    help = (
+        'Запускает gunicorn в прежнем режиме (без preload и прогрева) и с '
+        'gunicorn.conf.py и сравнивает время первого запроса после '
+        'открытия порта и память воркеров (RSS, PSS и собственную). '
+        'Память читается из /proc, поэтому команда работает только в Linux.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=2)
+        parser.add_argument('--path', default='/api/recipes/')
+        parser.add_argument('--requests', type=int, default=20)
+
+    def request(self, port, path):
+        started = time.perf_counter()
+        request = Request(
+            f'http://127.0.0.1:{port}{path}',
+            headers={'Host': 'localhost'},
+        )
+        with urlopen(request, timeout=30) as response:
+            response.read()
+        return (time.perf_counter() - started) * 1000
+
+    def run(self, title, args, env, options):
+        port = get_free_port()
+        process = subprocess.Popen(
+            [
+                sys.executable, '-m', 'gunicorn',
+                '--bind', f'127.0.0.1:{port}', *args,
+            ],
+            cwd=settings.BASE_DIR, env={**os.environ, **env},
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        try:
+            launched = time.perf_counter()
+            wait_for_port(port)
+            opened = time.perf_counter()
+            first = self.request(port, options['path'])
+            for _ in range(options['requests']):
+                self.request(port, options['path'])
+            memory = [get_memory(pid) for pid in get_children(process.pid)]
+        finally:
+            process.terminate()
+            process.wait()
+        rss, pss, private = (
+            sum(values) / len(memory) / 1024 for values in zip(*memory)
+        )
+        self.stdout.write(
+            f'{title}: порт через {(opened - launched) * 1000:.0f} мс, '
+            f'первый запрос {first:.0f} мс; на воркер RSS {rss:.1f} МБ, '
+            f'PSS {pss:.1f} МБ, собственная {private:.1f} МБ'
+        )
+
+    def handle(self, *args, **options):
+        workers = str(options['workers'])
+        self.run(
+            'Без конфигурации',
+            # Прежний CMD из Dockerfile; пустой конфиг вместо
+            # gunicorn.conf.py, который иначе подхватывается из каталога
+            [
+                '-c', os.devnull, '--threads', '4',
+                '--workers', workers, 'foodgram.wsgi',
+            ],
+            {},
+            options,
+        )
+        self.run(
+            'gunicorn.conf.py',
+            ['-c', str(CONFIG)],
+            {'GUNICORN_WORKERS': workers},
+            options,
+        )
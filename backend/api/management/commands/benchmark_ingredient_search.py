@@ -0,0 +1,106 @@
+import csv
+import random
+from time import perf_counter
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from api.ingredient_search import TrigramIndex, search_ingredients
+from recipes.models import Ingredient
+
+
+def make_typo(word, rng):
+    """Пропуск, замена или перестановка одной буквы не в начале слова."""
+    position = rng.randrange(1, len(word) - 1)
+    kind = rng.choice(('drop', 'replace', 'swap'))
+    if kind == 'drop':
+        return word[:position] + word[position + 1:]
+    if kind == 'replace':
+        letter = rng.choice('аеиоуыэюя' if word[position] in 'аеиоуыэюя'
+                            else 'бвгджзклмнпрстфхцчшщ')
+        return word[:position] + letter + word[position + 1:]
+    return (
+        word[:position] + word[position + 1] + word[position]
+        + word[position + 2:]
+    )
+
+
+class Command(BaseCommand):
+    help = (
+        'Загружает во временной транзакции каталог ингредиентов из CSV '
+        '(название, единица) и сравнивает прежний фильтр по началу '
+        'названия с ранжированным поиском: время запроса и доля запросов '
+        '(начало слова, слово с опечаткой), для которых нужный ингредиент '
+        'попал в выдачу.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--file',
+            default=settings.BASE_DIR.parent / 'data' / 'ingredients.csv',
+        )
+        parser.add_argument('--queries', type=int, default=300)
+        parser.add_argument('--seed', type=int, default=1)
+
+    def make_queries(self, names, count, rng):
+        """(запрос, ожидаемое название): начала слов и слова с опечаткой."""
+        queries = []
+        for name in rng.sample(names, min(count, len(names))):
+            word = max(name.lower().split(), key=len)
+            if len(word) < 5:
+                continue
+            queries.append(('начало слова', word[:4], name))
+            queries.append(('опечатка', make_typo(word, rng), name))
+        return queries
+
+    def measure(self, search, queries):
+        found = {}
+        started = perf_counter()
+        for kind, query, name in queries:
+            names = list(search(query).values_list('name', flat=True))
+            hits, total = found.get(kind, (0, 0))
+            found[kind] = (hits + (name in names), total + 1)
+        elapsed = (perf_counter() - started) / len(queries) * 1000
+        return elapsed, found
+
+    def handle(self, *args, **options):
+        with open(options['file'], encoding='utf-8') as file:
+            rows = [row for row in csv.reader(file) if len(row) == 2]
+        rng = random.Random(options['seed'])
+        limit = settings.INGREDIENT_SEARCH_LIMIT
+        with transaction.atomic():
+            Ingredient.objects.bulk_create(
+                [Ingredient(name=name, measurement_unit=unit)
+                 for name, unit in rows],
+                ignore_conflicts=True,
+            )
+            names = list(Ingredient.objects.values_list('name', flat=True))
+            started = perf_counter()
+            TrigramIndex(Ingredient.objects.values_list('pk', 'name'))
+            self.stdout.write(
+                f'Каталог: {len(names)} ингредиентов, индекс в памяти '
+                f'строится за {(perf_counter() - started) * 1000:.0f} мс'
+            )
+            queries = self.make_queries(names, options['queries'], rng)
+            queryset = Ingredient.objects.all()
+            for title, search in (
+                (
+                    'istartswith',
+                    lambda query: queryset.filter(name__istartswith=query),
+                ),
+                (
+                    f'поиск (до {limit})',
+                    lambda query: search_ingredients(queryset, query),
+                ),
+            ):
+                search(queries[0][1]).count()  # индекс строится здесь
+                elapsed, found = self.measure(search, queries)
+                found = ', '.join(
+                    f'{kind} {hits / total:.0%}'
+                    for kind, (hits, total) in found.items()
+                )
+                self.stdout.write(
+                    f'{title}: {elapsed:.2f} мс на запрос; найдено: {found}'
+                )
+            transaction.set_rollback(True)
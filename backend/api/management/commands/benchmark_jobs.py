@@ -0,0 +1,81 @@
+from time import perf_counter
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from api.documents import rebuild_documents_for
+from api.jobs import claim_job, enqueue, execute_job
+from api.management.commands.benchmark_recipe_serializers import (
+    Command as SerializerBenchmark
+)
+from api.models import Job
+from api.tasks import rebuild_recipe_documents, update_similar
+from recipes.models import Recipe
+from recipes.utils.similarity import update_similar_recipes
+
+
+class Command(BaseCommand):
+    help = (
+        'Создаёт во временной транзакции N рецептов и сравнивает, сколько '
+        'времени запрос тратит на пересборку документов автора и похожих '
+        'рецептов сразу и на постановку тех же задач в очередь, а также '
+        'накладные расходы очереди на задачу (забрать, записать итог).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--recipes', type=int, default=1000)
+        parser.add_argument('--iterations', type=int, default=20)
+
+    def measure(self, run, iterations):
+        started = perf_counter()
+        for _ in range(iterations):
+            run()
+        return (perf_counter() - started) / iterations * 1000
+
+    def handle(self, *args, **options):
+        iterations = options['iterations']
+        with transaction.atomic():
+            user = SerializerBenchmark().create_data(options['recipes'])
+            recipes = Recipe.objects.filter(author=user)
+            recipe_id = recipes.values_list('pk', flat=True)[0]
+            rows = (
+                (
+                    f'документы {recipes.count()} рецептов автора',
+                    lambda: rebuild_documents_for(recipes),
+                    lambda: enqueue(
+                        rebuild_recipe_documents,
+                        list(recipes.values_list('pk', flat=True)),
+                    ),
+                ),
+                (
+                    'похожие рецепты',
+                    lambda: update_similar_recipes(recipe_id),
+                    lambda: enqueue(update_similar, recipe_id),
+                ),
+            )
+            for name, inline, queued in rows:
+                inline_ms = self.measure(inline, iterations)
+                queued_ms = self.measure(queued, iterations)
+                self.stdout.write(
+                    f'{name}: в запросе {inline_ms:.2f} мс, '
+                    f'в очередь {queued_ms:.2f} мс'
+                )
+
+            started = perf_counter()
+            executed = 0
+            while True:
+                job = claim_job('benchmark')
+                if job is None:
+                    break
+                execute_job(job)
+                executed += 1
+            total = perf_counter() - started
+            task_time = sum(Job.objects.filter(
+                worker='benchmark'
+            ).values_list('duration_ms', flat=True)) / 1000
+            self.stdout.write(
+                f'Выполнено задач: {executed} за {total:.2f} с, из них '
+                f'сами задачи {task_time:.2f} с; очередь на задачу '
+                f'{(total - task_time) / max(executed, 1) * 1000:.2f} мс'
+            )
+            transaction.set_rollback(True)
@@ -0,0 +1,95 @@
+import tracemalloc
+from io import BytesIO
+from time import perf_counter
+
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from api.parsers import ORJSONParser
+from api.renderers import ORJSONRenderer
+
+
+def make_page(size):
+    """Страница списка рецептов того же вида, что отдаёт /api/recipes/."""
+    results = []
+    for recipe_id in range(1, size + 1):
+        results.append({
+            'id': recipe_id,
+            'tags': [
+                {'id': tag_id, 'name': f'Тег {tag_id}', 'slug': f'tag{tag_id}'}
+                for tag_id in range(1, 4)
+            ],
+            'author': {
+                'email': f'user{recipe_id}@example.com',
+                'id': recipe_id,
+                'username': f'user{recipe_id}',
+                'first_name': 'Имя',
+                'last_name': 'Фамилия',
+                'is_subscribed': False,
+                'avatar': f'http://localhost/media/avatars/{recipe_id}.png',
+            },
+            'ingredients': [
+                {
+                    'id': ingredient_id,
+                    'name': f'Ингредиент {ingredient_id}',
+                    'measurement_unit': 'г',
+                    'amount': float(ingredient_id * 10),
+                }
+                for ingredient_id in range(1, 11)
+            ],
+            'is_favorited': False,
+            'is_in_shopping_cart': False,
+            'name': f'Рецепт {recipe_id}',
+            'image': f'http://localhost/media/recipes/images/{recipe_id}.png',
+            'text': 'Описание рецепта. ' * 50,
+            'cooking_time': 30,
+        })
+    return {'count': size, 'next': None, 'previous': None, 'results': results}
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает JSONRenderer/JSONParser DRF и их аналоги на orjson '
+        'по времени и пиковой памяти на странице из N рецептов.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--recipes', type=int, default=100)
+        parser.add_argument('--iterations', type=int, default=200)
+
+    def measure(self, func, iterations):
+        started = perf_counter()
+        for _ in range(iterations):
+            func()
+        elapsed = (perf_counter() - started) / iterations * 1000
+        tracemalloc.start()
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        return elapsed, peak / 1024
+
+    def handle(self, *args, **options):
+        data = make_page(options['recipes'])
+        payload = JSONRenderer().render(data)
+        if ORJSONRenderer().render(data) != payload:
+            raise CommandError('Вывод рендереров различается.')
+        self.stdout.write(
+            f'Страница из {options["recipes"]} рецептов: '
+            f'{len(payload) / 1024:.1f} КБ'
+        )
+        for title, renderer, parser in (
+            ('json', JSONRenderer(), JSONParser()),
+            ('orjson', ORJSONRenderer(), ORJSONParser()),
+        ):
+            render_ms, render_kb = self.measure(
+                lambda: renderer.render(data), options['iterations']
+            )
+            parse_ms, parse_kb = self.measure(
+                lambda: parser.parse(BytesIO(payload)), options['iterations']
+            )
+            self.stdout.write(
+                f'{title:>6}: рендер {render_ms:.3f} мс '
+                f'(пик {render_kb:.0f} КБ), '
+                f'разбор {parse_ms:.3f} мс (пик {parse_kb:.0f} КБ)'
+            )
@@ -0,0 +1,104 @@
+import random
+import tracemalloc
+from time import perf_counter
+
+from django.core.management.base import BaseCommand
+
+from api.pantry import PantryIndex, PantryMatches
+from recipes.constants import PANTRY_DEFAULT_MISSING
+
+
+class Command(BaseCommand):
+    help = (
+        'Измеряет подбор рецептов по продуктам (api.pantry) на '
+        'синтетических данных и сравнивает его с перебором наборов '
+        'ингредиентов всех рецептов. База данных не используется.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--recipes', type=int, default=100000)
+        parser.add_argument('--ingredients', type=int, default=2186)
+        parser.add_argument('--per-recipe', type=int, default=10)
+        parser.add_argument('--pantry', type=int, default=15)
+        parser.add_argument('--queries', type=int, default=50)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def make_recipes(self, generator, options):
+        # Популярность ингредиентов по закону Ципфа: соль есть почти везде
+        ingredients = range(1, options['ingredients'] + 1)
+        weights = [1 / rank for rank in ingredients]
+        per_recipe = options['per_recipe']
+        return {
+            recipe_id: set(generator.choices(
+                ingredients, weights,
+                k=generator.randint(per_recipe // 2, per_recipe * 3 // 2),
+            ))
+            for recipe_id in range(1, options['recipes'] + 1)
+        }
+
+    def scan(self, recipes, pantry, max_missing):
+        """Прямой перебор: то же, что делал бы GROUP BY по связям."""
+        found = []
+        for recipe_id, ingredient_ids in recipes.items():
+            matched = len(ingredient_ids & pantry)
+            missing = len(ingredient_ids) - matched
+            if matched and missing <= max_missing:
+                found.append((missing, -recipe_id))
+        found.sort()
+        return [(-recipe_id, missing) for missing, recipe_id in found]
+
+    def measure(self, function, pantries):
+        started = perf_counter()
+        results = [function(pantry) for pantry in pantries]
+        return (perf_counter() - started) * 1000 / len(pantries), results
+
+    def handle(self, *args, **options):
+        generator = random.Random(options['seed'])
+        recipes = self.make_recipes(generator, options)
+        self.stdout.write(
+            f'Рецептов {len(recipes)}, связей с ингредиентами '
+            f'{sum(map(len, recipes.values()))}'
+        )
+        index = PantryIndex()
+        tracemalloc.start()
+        started = perf_counter()
+        index.load(recipes)
+        built = perf_counter() - started
+        size = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        self.stdout.write(
+            f'Индекс построен за {built:.2f} с, '
+            f'занимает {size / 2 ** 20:.1f} МБ'
+        )
+        # Продукты в кладовой тоже чаще популярные
+        population = range(1, options['ingredients'] + 1)
+        weights = [1 / rank for rank in population]
+        pantries = [
+            set(generator.choices(population, weights, k=options['pantry']))
+            for _ in range(options['queries'])
+        ]
+        max_missing = PANTRY_DEFAULT_MISSING
+        matched_ms, matches = self.measure(
+            lambda pantry: PantryMatches(
+                index.recipe_ids, index.match(pantry, max_missing)
+            ),
+            pantries,
+        )
+        page_ms, _ = self.measure(
+            lambda pantry: PantryMatches(
+                index.recipe_ids, index.match(pantry, max_missing)
+            )[:10],
+            pantries,
+        )
+        scan_ms, scans = self.measure(
+            lambda pantry: self.scan(recipes, pantry, max_missing), pantries
+        )
+        for found, expected in zip(matches, scans):
+            if list(found[:len(found)]) != expected:
+                raise AssertionError('Индекс и перебор разошлись')
+        self.stdout.write(
+            f'Подбор по индексу {matched_ms:.2f} мс, с первой страницей '
+            f'{page_ms:.2f} мс; перебор {scan_ms:.2f} мс '
+            f'(в среднем {sum(map(len, matches)) / len(matches):.0f} '
+            f'рецептов на запрос)'
+        )
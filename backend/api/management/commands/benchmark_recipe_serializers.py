@@ -0,0 +1,137 @@
+from time import process_time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import Q
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+from rest_framework.renderers import JSONRenderer
+
+from api.documents import rebuild_documents_for
+from api.fast_serializers import RecipeFastReadSerializer
+from api.serializers import RecipeReadSerializer
+from recipes.models import Ingredient, Recipe, RecipeIngredient, Tag
+from users.models import Subscription
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        'Создаёт во временной транзакции N рецептов и сравнивает '
+        'процессорное время на рецепт и число запросов у '
+        'RecipeReadSerializer и RecipeFastReadSerializer (совпадение '
+        'их JSON проверяют тесты api).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--recipes', type=int, default=100)
+        parser.add_argument('--iterations', type=int, default=20)
+
+    def create_data(self, count):
+        authors = User.objects.bulk_create(
+            User(
+                email=f'bench{index}@example.com',
+                username=f'bench{index}',
+                first_name='Имя', last_name='Фамилия',
+                avatar=f'avatars/bench{index}.png' if index % 2 else '',
+            )
+            for index in range(10)
+        )
+        tags = Tag.objects.bulk_create(
+            Tag(name=f'bench-tag-{index}', slug=f'bench-tag-{index}')
+            for index in range(3)
+        )
+        ingredients = Ingredient.objects.bulk_create(
+            Ingredient(name=f'bench-ingredient-{index}', measurement_unit='г')
+            for index in range(10)
+        )
+        recipes = Recipe.objects.bulk_create(
+            Recipe(
+                author=authors[index % len(authors)],
+                name=f'Рецепт {index}',
+                image=f'recipes/images/bench{index}.png',
+                text='Описание рецепта. ' * 20,
+                cooking_time=index + 1,
+            )
+            for index in range(count)
+        )
+        Recipe.tags.through.objects.bulk_create(
+            Recipe.tags.through(recipe=recipe, tag=tag)
+            for recipe in recipes for tag in tags[:1 + recipe.id % 3]
+        )
+        RecipeIngredient.objects.bulk_create(
+            RecipeIngredient(recipe=recipe, ingredient=ingredient,
+                             quantity=index + 1)
+            for recipe in recipes
+            for index, ingredient in enumerate(ingredients)
+        )
+        Subscription.objects.create(user=authors[0], subscribed_to=authors[1])
+        return authors[0]
+
+    def delete_data(self):
+        """Удаляет данные create_data, если они записаны вне транзакции."""
+        User.objects.filter(email__in=[
+            f'bench{index}@example.com' for index in range(10)
+        ]).delete()
+        Tag.objects.filter(slug__startswith='bench-tag-').delete()
+        Ingredient.objects.filter(
+            name__startswith='bench-ingredient-'
+        ).delete()
+
+    def get_request(self, user):
+        host = next(filter(None, settings.ALLOWED_HOSTS), 'localhost')
+        request = RequestFactory().get('/api/recipes/', HTTP_HOST=host)
+        request.user = user
+        return request
+
+    def measure(self, serializer_class, queryset, request, iterations):
+        with CaptureQueriesContext(connection) as queries:
+            data = serializer_class(
+                queryset.all(), many=True, context={'request': request}
+            ).data
+        started = process_time()
+        for _ in range(iterations):
+            serializer_class(
+                queryset.all(), many=True, context={'request': request}
+            ).data
+        elapsed = (process_time() - started) / iterations
+        return JSONRenderer().render(data), elapsed, len(queries)
+
+    def handle(self, *args, **options):
+        count = options['recipes']
+        with transaction.atomic():
+            user = self.create_data(count)
+            request = self.get_request(user)
+            bench_recipes = Q(
+                name__startswith='Рецепт', author__username__startswith='bench'
+            )
+            queryset = Recipe.objects.with_user_flags(user).filter(
+                bench_recipes
+            )
+            drf_queryset = queryset.select_related('author').prefetch_related(
+                'tags', 'recipeingredient_set__ingredient'
+            )
+            rebuild_documents_for(queryset)
+            _, drf_time, drf_queries = self.measure(
+                RecipeReadSerializer, drf_queryset, request,
+                options['iterations']
+            )
+            fast_json, fast_time, fast_queries = self.measure(
+                RecipeFastReadSerializer, queryset, request,
+                options['iterations']
+            )
+            transaction.set_rollback(True)
+
+        self.stdout.write(f'Ответ {len(fast_json)} байт.')
+        for title, elapsed, queries in (
+            ('RecipeReadSerializer', drf_time, drf_queries),
+            ('RecipeFastReadSerializer', fast_time, fast_queries),
+        ):
+            self.stdout.write(
+                f'{title}: {elapsed * 1000:.2f} мс на страницу, '
+                f'{elapsed / count * 1e6:.0f} мкс на рецепт, '
+                f'{queries} запросов'
+            )
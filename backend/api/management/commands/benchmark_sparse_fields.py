@@ -0,0 +1,73 @@
+from contextlib import ExitStack
+from time import perf_counter
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections, transaction
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from api.management.commands.benchmark_recipe_serializers import (
+    Command as SerializerBenchmark
+)
+from api.profiling import QueryCounter
+
+# Поля карточки рецепта в списке
+CARD_FIELDS = (
+    'id,name,image,cooking_time,tags.name,tags.slug,'
+    'author.first_name,author.last_name'
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Создаёт во временной транзакции N рецептов и сравнивает страницу '
+        'списка целиком, с полями карточки (?fields=) и без текста и '
+        'ингредиентов (?omit=): байты ответа, время и число запросов к БД '
+        'для пользователя (анонимные ответы кэшируются целиком).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--recipes', type=int, default=100)
+        parser.add_argument('--iterations', type=int, default=50)
+
+    def measure(self, client, url, iterations, rounds=5):
+        """Ответ, число запросов к БД и лучшее из `rounds` среднее время."""
+        queries = QueryCounter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(queries))
+            response = client.get(url)
+        best = None
+        for _ in range(rounds):
+            started = perf_counter()
+            for _ in range(iterations):
+                client.get(url)
+            elapsed = (perf_counter() - started) / iterations
+            best = elapsed if best is None else min(best, elapsed)
+        return response, best, queries.count
+
+    def handle(self, *args, **options):
+        count = options['recipes']
+        host = next(filter(None, settings.ALLOWED_HOSTS), 'localhost')
+        with transaction.atomic():
+            user = SerializerBenchmark().create_data(count)
+            client = APIClient(SERVER_NAME=host)
+            client.credentials(
+                HTTP_AUTHORIZATION=f'Token {Token.objects.create(user=user)}'
+            )
+            base = f'/api/recipes/?limit={count}'
+            for title, url in (
+                ('все поля', base),
+                ('карточка', f'{base}&fields={CARD_FIELDS}'),
+                ('без текста и ингредиентов',
+                 f'{base}&omit=text,ingredients'),
+            ):
+                response, elapsed, queries = self.measure(
+                    client, url, options['iterations']
+                )
+                self.stdout.write(
+                    f'{title}: {len(response.content)} байт, '
+                    f'{elapsed * 1000:.2f} мс, {queries} запросов'
+                )
+            transaction.set_rollback(True)
@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+
+from api.documents import REBUILD_BATCH_SIZE, rebuild_documents_for
+from recipes.models import Recipe
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересобирает документы RecipeDocument всех рецептов (или только '
+        'рецептов без документа) пачками, каждая в своей транзакции.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=REBUILD_BATCH_SIZE
+        )
+        parser.add_argument(
+            '--missing', action='store_true',
+            help='Только рецепты, у которых ещё нет документа.'
+        )
+
+    def handle(self, *args, **options):
+        queryset = Recipe.objects.all()
+        if options['missing']:
+            queryset = queryset.filter(document__isnull=True)
+        rebuilt = rebuild_documents_for(queryset, options['batch_size'])
+        self.stdout.write(
+            self.style.SUCCESS(f'Пересобрано документов: {rebuilt}')
+        )
@@ -0,0 +1,94 @@
+from django.core.management.base import BaseCommand
+
+from api.replay import (
+    SAFE_METHODS, SKIPPED_PATHS, ClientTarget, HttpTarget, get_tokens,
+    load_capture, load_postman, replay, summarize
+)
+from foodgram.warmup import get_warm_up_host
+
+
+class Command(BaseCommand):
+    help = (
+        'Проигрывает запись трафика (TRAFFIC_CAPTURE) или GET-запросы '
+        'Postman-коллекции в этом процессе или на сервере по --url и '
+        'печатает по эндпоинтам запросы в секунду, перцентили времени '
+        'ответа и доли ошибок. Создаёт пользователей для псевдонимов '
+        'из записи: запускайте на копии базы.'
+    )
+
+    def add_arguments(self, parser):
+        source = parser.add_mutually_exclusive_group(required=True)
+        source.add_argument('--file', help='JSONL-файл записи трафика.')
+        source.add_argument('--postman', help='Postman-коллекция.')
+        parser.add_argument(
+            '--url', default=None,
+            help='Адрес сервера, например http://127.0.0.1:8000; без него '
+                 'запросы выполняет тестовый клиент в этом процессе.'
+        )
+        parser.add_argument('--host', default=None)
+        parser.add_argument('--secure', action='store_true')
+        parser.add_argument('--concurrency', type=int, default=4)
+        parser.add_argument(
+            '--rate', type=float, default=0,
+            help='Запросов в секунду на все потоки, 0 — без ограничения.'
+        )
+        parser.add_argument(
+            '--repeat', type=int, default=1,
+            help='Сколько раз проиграть запись подряд.'
+        )
+        parser.add_argument(
+            '--read-only', action='store_true',
+            help='Только GET, HEAD и OPTIONS.'
+        )
+
+    def handle(self, *args, **options):
+        if options['file']:
+            records = load_capture(options['file'])
+        else:
+            records = load_postman(options['postman'])
+        records = [
+            record for record in records
+            if record['path'] not in SKIPPED_PATHS and (
+                not options['read_only'] or record['method'] in SAFE_METHODS
+            )
+        ] * options['repeat']
+        if not records:
+            self.stdout.write(self.style.WARNING('Нет запросов.'))
+            return
+        tokens = get_tokens(
+            {record['identity'] for record in records} - {None}
+        )
+        if options['url']:
+            def make_target():
+                return HttpTarget(options['url'])
+        else:
+            host = options['host'] or get_warm_up_host()
+
+            def make_target():
+                return ClientTarget(host, options['secure'])
+        results, elapsed = replay(
+            records, make_target, tokens,
+            options['concurrency'], options['rate'],
+        )
+        summary = summarize(results, elapsed)
+        self.stdout.write(
+            f'{"Эндпоинт":48} {"запросов":>8} {"в сек":>7} {"p50":>7} '
+            f'{"p95":>7} {"p99":>7} {"max":>7} {"4xx":>5} {"5xx":>5}'
+        )
+        for endpoint, row in sorted(
+            summary.items(), key=lambda item: -item[1]['count']
+        ):
+            self.stdout.write(
+                f'{endpoint:48} {row["count"]:8} {row["rps"]:7.1f} '
+                f'{row["p50"]:7.1f} {row["p95"]:7.1f} {row["p99"]:7.1f} '
+                f'{row["max"]:7.1f} {row["client_errors"]:5.0%} '
+                f'{row["server_errors"]:5.0%}'
+            )
+        total = summary['Всего']
+        style = self.style.WARNING if total['server_errors'] else (
+            self.style.SUCCESS
+        )
+        self.stdout.write(style(
+            f'{total["count"]} запросов за {elapsed:.1f} с, '
+            f'{total["rps"]:.1f} в секунду; время ответа в мс'
+        ))
@@ -0,0 +1,36 @@
+import signal
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from api.jobs import Worker
+
+
+class Command(BaseCommand):
+    help = (
+        'Выполняет фоновые задачи из очереди (api.jobs) в нескольких '
+        'потоках. SIGTERM и SIGINT дожидаются текущих задач.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--concurrency', type=int,
+            default=settings.JOBS['CONCURRENCY'],
+            help='Число потоков (по умолчанию JOBS_CONCURRENCY).'
+        )
+        parser.add_argument(
+            '--burst', action='store_true',
+            help='Выйти, когда в очереди не останется готовых задач.'
+        )
+
+    def handle(self, *args, **options):
+        worker = Worker(max(1, options['concurrency']), options['burst'])
+        for signum in (signal.SIGTERM, signal.SIGINT):
+            signal.signal(signum, lambda *args: worker.stop())
+        self.stdout.write(
+            f'Воркер {worker.name}: потоков {worker.concurrency}'
+        )
+        worker.run()
+        self.stdout.write(self.style.SUCCESS(
+            f'Выполнено задач: {worker.done}, с ошибкой: {worker.failed}'
+        ))
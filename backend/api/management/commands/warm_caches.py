@@ -0,0 +1,68 @@
+from time import perf_counter
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from api.cache_warmup import get_hot_paths, warm_caches
+from foodgram.warmup import get_warm_up_host
+
+
+class Command(BaseCommand):
+    help = (
+        'Прогревает кэш ответов, документы рецептов и буферы базы самыми '
+        'частыми запросами чтения: первые страницы рецептов (без фильтра, '
+        'со всеми тегами и с каждым тегом), популярные рецепты, теги и '
+        'ингредиенты. Запускайте после развёртывания и массовых правок.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--pages', type=int, default=3,
+            help='Сколько первых страниц списка рецептов прогревать.'
+        )
+        parser.add_argument(
+            '--limit', type=int, default=settings.PAGE_SIZE,
+            help='Размер страницы, как в запросах фронтенда.'
+        )
+        parser.add_argument(
+            '--recipes', type=int, default=50,
+            help='Сколько популярных рецептов открыть.'
+        )
+        parser.add_argument('--concurrency', type=int, default=4)
+        parser.add_argument(
+            '--host', default=None,
+            help='Хост сайта: он входит в ключи кэша ответов.'
+        )
+        parser.add_argument(
+            '--secure', action='store_true',
+            help='Сайт работает по HTTPS (схема тоже входит в ключи).'
+        )
+
+    def handle(self, *args, **options):
+        if settings.CACHES['default']['BACKEND'].endswith('LocMemCache'):
+            self.stdout.write(self.style.WARNING(
+                'Кэш в памяти процесса: воркерам сайта достанутся только '
+                'прогретые буферы базы и документы рецептов.'
+            ))
+        paths = get_hot_paths(
+            options['pages'], options['limit'], options['recipes']
+        )
+        started = perf_counter()
+        report = warm_caches(
+            paths,
+            options['host'] or get_warm_up_host(),
+            options['secure'],
+            options['concurrency'],
+        )
+        elapsed = (perf_counter() - started) * 1000
+        for path, status, duration in sorted(
+            report, key=lambda row: row[2], reverse=True
+        ):
+            self.stdout.write(f'{duration:9.1f} мс  {status}  {path}')
+        failed = sum(status != 200 for _, status, _ in report)
+        style = self.style.WARNING if failed else self.style.SUCCESS
+        self.stdout.write(style(
+            f'Запросов: {len(report)}, с ошибкой: {failed}, '
+            f'суммарно {sum(row[2] for row in report):.0f} мс, '
+            f'за {elapsed:.0f} мс'
+        ))
@@ -0,0 +1,41 @@
+# Generated by Django 4.2.23 on 2026-10-19 08:56
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RequestProfile',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_index=True, verbose_name='Создан')),
+                ('method', models.CharField(max_length=10, verbose_name='Метод')),
+                ('path', models.CharField(max_length=2048, verbose_name='Путь')),
+                ('status_code', models.PositiveSmallIntegerField(verbose_name='Статус')),
+                ('mode', models.CharField(max_length=10, verbose_name='Режим')),
+                ('duration_ms', models.FloatField(verbose_name='Время, мс')),
+                ('queries', models.PositiveIntegerField(verbose_name='Запросов к БД')),
+                ('samples', models.PositiveIntegerField(default=0, verbose_name='Сэмплов стека')),
+                ('peak_memory', models.PositiveBigIntegerField(verbose_name='Пик памяти, байт')),
+                ('stacks_file', models.CharField(blank=True, max_length=255, verbose_name='Свёрнутые стеки')),
+                ('stats_file', models.CharField(blank=True, max_length=255, verbose_name='Статистика cProfile')),
+                ('report_file', models.CharField(max_length=255, verbose_name='Отчёт по функциям и памяти')),
+                ('user', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='Пользователь')),
+            ],
+            options={
+                'verbose_name': 'Профиль запроса',
+                'verbose_name_plural': 'Профили запросов',
+                'ordering': ('-created_at',),
+            },
+        ),
+    ]
@@ -0,0 +1,258 @@
+import hashlib
+
+from django.conf import settings
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date, parse_http_date_safe, quote_etag
+from rest_framework import status
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.response import Response
+
+from api.cache import get_or_build_response, get_response_key
+from api.fast_serializers import (
+    get_recipes_fieldset, needs_subscriptions, subscribed_rows
+)
+from foodgram.db.routers import is_pinned, use_replica
+from recipes.models import Recipe
+
+
+class ReplicaReadMixin:
+    """
+    Разрешает вьюсету читать с реплик для безопасных запросов
+    в действиях из `replica_actions`.
+    """
+    replica_actions = ('list', 'retrieve')
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if (
+            self.action in self.replica_actions
+            and request.method in SAFE_METHODS
+            and not is_pinned(request.user)
+        ):
+            self._replica_token = use_replica.set(True)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        token = getattr(self, '_replica_token', None)
+        if token is not None:
+            use_replica.reset(token)
+            self._replica_token = None
+        return super().finalize_response(request, response, *args, **kwargs)
+
+
+def get_anonymous_response_key(request):
+    """Ключ анонимного ответа; общий для WSGI и ASGI представлений."""
+    return get_response_key(request.build_absolute_uri(request.path),
+                            request.GET)
+
+
+class AnonymousResponseCacheMixin:
+    """
+    Кэширует данные ответов list/retrieve для анонимных пользователей:
+    им не важны флаги избранного и подписок, поэтому ответ у всех один.
+    Записи сбрасываются сменой версии набора рецептов (api.cache).
+
+    Вместе с данными запись хранит ETag и Last-Modified, посчитанные при
+    сборке (ConditionalGetMixin), поэтому попадание в кэш не обращается к
+    базе, а устаревшая запись, отданная во время пересборки, уходит со
+    своими валидаторами. Миксин должен стоять перед ConditionalGetMixin.
+    """
+
+    def get_cached_response(self, action, request, *args,
+                            check_modified=True, **kwargs):
+        if (
+            not settings.RECIPE_RESPONSE_CACHE['ENABLED']
+            or request.user.is_authenticated
+        ):
+            return action(request, *args, **kwargs)
+        built = []
+
+        def build():
+            response = action(request, *args, **kwargs)
+            built.append(response)
+            if response.status_code != status.HTTP_200_OK:
+                return None
+            return (
+                response.data, response['ETag'],
+                parse_http_date_safe(response.get('Last-Modified')),
+            )
+
+        entry = get_or_build_response(
+            get_anonymous_response_key(request), build
+        )
+        if built:
+            return built[0]
+        data, etag, last_modified = entry
+        if is_not_modified(
+            request._request, etag,
+            last_modified if check_modified else None,
+        ):
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            response = Response(data)
+        return set_validators(response, etag, last_modified)
+
+    def list(self, request, *args, **kwargs):
+        # Удаление не самого нового рецепта не сдвигает Last-Modified
+        return self.get_cached_response(
+            super().list, request, *args, check_modified=False, **kwargs
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.get_cached_response(
+            super().retrieve, request, *args, **kwargs
+        )
+
+
+def make_etag(*parts):
+    return quote_etag(hashlib.md5(repr(parts).encode()).hexdigest())
+
+
+def get_anonymous_validators(request, queryset, format):
+    """ETag и Last-Modified анонимного ответа (см. ConditionalGetMixin)."""
+    try:
+        state = queryset.order_by().aggregate(
+            count=Count('pk'), updated_at=Max('updated_at')
+        )
+    except (TypeError, ValueError):
+        # Нечисловой pk: ответ будет 404, как у get_object
+        state = {'count': 0, 'updated_at': None}
+    last_modified = (
+        state['updated_at'].timestamp() if state['updated_at'] else 0
+    )
+    etag = make_etag(
+        state['count'], last_modified, request.build_absolute_uri(), format,
+    )
+    return etag, int(last_modified)
+
+
+def get_recipes_validators(request, recipes, format, *extra):
+    """ETag и Last-Modified ответа пользователю с рецептами `recipes`."""
+    subscribed_ids = set()
+    # Без is_subscribed в ответе (?fields=) подписки на ETag не влияют
+    if needs_subscriptions(get_recipes_fieldset(request)):
+        subscribed_ids = set(subscribed_rows(
+            request.user, {recipe.author_id for recipe in recipes}
+        ))
+    etag = make_etag(
+        request.build_absolute_uri(), format,
+        *extra,
+        *(
+            (
+                recipe.pk, recipe.updated_at.timestamp(),
+                bool(getattr(recipe, 'is_favorited', False)),
+                bool(getattr(recipe, 'is_in_shopping_cart', False)),
+                recipe.author_id in subscribed_ids,
+            )
+            for recipe in recipes
+        ),
+    )
+    last_modified = max(
+        (recipe.updated_at.timestamp() for recipe in recipes), default=0
+    )
+    return etag, int(last_modified)
+
+
+def is_not_modified(request, etag, last_modified=None):
+    """If-None-Match / If-Modified-Since запроса `request` (HttpRequest)."""
+    return get_conditional_response(
+        request, etag=etag, last_modified=last_modified
+    ) is not None
+
+
+def set_validators(response, etag, last_modified):
+    response['ETag'] = etag
+    if last_modified:
+        response['Last-Modified'] = http_date(last_modified)
+    patch_vary_headers(response, ('Authorization',))
+    return response
+
+
+class ConditionalGetMixin:
+    """
+    ETag и Last-Modified для list/retrieve рецептов; If-None-Match и
+    If-Modified-Since проверяются до сериализации и дают 304.
+
+    Анонимный ответ зависит только от самих рецептов: ETag строится по
+    их числу и последнему updated_at одним запросом к базе (индекс
+    recipe_updated_at_idx), поэтому все воркеры считают его одинаково.
+    updated_at меняется и при пересборке документа (api.documents), а
+    удаление меняет число рецептов, но не последний updated_at, поэтому
+    для анонимного списка If-Modified-Since не проверяется. С кэшем
+    ответов (AnonymousResponseCacheMixin) запрос к базе выполняется
+    только при сборке записи. Для пользователя ETag строится по
+    updated_at рецептов и его флагам; флаги не меняют updated_at, поэтому
+    If-Modified-Since для него тоже не проверяется.
+    """
+
+    def get_anonymous_validators(self, request, queryset):
+        return get_anonymous_validators(
+            request, queryset, request.accepted_renderer.format
+        )
+
+    def get_recipes_validators(self, request, recipes, *extra):
+        return get_recipes_validators(
+            request, recipes, request.accepted_renderer.format, *extra
+        )
+
+    def get_conditional_response(self, request, etag, last_modified, build,
+                                 check_modified=True):
+        """Ответ 304 или `build()`; в обоих случаях с валидаторами."""
+        if is_not_modified(
+            request._request, etag,
+            last_modified if check_modified else None,
+        ):
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            response = build()
+            if response.status_code != status.HTTP_200_OK:
+                return response
+        return set_validators(response, etag, last_modified)
+
+    def list(self, request, *args, **kwargs):
+        if request.user.is_anonymous:
+            return self.get_conditional_response(
+                request,
+                *self.get_anonymous_validators(request, Recipe.objects.all()),
+                lambda: super(ConditionalGetMixin, self).list(
+                    request, *args, **kwargs
+                ),
+                check_modified=False,
+            )
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(queryset)
+        if page is None:
+            recipes = list(queryset)
+            count = len(recipes)
+        else:
+            recipes = page
+            count = self.paginator.page.paginator.count
+
+        def build():
+            serializer = self.get_serializer(recipes, many=True)
+            if page is None:
+                return Response(serializer.data)
+            return self.get_paginated_response(serializer.data)
+
+        return self.get_conditional_response(
+            request, *self.get_recipes_validators(request, recipes, count),
+            build, check_modified=False,
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        if request.user.is_anonymous:
+            return self.get_conditional_response(
+                request, *self.get_anonymous_validators(
+                    request,
+                    Recipe.objects.filter(pk=kwargs[self.lookup_field]),
+                ),
+                lambda: super(ConditionalGetMixin, self).retrieve(
+                    request, *args, **kwargs
+                ),
+            )
+        instance = self.get_object()
+        return self.get_conditional_response(
+            request, *self.get_recipes_validators(request, [instance]),
+            lambda: Response(self.get_serializer(instance).data),
+            check_modified=False,
+        )
@@ -0,0 +1,116 @@
+from django.conf import settings
+from django.db import models
+
+
+class RequestProfile(models.Model):
+    """
+    Профиль одного запроса, снятый по требованию сотрудника.
+    Сами отчёты лежат в PROFILING['DIR'], здесь — имена файлов и сводка.
+    """
+    created_at = models.DateTimeField(
+        auto_now_add=True, db_index=True, verbose_name="Создан"
+    )
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True,
+        related_name='+', verbose_name="Пользователь"
+    )
+    method = models.CharField(max_length=10, verbose_name="Метод")
+    path = models.CharField(max_length=2048, verbose_name="Путь")
+    status_code = models.PositiveSmallIntegerField(verbose_name="Статус")
+    mode = models.CharField(max_length=10, verbose_name="Режим")
+    duration_ms = models.FloatField(verbose_name="Время, мс")
+    queries = models.PositiveIntegerField(verbose_name="Запросов к БД")
+    samples = models.PositiveIntegerField(
+        default=0, verbose_name="Сэмплов стека"
+    )
+    peak_memory = models.PositiveBigIntegerField(
+        verbose_name="Пик памяти, байт"
+    )
+    # Имена файлов относительно PROFILING['DIR']
+    stacks_file = models.CharField(
+        max_length=255, blank=True, verbose_name="Свёрнутые стеки"
+    )
+    stats_file = models.CharField(
+        max_length=255, blank=True, verbose_name="Статистика cProfile"
+    )
+    report_file = models.CharField(
+        max_length=255, verbose_name="Отчёт по функциям и памяти"
+    )
+
+    class Meta:
+        ordering = ('-created_at',)
+        verbose_name = "Профиль запроса"
+        verbose_name_plural = "Профили запросов"
+
+    def __str__(self):
+        return f"{self.method} {self.path} ({self.duration_ms:.0f} мс)"
+
+    def get_files(self):
+        return [
+            name for name in (
+                self.stacks_file, self.stats_file, self.report_file
+            )
+            if name
+        ]
+
+
+class Job(models.Model):
+    """Фоновая задача в очереди (см. api.jobs)."""
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUSES = (
+        (QUEUED, 'В очереди'),
+        (RUNNING, 'Выполняется'),
+        (DONE, 'Выполнена'),
+        (FAILED, 'Ошибка'),
+    )
+
+    name = models.CharField(max_length=255, verbose_name="Задача")
+    args = models.JSONField(default=list, verbose_name="Аргументы")
+    status = models.CharField(
+        max_length=10, choices=STATUSES, default=QUEUED,
+        verbose_name="Статус"
+    )
+    attempts = models.PositiveSmallIntegerField(
+        default=0, verbose_name="Попыток"
+    )
+    max_attempts = models.PositiveSmallIntegerField(
+        verbose_name="Максимум попыток"
+    )
+    created_at = models.DateTimeField(
+        auto_now_add=True, verbose_name="Создана"
+    )
+    # Не раньше этого времени (отложенный запуск и повторы)
+    run_at = models.DateTimeField(verbose_name="Запуск не раньше")
+    started_at = models.DateTimeField(
+        null=True, blank=True, verbose_name="Начата"
+    )
+    finished_at = models.DateTimeField(
+        null=True, blank=True, db_index=True, verbose_name="Завершена"
+    )
+    worker = models.CharField(
+        max_length=255, blank=True, verbose_name="Воркер"
+    )
+    # Ожидание в очереди от run_at до начала последней попытки
+    wait_ms = models.FloatField(
+        null=True, blank=True, verbose_name="Ожидание, мс"
+    )
+    duration_ms = models.FloatField(
+        null=True, blank=True, verbose_name="Выполнение, мс"
+    )
+    error = models.TextField(blank=True, verbose_name="Ошибка")
+
+    class Meta:
+        ordering = ('-created_at',)
+        indexes = [
+            models.Index(
+                fields=('status', 'run_at'), name='api_job_status_run_at'
+            ),
+        ]
+        verbose_name = "Фоновая задача"
+        verbose_name_plural = "Фоновые задачи"
+
+    def __str__(self):
+        return f"{self.name} #{self.pk} ({self.get_status_display()})"
@@ -1,8 +1,21 @@
 from django.conf import settings
 from rest_framework.pagination import PageNumberPagination
 
+from foodgram.db.estimates import EstimatedCountPaginator
+
 
 class RecipePagination(PageNumberPagination):
     page_size = settings.PAGE_SIZE
     page_size_query_param = 'limit'  # Будем поддерживать параметр `limit`
     max_limit = settings.MAX_LIMIT
+    # На больших таблицах count берётся из оценки PostgreSQL
+    django_paginator_class = EstimatedCountPaginator
+
+    def get_paginated_response(self, data):
+        response = super().get_paginated_response(data)
+        if self.page.paginator.is_estimated:
+            count, *rest = response.data.items()
+            response.data = dict(
+                [count, ('count_is_approximate', True), *rest]
+            )
+        return response
@@ -0,0 +1,363 @@
+"""
+Подбор рецептов по имеющимся ингредиентам.
+
+Индекс в памяти процесса: каждому рецепту назначен бит, у каждого
+ингредиента — число-битсет рецептов, где он есть, у каждого размера
+рецепта (числа ингредиентов) — битсет рецептов такого размера. Для
+набора продуктов битсеты ингредиентов складываются побитовым сумматором
+в «вертикальный» счётчик совпадений (разряды счётчика — тоже битсеты),
+и рецепты размера k, у которых совпало k - m ингредиентов, — это рецепты,
+которым не хватает m ингредиентов. Всё это десятки операций над целыми
+Python, без запросов к базе.
+
+Индекс строится при прогреве (или первым запросом процесса без него) и
+дальше обновляется фоновым потоком процесса: раз в
+PANTRY_INDEX_REBUILD_INTERVAL секунд заново, а между пересборками
+догоняет изменения при смене версии набора рецептов (api.cache): заново
+читаются рецепты с updated_at не старше последней синхронизации (с
+запасом на долгие транзакции), а удалённые находятся сверкой числа
+рецептов. Поток собирает новый индекс рядом с текущим и подменяет ссылку
+на него, поэтому запросы не ждут пересборки и не берут блокировок.
+Запрос, заметивший новую версию, только будит поток и отвечает по
+текущему индексу.
+
+Биты рецептов идут в порядке created_at: при построении рецепты
+нумеруются от старых к новым, изменённый рецепт сохраняет свой бит, а
+новые получают следующие. Поэтому внутри одинакового числа недостающих
+ингредиентов рецепты идут от новых к старым, как в списке рецептов.
+"""
+import copy
+import logging
+import os
+import threading
+from collections import defaultdict
+from datetime import timedelta
+from time import monotonic
+
+from django.db import connections
+from django.utils import timezone
+
+from api.cache import get_recipes_version
+from recipes.models import Recipe, RecipeIngredient
+
+PANTRY_INDEX_REBUILD_INTERVAL = 600
+PANTRY_INDEX_SYNC_OVERLAP = timedelta(seconds=60)
+# Пауза потока после неудачного обновления (например, база недоступна)
+PANTRY_INDEX_RETRY_DELAY = 30
+LOAD_CHUNK_SIZE = 20000
+
+logger = logging.getLogger(__name__)
+
+
+def make_bitset(positions, size):
+    """Битсет с битами `positions` одним int.from_bytes, без сдвигов."""
+    data = bytearray((size + 7) // 8)
+    for position in positions:
+        data[position >> 3] |= 1 << (position & 7)
+    return int.from_bytes(data, 'little')
+
+
+def iter_bits_descending(bitset):
+    """
+    Номера установленных битов от старшего к младшему. Двоичная запись
+    строится один раз, а единицы в ней ищет str.find, поэтому пропуск
+    первых N рецептов при глубокой пагинации линеен по N.
+    """
+    bits = bin(bitset)
+    top = len(bits) - 1
+    index = bits.find('1', 2)
+    while index != -1:
+        yield top - index
+        index = bits.find('1', index + 1)
+
+
+def count_bits(bitset):
+    return bin(bitset).count('1')
+
+
+class PantryIndex:
+    """
+    Индекс одной версии набора рецептов. Опубликованный индекс не
+    меняется: sync возвращает обновлённую копию.
+    """
+
+    def __init__(self):
+        self.version = None
+        self.built_at = None
+        self.synced_at = None
+        self.slots = {}  # id рецепта -> номер бита
+        self.recipe_ids = []  # номер бита -> id рецепта
+        self.ingredients = {}  # id ингредиента -> битсет рецептов
+        self.sizes = {}  # число ингредиентов -> битсет рецептов
+
+    @classmethod
+    def build(cls, version):
+        """Строит индекс заново по всем связям рецепт-ингредиент."""
+        index = cls()
+        synced_at = timezone.now()
+        recipe_ingredients = {
+            recipe_id: []
+            for recipe_id in Recipe.objects.order_by(
+                'created_at', 'pk'
+            ).values_list('pk', flat=True)
+        }
+        for recipe_id, ingredient_id in (
+            RecipeIngredient.objects.order_by()
+            .values_list('recipe_id', 'ingredient_id')
+            .iterator(chunk_size=LOAD_CHUNK_SIZE)
+        ):
+            if recipe_id in recipe_ingredients:
+                recipe_ingredients[recipe_id].append(ingredient_id)
+        index.load(recipe_ingredients)
+        index.version = version
+        index.built_at = monotonic()
+        index.synced_at = synced_at
+        return index
+
+    def load(self, recipe_ingredients):
+        """Заполняет пустой индекс рецептами {id: ингредиенты} по порядку."""
+        positions = defaultdict(list)
+        sizes = defaultdict(list)
+        for slot, recipe_id in enumerate(recipe_ingredients):
+            self.slots[recipe_id] = slot
+            self.recipe_ids.append(recipe_id)
+            ingredient_ids = set(recipe_ingredients[recipe_id])
+            sizes[len(ingredient_ids)].append(slot)
+            for ingredient_id in ingredient_ids:
+                positions[ingredient_id].append(slot)
+        size = len(self.recipe_ids)
+        self.ingredients = {
+            ingredient_id: make_bitset(slots, size)
+            for ingredient_id, slots in positions.items()
+        }
+        self.sizes = {
+            count: make_bitset(slots, size) for count, slots in sizes.items()
+        }
+
+    def copy(self):
+        index = copy.copy(self)
+        index.slots = dict(self.slots)
+        index.recipe_ids = list(self.recipe_ids)
+        index.ingredients = dict(self.ingredients)
+        index.sizes = dict(self.sizes)
+        return index
+
+    def clear(self, mask):
+        """Снимает биты `mask` во всех битсетах."""
+        if not mask:
+            return
+        for bitsets in (self.ingredients, self.sizes):
+            for key, bitset in bitsets.items():
+                if bitset & mask:
+                    bitsets[key] = bitset & ~mask
+
+    def remove(self, recipe_ids):
+        mask = 0
+        for recipe_id in recipe_ids:
+            slot = self.slots.pop(recipe_id, None)
+            if slot is not None:
+                self.recipe_ids[slot] = None
+                mask |= 1 << slot
+        self.clear(mask)
+
+    def update(self, recipe_ingredients):
+        """
+        Записывает рецепты {id: набор ингредиентов}: изменённые остаются
+        на своих битах, новые по порядку получают следующие.
+        """
+        self.clear(sum(
+            1 << self.slots[recipe_id]
+            for recipe_id in recipe_ingredients if recipe_id in self.slots
+        ))
+        for recipe_id, ingredient_ids in recipe_ingredients.items():
+            slot = self.slots.get(recipe_id)
+            if slot is None:
+                slot = len(self.recipe_ids)
+                self.slots[recipe_id] = slot
+                self.recipe_ids.append(recipe_id)
+            bit = 1 << slot
+            size = len(ingredient_ids)
+            self.sizes[size] = self.sizes.get(size, 0) | bit
+            for ingredient_id in ingredient_ids:
+                self.ingredients[ingredient_id] = (
+                    self.ingredients.get(ingredient_id, 0) | bit
+                )
+
+    def sync(self, version):
+        """Копия индекса с изменениями рецептов после синхронизации."""
+        index = self.copy()
+        synced_at = timezone.now()
+        changed_ids = list(Recipe.objects.filter(
+            updated_at__gte=self.synced_at - PANTRY_INDEX_SYNC_OVERLAP
+        ).order_by('created_at', 'pk').values_list('pk', flat=True))
+        recipe_ingredients = {recipe_id: set() for recipe_id in changed_ids}
+        for recipe_id, ingredient_id in RecipeIngredient.objects.filter(
+            recipe_id__in=changed_ids
+        ).values_list('recipe_id', 'ingredient_id'):
+            recipe_ingredients[recipe_id].add(ingredient_id)
+        index.update(recipe_ingredients)
+        # Удалённые рецепты по updated_at не найти, сверяем количество
+        if len(index.slots) != Recipe.objects.count():
+            existing = set(Recipe.objects.values_list('pk', flat=True))
+            index.remove([
+                recipe_id for recipe_id in index.slots
+                if recipe_id not in existing
+            ])
+        index.version = version
+        index.synced_at = synced_at
+        return index
+
+    def count_matches(self, ingredient_ids):
+        """Разряды счётчика совпадений: counter[i] — биты 2**i."""
+        counter = []
+        for ingredient_id in ingredient_ids:
+            carry = self.ingredients.get(ingredient_id, 0)
+            level = 0
+            while carry:
+                if level == len(counter):
+                    counter.append(carry)
+                    break
+                counter[level], carry = (
+                    counter[level] ^ carry, counter[level] & carry
+                )
+                level += 1
+        return counter
+
+    def match(self, ingredient_ids, max_missing):
+        """
+        Битсеты рецептов по числу недостающих ингредиентов, от 0 до
+        `max_missing`. Рецепты без единого совпадения не попадают.
+        """
+        counter = self.count_matches(set(ingredient_ids))
+        groups = [0] * (max_missing + 1)
+        for size, recipes in self.sizes.items():
+            for missing in range(min(max_missing, size - 1) + 1):
+                matched = size - missing
+                if matched >> len(counter):
+                    continue
+                found = recipes
+                for level, bits in enumerate(counter):
+                    found &= bits if matched >> level & 1 else ~bits
+                    if not found:
+                        break
+                groups[missing] |= found
+        return groups
+
+
+class PantryMatches:
+    """
+    Последовательность (id рецепта, число недостающих ингредиентов) для
+    пагинатора: сначала рецепты, которым ничего не нужно докупать.
+    """
+
+    def __init__(self, recipe_ids, groups):
+        self.recipe_ids = recipe_ids
+        self.groups = groups
+        self.counts = [count_bits(group) for group in groups]
+
+    def __len__(self):
+        return sum(self.counts)
+
+    def __getitem__(self, index):
+        start, stop, _ = index.indices(len(self))
+        items = []
+        for missing, (group, count) in enumerate(
+            zip(self.groups, self.counts)
+        ):
+            if start >= count:
+                start -= count
+                stop -= count
+                continue
+            for position, slot in enumerate(iter_bits_descending(group)):
+                if position >= stop:
+                    break
+                if position >= start:
+                    items.append((self.recipe_ids[slot], missing))
+            if stop <= count:
+                break
+            start = 0
+            stop -= count
+        return items
+
+
+class PantryIndexUpdater:
+    """
+    Текущий индекс процесса и фоновый поток, который его обновляет.
+    Поток мастера gunicorn воркерам не достаётся, поэтому он запускается
+    в каждом процессе при первом обращении к индексу.
+    """
+
+    def __init__(self):
+        self.index = None
+        self.lock = threading.Lock()
+        self.wakeup = threading.Event()
+        self.pid = None
+
+    def refresh(self):
+        """Строит индекс или догоняет изменения и подменяет текущий."""
+        with self.lock:
+            index = self.index
+            version = get_recipes_version()
+            if index is None or self.get_rebuild_delay() == 0:
+                self.index = PantryIndex.build(version)
+            elif version != index.version:
+                self.index = index.sync(version)
+
+    def get_rebuild_delay(self):
+        if self.index is None:
+            return 0
+        return max(
+            0, self.index.built_at + PANTRY_INDEX_REBUILD_INTERVAL
+            - monotonic()
+        )
+
+    def get_index(self):
+        """
+        Индекс для запроса. Строится в запросе только у процесса без
+        прогрева; новую версию набора рецептов догоняет поток.
+        """
+        index = self.index
+        if index is None:
+            self.refresh()
+            index = self.index
+        elif index.version != get_recipes_version():
+            self.wakeup.set()
+        self.start()
+        return index
+
+    def start(self):
+        pid = os.getpid()
+        if self.pid == pid:
+            return
+        with self.lock:
+            if self.pid == pid:
+                return
+            self.pid = pid
+            threading.Thread(
+                target=self.run, name='pantry-index', daemon=True
+            ).start()
+
+    def run(self):
+        delay = self.get_rebuild_delay()
+        while True:
+            self.wakeup.wait(delay)
+            self.wakeup.clear()
+            try:
+                self.refresh()
+                delay = self.get_rebuild_delay()
+            except Exception:
+                logger.exception('Не удалось обновить индекс продуктов')
+                delay = PANTRY_INDEX_RETRY_DELAY
+            finally:
+                connections.close_all()
+
+
+pantry_updater = PantryIndexUpdater()
+
+
+def match_pantry(ingredient_ids, max_missing):
+    """Рецепты из продуктов `ingredient_ids` (см. PantryMatches)."""
+    index = pantry_updater.get_index()
+    return PantryMatches(
+        index.recipe_ids, index.match(ingredient_ids, max_missing)
+    )
@@ -0,0 +1,264 @@
+"""
+Профилирование запросов по требованию.
+
+Сотрудник добавляет к запросу заголовок `X-Profile` или параметр
+`?profile=`; значение `cprofile` включает детерминированный cProfile,
+любое другое — сэмплирование стека потока запроса раз в
+PROFILING['INTERVAL'] секунд. Одновременно работает tracemalloc. После
+ответа на диск пишутся:
+- свёрнутые стеки (`*.collapsed`, формат flamegraph.pl и speedscope);
+- статистика cProfile (`*.prof`, открывается pstats или snakeviz);
+- текстовый отчёт: самые тяжёлые функции и места выделения памяти.
+Профиль сохраняется в RequestProfile и виден в админке, его id
+возвращается в заголовке X-Profile-Id.
+
+Без флага middleware только проверяет заголовок и строку запроса.
+В процессе одновременно профилируется один запрос: tracemalloc
+глобален, а запрос, пришедший во время профилирования, выполняется
+как обычно. tracemalloc учитывает и выделения других потоков воркера.
+"""
+import cProfile
+import io
+import pstats
+import sys
+import threading
+import tracemalloc
+import uuid
+from collections import Counter
+from contextlib import ExitStack
+from pathlib import Path
+from time import perf_counter
+
+from django.conf import settings
+from django.db import connections
+from django.utils import timezone
+
+from api.authentication import get_request_user
+from api.models import RequestProfile
+
+PROFILE_HEADER = 'HTTP_X_PROFILE'
+PROFILE_PARAM = 'profile'
+MODE_SAMPLE = 'sample'
+MODE_CPROFILE = 'cprofile'
+TOP_FUNCTIONS = 40
+
+profiling_lock = threading.Lock()
+
+
+def get_profile_path(name):
+    return Path(settings.PROFILING['DIR']) / name
+
+
+def get_profile_mode(request):
+    """Режим профилирования из запроса или None, если флага нет."""
+    value = request.META.get(PROFILE_HEADER)
+    if value is None and PROFILE_PARAM in request.META.get(
+        'QUERY_STRING', ''
+    ):
+        value = request.GET.get(PROFILE_PARAM)
+    if value is None:
+        return None
+    return MODE_CPROFILE if value == MODE_CPROFILE else MODE_SAMPLE
+
+
+def get_staff_user(request):
+    """Сотрудник, выполняющий запрос, или None."""
+    user = get_request_user(request)
+    if user is not None and user.is_staff:
+        return user
+    return None
+
+
+def frame_name(frame):
+    code = frame.f_code
+    return f'{code.co_name} ({code.co_filename}:{code.co_firstlineno})'
+
+
+class StackSampler(threading.Thread):
+    """Считает стеки потока `thread_id`, снимая их раз в `interval` сек."""
+
+    def __init__(self, thread_id, interval):
+        super().__init__(daemon=True)
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self.finished = threading.Event()
+
+    def run(self):
+        while not self.finished.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            names = []
+            while frame is not None:
+                names.append(frame_name(frame))
+                frame = frame.f_back
+            if names:
+                self.stacks[';'.join(reversed(names))] += 1
+
+    def stop(self):
+        self.finished.set()
+        self.join()
+
+
+class QueryCounter:
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+def format_allocations(snapshot, limit):
+    snapshot = snapshot.filter_traces((
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, __file__),
+    ))
+    lines = []
+    for index, stat in enumerate(
+        snapshot.statistics('traceback')[:limit], start=1
+    ):
+        lines.append(
+            f'#{index}: {stat.size / 1024:.1f} КБ в {stat.count} блоках'
+        )
+        lines.extend(f'    {line}' for line in stat.traceback.format())
+    return '\n'.join(lines)
+
+
+def format_stacks_summary(stacks, limit):
+    """Функции с наибольшим собственным и общим числом сэмплов."""
+    own = Counter()
+    total = Counter()
+    for stack, count in stacks.items():
+        names = stack.split(';')
+        own[names[-1]] += count
+        for name in set(names):
+            total[name] += count
+    lines = ['Собственное время (сэмплы):']
+    lines.extend(f'{count:8} {name}' for name, count in own.most_common(limit))
+    lines.append('\nВключая вложенные вызовы (сэмплы):')
+    lines.extend(
+        f'{count:8} {name}' for name, count in total.most_common(limit)
+    )
+    return '\n'.join(lines)
+
+
+class RequestProfiler:
+    """Профилирует выполнение `get_response(request)` и сохраняет отчёт."""
+
+    def __init__(self, mode):
+        self.mode = mode
+        self.options = settings.PROFILING
+
+    def run(self, get_response, request):
+        sampler = profiler = None
+        queries = QueryCounter()
+        started_tracemalloc = not tracemalloc.is_tracing()
+        if started_tracemalloc:
+            tracemalloc.start(self.options['TRACEMALLOC_FRAMES'])
+        tracemalloc.reset_peak()
+        if self.mode == MODE_CPROFILE:
+            profiler = cProfile.Profile()
+        else:
+            sampler = StackSampler(
+                threading.get_ident(), self.options['INTERVAL']
+            )
+            sampler.start()
+        started = perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(queries))
+                if profiler is not None:
+                    response = profiler.runcall(get_response, request)
+                else:
+                    response = get_response(request)
+            duration = (perf_counter() - started) * 1000
+        finally:
+            if sampler is not None:
+                sampler.stop()
+            snapshot = tracemalloc.take_snapshot()
+            peak = tracemalloc.get_traced_memory()[1]
+            if started_tracemalloc:
+                tracemalloc.stop()
+        self.response = response
+        self.duration = duration
+        self.queries = queries.count
+        self.peak = peak
+        self.snapshot = snapshot
+        self.stacks = sampler.stacks if sampler is not None else Counter()
+        self.stats = profiler
+        return response
+
+    def save(self, request, user):
+        directory = get_profile_path('')
+        directory.mkdir(parents=True, exist_ok=True)
+        name = (
+            f'{timezone.now():%Y%m%d-%H%M%S}-{uuid.uuid4().hex[:8]}'
+        )
+        report = [
+            f'{request.method} {request.get_full_path()}',
+            f'Статус {self.response.status_code}, {self.duration:.1f} мс, '
+            f'запросов к БД {self.queries}, '
+            f'пик памяти {self.peak / 1024:.1f} КБ',
+            '',
+        ]
+        stacks_file = stats_file = ''
+        if self.stats is not None:
+            stats_file = f'{name}.prof'
+            self.stats.dump_stats(directory / stats_file)
+            output = io.StringIO()
+            pstats.Stats(self.stats, stream=output).sort_stats(
+                'cumulative'
+            ).print_stats(TOP_FUNCTIONS)
+            report.append(output.getvalue())
+        else:
+            stacks_file = f'{name}.collapsed'
+            (directory / stacks_file).write_text(''.join(
+                f'{stack} {count}\n' for stack, count in self.stacks.items()
+            ))
+            report.append(format_stacks_summary(self.stacks, TOP_FUNCTIONS))
+        report.append('\nВыделения памяти, оставшиеся к концу запроса:')
+        report.append(format_allocations(
+            self.snapshot, self.options['TOP_ALLOCATIONS']
+        ))
+        report_file = f'{name}.txt'
+        (directory / report_file).write_text('\n'.join(report))
+        return RequestProfile.objects.create(
+            user=user,
+            method=request.method,
+            path=request.get_full_path()[:2048],
+            status_code=self.response.status_code,
+            mode=self.mode,
+            duration_ms=self.duration,
+            queries=self.queries,
+            samples=sum(self.stacks.values()),
+            peak_memory=self.peak,
+            stacks_file=stacks_file,
+            stats_file=stats_file,
+            report_file=report_file,
+        )
+
+
+class ProfilingMiddleware:
+    """Профилирует запросы сотрудников с флагом X-Profile или ?profile=."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not settings.PROFILING['ENABLED']:
+            return self.get_response(request)
+        mode = get_profile_mode(request)
+        if mode is None:
+            return self.get_response(request)
+        user = get_staff_user(request)
+        if user is None or not profiling_lock.acquire(blocking=False):
+            return self.get_response(request)
+        try:
+            profiler = RequestProfiler(mode)
+            response = profiler.run(self.get_response, request)
+        finally:
+            profiling_lock.release()
+        profile = profiler.save(request, user)
+        response['X-Profile-Id'] = str(profile.pk)
+        return response
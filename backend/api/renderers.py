@@ -0,0 +1,29 @@
+import orjson
+from rest_framework.renderers import JSONRenderer
+
+
+class ORJSONRenderer(JSONRenderer):
+    """
+    JSONRenderer на orjson. Типы, которые orjson не знает (Decimal, ленивые
+    строки переводов и т.п.), а также даты обрабатываются тем же
+    JSONEncoder, что и у DRF, поэтому вывод совпадает со стандартным.
+    """
+    options = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+
+        renderer_context = renderer_context or {}
+        options = self.options
+        if self.get_indent(accepted_media_type, renderer_context):
+            # orjson умеет только отступ в два пробела
+            options |= orjson.OPT_INDENT_2
+
+        ret = orjson.dumps(
+            data, default=self.encoder_class().default, option=options
+        )
+        # Как и JSONRenderer, экранируем U+2028 и U+2029
+        return ret.replace(
+            b'\xe2\x80\xa8', b'\\u2028'
+        ).replace(b'\xe2\x80\xa9', b'\\u2029')
@@ -0,0 +1,335 @@
+"""
+Проигрывание записанного трафика (api.traffic) для нагрузочных тестов.
+
+Запросы берутся из JSONL-файла TrafficCaptureMiddleware или, как
+начальная нагрузка, из Postman-коллекции (только GET: остальные её
+запросы — проверки, зависящие от ответов друг друга). Выполняются они
+тестовым клиентом Django в этом процессе или по HTTP на указанный
+сервер, в несколько потоков и с заданной частотой. По каждому
+эндпоинту (метод и путь с {id} вместо чисел) считаются пропускная
+способность, перцентили времени ответа и доли ответов 4xx и 5xx.
+
+Псевдонимам из записи соответствуют пользователи с email
+`<псевдоним>@example.com` и паролем REPLAY_PASSWORD; недостающие
+создаются, а их токены передаются в запросах. Поэтому сервер должен
+работать с той же базой, что и команда, — обычно с копией рабочей.
+"""
+import http.client
+import json
+import re
+import threading
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from time import monotonic, perf_counter, sleep
+from urllib.parse import urlencode, urlsplit
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db import connections
+from django.test import Client
+from rest_framework.authtoken.models import Token
+
+from api.jobs import percentile
+from api.traffic import ANONYMOUS_NAME, REPLAY_PASSWORD
+from recipes.models import Ingredient, Recipe, Tag
+
+User = get_user_model()
+
+# Выход удаляет токен, и остальные запросы пользователя получили бы 401
+SKIPPED_PATHS = frozenset(('/api/auth/token/logout/',))
+SAFE_METHODS = frozenset(('GET', 'HEAD', 'OPTIONS'))
+ID_RE = re.compile(r'(?<=/)\d+(?=/)')
+VARIABLE_RE = re.compile(r'{{(\w+)}}')
+TOKEN_VARIABLE_RE = re.compile(r'^Token {{(\w+)}}$')
+# Переменные Postman, которые коллекция заполняет ответами, по окончанию
+# имени: значения берутся из базы
+POSTMAN_PLACEHOLDERS = (
+    ('recipeid', lambda: Recipe.objects.values_list('pk', flat=True)),
+    ('userid', lambda: User.objects.values_list('pk', flat=True)),
+    ('tagid', lambda: Tag.objects.values_list('pk', flat=True)),
+    ('tagslug', lambda: Tag.objects.values_list('slug', flat=True)),
+    ('ientid', lambda: Ingredient.objects.values_list('pk', flat=True)),
+)
+
+
+def load_capture(path):
+    with open(path, encoding='utf-8') as file:
+        return [json.loads(line) for line in file if line.strip()]
+
+
+def get_placeholder_values():
+    """Значения переменных Postman: по окончанию имени -> значения."""
+    values = {}
+    for suffix, get_values in POSTMAN_PLACEHOLDERS:
+        values[suffix] = [str(value) for value in get_values()[:3]]
+    return values
+
+
+def fill_variables(text, variables, placeholders):
+    """Подставляет {{переменные}}; None, если какую-то подставить нечем."""
+    counters = defaultdict(int)
+
+    def replace(match):
+        name = match.group(1)
+        if name in variables:
+            return variables[name]
+        for suffix, values in placeholders.items():
+            if name.lower().endswith(suffix) and values:
+                # Разные переменные одного вида (второй, третий тег) —
+                # разные объекты
+                value = values[counters[suffix] % len(values)]
+                counters[suffix] += 1
+                return value
+        raise LookupError(name)
+
+    try:
+        return VARIABLE_RE.sub(replace, text)
+    except LookupError:
+        return None
+
+
+def iter_postman_requests(items):
+    for item in items:
+        if 'item' in item:
+            yield from iter_postman_requests(item['item'])
+        else:
+            yield item['request']
+
+
+def get_postman_identity(request):
+    """
+    Псевдоним по переменной токена (`Token {{userToken}}` -> userToken).
+    False — токен записан в коллекции явно (проверка неверного токена).
+    """
+    if any(
+        header['key'].lower() == 'authorization'
+        for header in request.get('header', ())
+    ):
+        return False
+    auth = request.get('auth') or {}
+    if auth.get('type') != 'apikey':
+        return None
+    value = {field['key']: field['value'] for field in auth['apikey']}
+    match = TOKEN_VARIABLE_RE.match(value.get('value', ''))
+    return f'postman-{match.group(1)}' if match else False
+
+
+def load_postman(path):
+    """GET-запросы коллекции в формате записи; неподходящие пропускаются."""
+    with open(path, encoding='utf-8') as file:
+        collection = json.load(file)
+    variables = {
+        variable['key']: variable['value']
+        for variable in collection.get('variable', ())
+        if variable['key'] != 'baseUrl'
+    }
+    placeholders = get_placeholder_values()
+    records = []
+    for request in iter_postman_requests(collection['item']):
+        url = request['url']
+        identity = get_postman_identity(request)
+        if request['method'] != 'GET' or identity is False:
+            continue
+        path = fill_variables(
+            '/' + '/'.join(url['path']), variables, placeholders
+        )
+        query = fill_variables(urlencode([
+            (param['key'], param['value'])
+            for param in url.get('query') or ()
+            if not param.get('disabled')
+        ], safe='{}'), variables, placeholders)
+        if path is None or query is None:
+            continue
+        records.append({
+            'method': 'GET', 'path': path, 'query': query,
+            'identity': identity, 'body': None,
+        })
+    return records
+
+
+def get_tokens(identities):
+    """
+    Токены пользователей-псевдонимов; недостающие создаются. Пользователь
+    ищется по email: так же его находит вход из записи.
+    """
+    emails = {f'{identity}@example.com': identity for identity in identities}
+    users = dict(User.objects.filter(
+        email__in=emails
+    ).values_list('email', 'pk'))
+    missing = set(emails) - set(users)
+    if missing:
+        password = make_password(REPLAY_PASSWORD)
+        User.objects.bulk_create([
+            User(
+                username=emails[email], email=email,
+                first_name=ANONYMOUS_NAME, last_name=ANONYMOUS_NAME,
+                password=password,
+            )
+            for email in missing
+        ], ignore_conflicts=True)
+        users = dict(User.objects.filter(
+            email__in=emails
+        ).values_list('email', 'pk'))
+    tokens = dict(Token.objects.filter(
+        user_id__in=users.values()
+    ).values_list('user_id', 'key'))
+    Token.objects.bulk_create([
+        Token(user_id=user_id, key=Token.generate_key())
+        for user_id in set(users.values()) - set(tokens)
+    ], ignore_conflicts=True)
+    tokens = dict(Token.objects.filter(
+        user_id__in=users.values()
+    ).values_list('user_id', 'key'))
+    return {emails[email]: tokens[user_id] for email, user_id in users.items()}
+
+
+def get_endpoint(record):
+    return f'{record["method"]} {ID_RE.sub("{id}", record["path"])}'
+
+
+def get_body(record):
+    if record.get('body') is None:
+        return b''
+    return json.dumps(record['body'], ensure_ascii=False).encode()
+
+
+class ClientTarget:
+    """Запросы через тестовый клиент Django в этом процессе."""
+
+    def __init__(self, host, secure=False):
+        self.client = Client(HTTP_HOST=host, raise_request_exception=False)
+        self.secure = secure
+
+    def send(self, record, token):
+        headers = {'Authorization': f'Token {token}'} if token else {}
+        path = record['path']
+        if record['query']:
+            path = f'{path}?{record["query"]}'
+        return self.client.generic(
+            record['method'], path, get_body(record),
+            content_type='application/json', secure=self.secure,
+            headers=headers,
+        ).status_code
+
+    def close(self):
+        pass
+
+
+class HttpTarget:
+    """Запросы по HTTP с keep-alive, одно соединение на поток."""
+
+    def __init__(self, url):
+        url = urlsplit(url)
+        connection_class = (
+            http.client.HTTPSConnection if url.scheme == 'https'
+            else http.client.HTTPConnection
+        )
+        self.connection = connection_class(url.netloc, timeout=60)
+
+    def send(self, record, token):
+        headers = {'Content-Type': 'application/json'}
+        if token:
+            headers['Authorization'] = f'Token {token}'
+        path = record['path']
+        if record['query']:
+            path = f'{path}?{record["query"]}'
+        try:
+            self.connection.request(
+                record['method'], path, get_body(record), headers
+            )
+            response = self.connection.getresponse()
+            response.read()
+        except (OSError, http.client.HTTPException):
+            # Сервер закрыл соединение: следующий запрос откроет новое
+            self.connection.close()
+            raise
+        return response.status
+
+    def close(self):
+        self.connection.close()
+
+
+def replay(records, make_target, tokens, concurrency=1, rate=0):
+    """
+    Выполняет записи `records` в `concurrency` потоков, не чаще `rate`
+    запросов в секунду (0 — без ограничения). `make_target()` создаёт
+    ClientTarget или HttpTarget для потока. Возвращает
+    [(эндпоинт, статус, мс)] и общее время в секундах; статус 0 —
+    ошибка соединения.
+    """
+    lock = threading.Lock()
+    position = iter(range(len(records)))
+    started = monotonic()
+
+    def run():
+        target = make_target()
+        results = []
+        try:
+            while True:
+                with lock:
+                    index = next(position, None)
+                if index is None:
+                    return results
+                if rate:
+                    # Расписание общее: запрос index уходит не раньше
+                    # index / rate секунд от начала
+                    delay = started + index / rate - monotonic()
+                    if delay > 0:
+                        sleep(delay)
+                record = records[index]
+                request_started = perf_counter()
+                try:
+                    status = target.send(
+                        record, tokens.get(record['identity'])
+                    )
+                except (OSError, http.client.HTTPException):
+                    status = 0
+                results.append((
+                    get_endpoint(record), status,
+                    (perf_counter() - request_started) * 1000,
+                ))
+        finally:
+            target.close()
+
+    def run_thread():
+        try:
+            return run()
+        finally:
+            connections.close_all()
+
+    workers = max(1, min(concurrency, len(records)))
+    if workers == 1:
+        return run(), monotonic() - started
+    with ThreadPoolExecutor(workers) as executor:
+        futures = [executor.submit(run_thread) for _ in range(workers)]
+        results = [row for future in futures for row in future.result()]
+    return results, monotonic() - started
+
+
+def summarize(results, elapsed):
+    """
+    Сводка по эндпоинтам: число запросов, запросов в секунду,
+    перцентили времени (мс), доли 4xx и 5xx (с ошибками соединения).
+    """
+    groups = defaultdict(list)
+    for endpoint, status, duration in results:
+        groups[endpoint].append((status, duration))
+    groups['Всего'] = [(status, duration) for _, status, duration in results]
+    summary = {}
+    for endpoint, rows in groups.items():
+        durations = sorted(duration for _, duration in rows)
+        summary[endpoint] = {
+            'count': len(rows),
+            'rps': len(rows) / elapsed if elapsed else 0,
+            'p50': percentile(durations, 0.5),
+            'p95': percentile(durations, 0.95),
+            'p99': percentile(durations, 0.99),
+            'max': durations[-1],
+            'client_errors': sum(
+                400 <= status < 500 for status, _ in rows
+            ) / len(rows),
+            'server_errors': sum(
+                status >= 500 or status == 0 for status, _ in rows
+            ) / len(rows),
+        }
+    return summary
@@ -1,17 +1,30 @@
+from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.db import transaction
 from rest_framework import serializers
 
+from api.batch import FORWARDED_HEADERS
+from api.fast_serializers import RecipeFastReadSerializer
+from api.fieldsets import SparseFieldsMixin
 from api.fields import Base64ImageField
+from api.jobs import enqueue
+from api.tasks import resize_image
+from recipes.constants import (
+    PANTRY_DEFAULT_MISSING, PANTRY_MAX_INGREDIENTS, PANTRY_MAX_MISSING
+)
 from recipes.models import (Ingredient, Recipe, RecipeIngredient, Tag)
+from recipes.signals import recipe_saved
 from users.models import Subscription
 
 
 User = get_user_model()
 
 
-class UserSerializer(serializers.ModelSerializer):
-    """Сериализатор для пользователей, включает все поля пользователя."""
+class UserSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    """
+    Сериализатор для пользователей, включает все поля пользователя
+    (или только заданные ?fields= / ?omit=).
+    """
     is_subscribed = serializers.SerializerMethodField()
     avatar = Base64ImageField(required=False, allow_null=True)
 
@@ -52,6 +65,11 @@ class UserAvatarSerializer(serializers.ModelSerializer):
 
         return data
 
+    def update(self, instance, validated_data):
+        instance = super().update(instance, validated_data)
+        enqueue(resize_image, User._meta.label, instance.pk, 'avatar')
+        return instance
+
 
 class TagSerializer(serializers.ModelSerializer):
     class Meta:
@@ -91,6 +109,52 @@ class RecipeIngredientWriteSerializer(serializers.Serializer):
         return value
 
 
+class PantryQuerySerializer(serializers.Serializer):
+    """Параметры подбора рецептов: ?ingredients=1&ingredients=2."""
+    ingredients = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        min_length=1, max_length=PANTRY_MAX_INGREDIENTS,
+    )
+    max_missing = serializers.IntegerField(
+        min_value=0, max_value=PANTRY_MAX_MISSING,
+        default=PANTRY_DEFAULT_MISSING,
+    )
+
+
+class BatchItemSerializer(serializers.Serializer):
+    """Подзапрос пакета: GET по пути API и условные заголовки."""
+    method = serializers.ChoiceField(choices=['GET'], default='GET')
+    path = serializers.CharField(max_length=2048)
+    headers = serializers.DictField(
+        child=serializers.CharField(), required=False, default=dict
+    )
+
+    def validate_path(self, value):
+        if not value.startswith('/api/') or value.startswith('/api/batch/'):
+            raise serializers.ValidationError(
+                'Укажите путь API, например /api/tags/.'
+            )
+        return value
+
+    def validate_headers(self, value):
+        allowed = {name.lower(): name for name in FORWARDED_HEADERS}
+        unknown = [name for name in value if name.lower() not in allowed]
+        if unknown:
+            raise serializers.ValidationError(
+                'Можно передать только заголовки '
+                f'{", ".join(allowed.values())}.'
+            )
+        return {allowed[name.lower()]: item for name, item in value.items()}
+
+
+class BatchSerializer(serializers.Serializer):
+    requests = BatchItemSerializer(
+        many=True, allow_empty=False,
+        max_length=settings.BATCH['MAX_REQUESTS'],
+    )
+    concurrent = serializers.BooleanField(default=False)
+
+
 class RecipeReadSerializer(serializers.ModelSerializer):
     ingredients = RecipeIngredientSerializer(
         many=True, source='recipeingredient_set'
@@ -179,6 +243,10 @@ class RecipeSerializer(serializers.ModelSerializer):
         )
         recipe.tags.set(tags_data)
         self._process_recipe_ingredients(recipe, ingredients_data)
+        recipe_saved.send(
+            sender=Recipe, instance=recipe, ingredients_changed=True
+        )
+        enqueue(resize_image, Recipe._meta.label, recipe.pk, 'image')
         return recipe
 
     @transaction.atomic
@@ -189,9 +257,21 @@ class RecipeSerializer(serializers.ModelSerializer):
 
         # Обновляем теги
         instance.tags.set(tags_data)
+        old_ingredient_ids = set(
+            instance.ingredients.values_list('id', flat=True)
+        )
         # Удаляем старые ингредиенты
         instance.ingredients.clear()
         self._process_recipe_ingredients(instance, ingredients_data)
+        recipe_saved.send(
+            sender=Recipe, instance=instance,
+            ingredients_changed=old_ingredient_ids != {
+                ingredient_data['id'].id
+                for ingredient_data in ingredients_data
+            },
+        )
+        if 'image' in validated_data:
+            enqueue(resize_image, Recipe._meta.label, instance.pk, 'image')
         return instance
 
     def _process_recipe_ingredients(self, recipe, ingredients_data):
@@ -211,7 +291,7 @@ class RecipeSerializer(serializers.ModelSerializer):
 
     def to_representation(self, instance):
         # Передаём объект в сериализатор для чтения
-        read_serializer = RecipeReadSerializer(
+        read_serializer = RecipeFastReadSerializer(
             instance, context=self.context
         )
         return read_serializer.data
@@ -0,0 +1,138 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from api.authentication import invalidate_tokens
+from api.cache import (
+    bump_ingredients_version, bump_recipes_version, invalidate_tag_map
+)
+from api.documents import (
+    INLINE_REBUILD_SIZE, discard_documents, rebuild_documents
+)
+from api.jobs import enqueue
+from api.models import RequestProfile
+from api.profiling import get_profile_path
+from api.tasks import rebuild_recipe_documents, update_similar
+from foodgram.db.deletion import bulk_deleted
+from recipes.models import Ingredient, Recipe, Tag
+from recipes.signals import recipe_saved
+
+User = get_user_model()
+
+
+@receiver(post_delete, sender=Token)
+def invalidate_deleted_token(sender, instance, **kwargs):
+    """Выход через djoser и удаление токена сбрасывают его из кэша."""
+    invalidate_tokens([instance.key])
+
+
+@receiver(post_save, sender=User)
+def invalidate_user_tokens(sender, instance, **kwargs):
+    """
+    Смена пароля, деактивация и любое другое изменение пользователя
+    сбрасывают закэшированные токены, чтобы не отдавать устаревший объект.
+    """
+    invalidate_tokens(
+        Token.objects.filter(user=instance).values_list('key', flat=True)
+    )
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+def reset_tag_map(sender, **kwargs):
+    invalidate_tag_map()
+    # От набора тегов зависит и проверка фильтра ?tags=
+    bump_recipes_version()
+
+
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Ingredient)
+@receiver(bulk_deleted, sender=Ingredient)
+def reset_ingredient_search(sender, **kwargs):
+    bump_ingredients_version()
+
+
+@receiver(post_delete, sender=Recipe)
+@receiver(bulk_deleted, sender=Recipe)
+def reset_recipe_responses(sender, **kwargs):
+    bump_recipes_version()
+
+
+@receiver(bulk_deleted, sender=Token)
+def invalidate_bulk_deleted_tokens(sender, pks, **kwargs):
+    invalidate_tokens(pks)
+
+
+@receiver(recipe_saved, sender=Recipe)
+def rebuild_recipe_document(sender, instance, **kwargs):
+    rebuild_documents([instance.pk])
+    bump_recipes_version()
+
+
+@receiver(recipe_saved)
+def update_recipe_similar(sender, instance, ingredients_changed=True,
+                          **kwargs):
+    """Количества на близость не влияют, только набор ингредиентов."""
+    if ingredients_changed:
+        enqueue(update_similar, instance.pk, unique=True)
+
+
+def refresh_documents(recipe_ids):
+    """
+    Немного документов пересобирается в транзакции изменения, остальные
+    удаляются до пересборки воркером (см. api.documents).
+    """
+    recipe_ids = list(recipe_ids)
+    if not recipe_ids:
+        return
+    if len(recipe_ids) <= INLINE_REBUILD_SIZE:
+        rebuild_documents(recipe_ids)
+    else:
+        discard_documents(recipe_ids)
+        enqueue(rebuild_recipe_documents, recipe_ids)
+    bump_recipes_version()
+
+
+@receiver(post_save, sender=Ingredient)
+def rebuild_ingredient_documents(sender, instance, **kwargs):
+    refresh_documents(
+        instance.recipe_set.values_list('pk', flat=True)
+    )
+
+
+@receiver(post_save, sender=Tag)
+def rebuild_tag_documents(sender, instance, **kwargs):
+    refresh_documents(instance.recipes.values_list('pk', flat=True))
+
+
+@receiver(pre_delete, sender=Ingredient)
+@receiver(pre_delete, sender=Tag)
+def remember_related_recipes(sender, instance, **kwargs):
+    """Связи удаляются каскадом раньше post_delete, запоминаем рецепты."""
+    instance._document_recipe_ids = list(
+        instance.recipe_set.values_list('pk', flat=True)
+        if sender is Ingredient
+        else instance.recipes.values_list('pk', flat=True)
+    )
+
+
+@receiver(post_delete, sender=Ingredient)
+@receiver(post_delete, sender=Tag)
+def rebuild_related_documents(sender, instance, **kwargs):
+    refresh_documents(getattr(instance, '_document_recipe_ids', []))
+
+
+@receiver(post_save, sender=User)
+def rebuild_author_documents(sender, instance, update_fields=None,
+                             **kwargs):
+    """Профиль автора хранится в документах его рецептов."""
+    if update_fields and set(update_fields) <= {'last_login', 'password'}:
+        return
+    refresh_documents(instance.recipes.values_list('pk', flat=True))
+
+
+@receiver(post_delete, sender=RequestProfile)
+def delete_profile_files(sender, instance, **kwargs):
+    for name in instance.get_files():
+        get_profile_path(name).unlink(missing_ok=True)
@@ -0,0 +1,49 @@
+"""
+Фоновые задачи (см. api.jobs): работа, которую сигналы не делают
+в запросе, потому что она растёт с числом затронутых рецептов.
+"""
+from django.apps import apps
+from django.conf import settings
+from PIL import Image
+
+from api.cache import bump_recipes_version
+from api.documents import rebuild_documents_for
+from api.jobs import task
+from recipes.models import Recipe
+from recipes.utils.similarity import update_similar_recipes
+
+
+@task
+def rebuild_recipe_documents(recipe_ids):
+    """Документы рецептов после изменения их автора, тега или ингредиента."""
+    if rebuild_documents_for(Recipe.objects.filter(pk__in=recipe_ids)):
+        bump_recipes_version()
+
+
+@task
+def update_similar(recipe_id):
+    """Похожие рецепты после изменения набора ингредиентов рецепта."""
+    update_similar_recipes(recipe_id)
+
+
+@task
+def resize_image(model_label, pk, field_name):
+    """
+    Уменьшает загруженное изображение до IMAGE_MAX_SIZE точек по большей
+    стороне. Файл перезаписывается под тем же именем, поэтому ссылки на
+    него в документах и закэшированных ответах остаются верными.
+    """
+    instance = apps.get_model(model_label).objects.filter(pk=pk).first()
+    file = getattr(instance, field_name, None)
+    if not file:
+        return
+    max_size = settings.IMAGE_MAX_SIZE
+    with file.open('rb'):
+        image = Image.open(file)
+        image.load()
+    if max(image.size) <= max_size:
+        return
+    image_format = image.format
+    image.thumbnail((max_size, max_size))
+    with file.storage.open(file.name, 'wb') as output:
+        image.save(output, format=image_format)
@@ -0,0 +1,1299 @@
+import base64
+import datetime
+import inspect
+import os
+import random
+import shutil
+import tempfile
+import uuid
+from decimal import Decimal
+from io import BytesIO
+from pathlib import Path
+from unittest import mock
+
+from asgiref.sync import async_to_sync
+import django
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.core.paginator import EmptyPage
+from django.db import DEFAULT_DB_ALIAS, connection, connections, models
+from django.db.models import QuerySet
+from django.db.models.deletion import ProtectedError
+from django.db.models.signals import post_delete
+from django.http import HttpResponse, QueryDict
+from django.test import (
+    AsyncClient, RequestFactory, SimpleTestCase, TestCase,
+    TransactionTestCase, override_settings
+)
+from django.test.utils import CaptureQueriesContext
+from django.utils.translation import gettext_lazy
+from PIL import Image
+from rest_framework import serializers
+from rest_framework.renderers import JSONRenderer
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from api.authentication import token_cache
+from api.cache import (
+    RECIPES_VERSION_KEY, bump_recipes_version, get_or_build_response,
+    get_recipes_version, get_response_key
+)
+from api.fast_serializers import RecipeFastReadSerializer
+from api.fieldsets import SparseFieldsMixin
+from api.fragments import (
+    get_fragment_stats, get_shared_cache, get_version_key, local_fragments
+)
+from api.ingredient_search import (
+    get_trigrams, search_ingredients, word_similarity
+)
+from api.jobs import run_job
+from api.models import Job, RequestProfile
+from api.pantry import (
+    PantryIndex, PantryIndexUpdater, PantryMatches, iter_bits_descending
+)
+from api.parsers import ORJSONParser
+from api.profiling import profiling_lock
+from api.renderers import ORJSONRenderer
+from api.replay import (
+    ClientTarget, get_tokens, load_capture, replay, summarize
+)
+from api.serializers import (
+    RecipeReadSerializer, TagSerializer, UserSerializer
+)
+from api.traffic import REPLAY_PASSWORD, CaptureFile, pseudonymize
+from foodgram.db.deletion import fast_delete
+from foodgram.db.estimates import EstimatedCountPaginator
+from foodgram.db.routers import (
+    PrimaryReplicaRouter, ReplicaPinMiddleware, is_pinned, use_replica
+)
+from recipes.models import (
+    Favorite, Ingredient, Recipe, RecipeIngredient, ShoppingList, Tag
+)
+from recipes.signals import recipe_saved
+from recipes.constants import MAX_TAG_MASK_BITS
+from recipes.utils.tags_mask import TAG_MASKS_KEY, get_tag_masks
+from users.models import Subscription
+
+User = get_user_model()
+
+
+class RecipeDataMixin:
+    """Два автора, три тега и рецепты с разными наборами тегов."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author, cls.reader = [
+            User.objects.create_user(
+                email=f'{name}@example.com', username=name,
+                first_name=name, last_name=name, password='pass12345x',
+                avatar='avatars/author.png' if name == 'author' else '',
+            )
+            for name in ('author', 'reader')
+        ]
+        cls.breakfast, cls.lunch, cls.dinner = [
+            Tag.objects.create(name=slug, slug=slug)
+            for slug in ('breakfast', 'lunch', 'dinner')
+        ]
+        salt = Ingredient.objects.create(name='соль', measurement_unit='г')
+        sugar = Ingredient.objects.create(name='сахар', measurement_unit='г')
+        cls.recipes = {}
+        for name, author, tags in (
+            ('Каша', cls.author, [cls.breakfast]),
+            ('Суп', cls.author, [cls.breakfast, cls.lunch]),
+            ('Рагу', cls.reader, [cls.lunch, cls.dinner]),
+            ('Чай', cls.reader, []),
+        ):
+            recipe = Recipe.objects.create(
+                author=author, name=name, text=f'{name}, описание',
+                image=f'recipes/images/{name}.png', cooking_time=5,
+            )
+            recipe.tags.set(tags)
+            RecipeIngredient.objects.bulk_create([
+                RecipeIngredient(recipe=recipe, ingredient=salt, quantity=1),
+                RecipeIngredient(
+                    recipe=recipe, ingredient=sugar, quantity=2.5
+                ),
+            ])
+            recipe_saved.send(sender=Recipe, instance=recipe)
+            cls.recipes[name] = recipe
+        Favorite.objects.create(user=cls.reader, recipe=cls.recipes['Каша'])
+        ShoppingList.objects.create(
+            user=cls.reader, recipe=cls.recipes['Суп']
+        )
+        Subscription.objects.create(user=cls.reader, subscribed_to=cls.author)
+
+    def setUp(self):
+        # Маски тегов и версии ответов лежат в кэше
+        cache.clear()
+
+
+class FastReadSerializerTests(RecipeDataMixin, TestCase):
+    """Быстрый сериализатор отдаёт тот же JSON, что RecipeReadSerializer."""
+
+    def get_request(self, user):
+        request = RequestFactory().get('/api/recipes/')
+        request.user = user
+        return request
+
+    def render(self, serializer_class, recipes, user, many):
+        data = serializer_class(
+            recipes, many=many, context={'request': self.get_request(user)}
+        ).data
+        return JSONRenderer().render(data)
+
+    def assertSameJSON(self, user, many):
+        recipes = Recipe.objects.with_user_flags(user)
+        reference_recipes = recipes.select_related(
+            'author'
+        ).prefetch_related('tags', 'recipeingredient_set__ingredient')
+        if not many:
+            recipes = recipes.get(pk=self.recipes['Суп'].pk)
+            reference_recipes = reference_recipes.get(pk=recipes.pk)
+        self.assertEqual(
+            self.render(RecipeFastReadSerializer, recipes, user, many),
+            self.render(RecipeReadSerializer, reference_recipes, user, many),
+        )
+
+    def test_anonymous(self):
+        for many in (True, False):
+            with self.subTest(many=many):
+                self.assertSameJSON(AnonymousUser(), many)
+
+    def test_authenticated(self):
+        for many in (True, False):
+            with self.subTest(many=many):
+                self.assertSameJSON(self.reader, many)
+
+    def test_subscriptions(self):
+        data = self.render(
+            RecipeFastReadSerializer,
+            Recipe.objects.with_user_flags(self.reader),
+            self.reader, many=True,
+        )
+        self.assertEqual(data.count(b'"is_subscribed":true'), 2)
+        self.assertSameJSON(self.reader, many=True)
+
+
+class RecipeFilterTests(RecipeDataMixin, TestCase):
+    """Фильтры списка рецептов без соединений и DISTINCT."""
+
+    def get_names(self, query, user=None):
+        client = APIClient()
+        if user is not None:
+            client.force_authenticate(user)
+        # Набор масок (SELECT DISTINCT tags_mask) читается из кэша
+        get_tag_masks()
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get(f'/api/recipes/?{query}')
+        self.assertEqual(response.status_code, 200)
+        for query in queries:
+            if 'FROM "recipes_recipe"' in query['sql']:
+                self.assertNotIn('JOIN', query['sql'])
+                self.assertNotIn('DISTINCT', query['sql'])
+        data = response.json()
+        names = [recipe['name'] for recipe in data['results']]
+        self.assertEqual(data['count'], len(names))
+        return names
+
+    def test_several_tags(self):
+        names = self.get_names('tags=breakfast&tags=lunch')
+
+        self.assertCountEqual(names, ['Каша', 'Суп', 'Рагу'])
+
+    def test_tags_changed(self):
+        masks = get_tag_masks()
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            self.recipes['Чай'].tags.set([self.dinner])
+            # Набор масок сбрасывается только после коммита
+            self.assertEqual(cache.get(TAG_MASKS_KEY), masks)
+        self.assertEqual(len(callbacks), 1)
+
+        self.assertCountEqual(
+            self.get_names('tags=dinner'), ['Рагу', 'Чай']
+        )
+
+    def test_too_many_masks(self):
+        with mock.patch('recipes.utils.tags_mask.MAX_KNOWN_TAG_MASKS', 2):
+            self.assertIsNone(get_tag_masks())
+            names = self.get_names('tags=lunch')
+
+        self.assertCountEqual(names, ['Суп', 'Рагу'])
+
+    def test_tag_without_bit(self):
+        tag = Tag.objects.create(
+            pk=MAX_TAG_MASK_BITS + 1, name='ужин', slug='late'
+        )
+        self.recipes['Чай'].tags.add(tag)
+        self.recipes['Чай'].refresh_from_db()
+        self.assertEqual(self.recipes['Чай'].tags_mask, 0)
+
+        self.assertCountEqual(
+            self.get_names('tags=late&tags=breakfast'), ['Каша', 'Суп', 'Чай']
+        )
+
+    def test_is_favorited(self):
+        self.assertEqual(
+            self.get_names('is_favorited=1', self.reader), ['Каша']
+        )
+        self.assertCountEqual(
+            self.get_names('is_favorited=0', self.reader),
+            ['Суп', 'Рагу', 'Чай'],
+        )
+        self.assertEqual(self.get_names('is_favorited=1'), [])
+
+    def test_is_in_shopping_cart(self):
+        self.assertEqual(
+            self.get_names('is_in_shopping_cart=1', self.reader), ['Суп']
+        )
+        self.assertCountEqual(
+            self.get_names(
+                'is_in_shopping_cart=0&tags=breakfast', self.reader
+            ),
+            ['Каша'],
+        )
+
+    def test_flags_in_response(self):
+        client = APIClient()
+        client.force_authenticate(self.reader)
+        flags = {
+            recipe['name']: (
+                recipe['is_favorited'], recipe['is_in_shopping_cart']
+            )
+            for recipe in client.get('/api/recipes/').json()['results']
+        }
+
+        self.assertEqual(flags, {
+            'Каша': (True, False), 'Суп': (False, True),
+            'Рагу': (False, False), 'Чай': (False, False),
+        })
+
+
+class SparseRecipeSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    author = UserSerializer()
+    tags = TagSerializer(many=True)
+
+    class Meta:
+        model = Recipe
+        fields = ('id', 'name', 'text', 'author', 'tags')
+
+
+class SparseFieldsTests(RecipeDataMixin, TestCase):
+    """?fields= и ?omit= оставляют в ответе только нужные поля."""
+
+    def serialize(self, serializer_class, instance, query, method='get'):
+        request = getattr(RequestFactory(), method)(f'/api/?{query}')
+        request.user = self.reader
+        return serializer_class(instance, context={'request': request}).data
+
+    def test_fields(self):
+        with self.assertNumQueries(0):
+            data = self.serialize(
+                UserSerializer, self.author, 'fields=id,username'
+            )
+        self.assertEqual(
+            data, {'id': self.author.pk, 'username': 'author'}
+        )
+        data = self.serialize(
+            UserSerializer, self.author, 'omit=email&omit=avatar'
+        )
+        self.assertEqual(set(data), {
+            'id', 'username', 'first_name', 'last_name', 'is_subscribed',
+        })
+        self.assertTrue(data['is_subscribed'])
+
+    def test_nested(self):
+        recipe = self.recipes['Суп']
+        data = self.serialize(
+            SparseRecipeSerializer, recipe,
+            'fields=name,author.username,tags.slug',
+        )
+        self.assertEqual(data, {
+            'name': 'Суп',
+            'author': {'username': 'author'},
+            'tags': [{'slug': 'breakfast'}, {'slug': 'lunch'}],
+        })
+        data = self.serialize(
+            SparseRecipeSerializer, recipe, 'omit=text,author.email,tags'
+        )
+        self.assertEqual(set(data), {'id', 'name', 'author'})
+        self.assertNotIn('email', data['author'])
+        self.assertIn('username', data['author'])
+
+    def test_unsafe_method(self):
+        data = self.serialize(
+            UserSerializer, self.author, 'fields=id', method='post'
+        )
+        self.assertIn('email', data)
+
+    def test_unknown_field(self):
+        with self.assertRaises(serializers.ValidationError):
+            self.serialize(UserSerializer, self.author, 'fields=id,password')
+        response = self.client.get('/api/users/?fields=password')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('fields', response.json())
+
+    def test_api(self):
+        token = Token.objects.create(user=self.reader)
+        for path, fields in (
+            ('/api/users/?fields=id,username', {'id', 'username'}),
+            (
+                '/api/users/subscriptions/?fields=id&fields=recipes_count',
+                {'id', 'recipes_count'},
+            ),
+        ):
+            with self.subTest(path=path):
+                response = self.client.get(
+                    path, headers={'Authorization': f'Token {token}'}
+                )
+                self.assertEqual(response.status_code, 200)
+                self.assertTrue(response.json()['results'])
+                for item in response.json()['results']:
+                    self.assertEqual(set(item), fields)
+
+
+class AsyncRecipeViewTests(RecipeDataMixin, TestCase):
+    """Асинхронные представления рецептов отвечают как вьюсет."""
+
+    @override_settings(ROOT_URLCONF='foodgram.urls_asgi')
+    def get_async(self, path, headers):
+        return async_to_sync(AsyncClient().get)(path, headers=headers)
+
+    def test_same_responses(self):
+        token = Token.objects.create(user=self.reader)
+        for headers in ({}, {'Authorization': f'Token {token}'}):
+            for path in (
+                '/api/recipes/', '/api/recipes/?tags=lunch&limit=1',
+                f'/api/recipes/{self.recipes["Суп"].pk}/',
+            ):
+                with self.subTest(path=path, headers=headers):
+                    expected = self.client.get(path, headers=headers)
+                    response = self.get_async(path, headers)
+
+                    self.assertEqual(response.content, expected.content)
+                    for header in ('ETag', 'Last-Modified', 'Vary'):
+                        self.assertEqual(
+                            response.get(header), expected.get(header)
+                        )
+                    self.assertEqual(self.get_async(path, {
+                        **headers, 'If-None-Match': expected['ETag']
+                    }).status_code, 304)
+
+    def test_content_negotiation(self):
+        for path, accept in (
+            ('/api/recipes/', 'text/html'),
+            ('/api/recipes/?format=api', '*/*'),
+            ('/api/recipes/?format=json', 'text/html'),
+            ('/api/recipes/', 'application/xml'),
+            ('/api/tags/', 'application/xml'),
+        ):
+            with self.subTest(path=path, accept=accept):
+                expected = self.client.get(path, headers={'Accept': accept})
+                response = self.get_async(path, {'Accept': accept})
+
+                self.assertEqual(response.status_code, expected.status_code)
+                self.assertEqual(
+                    response['Content-Type'], expected['Content-Type']
+                )
+                if 'html' not in expected['Content-Type']:
+                    self.assertEqual(response.content, expected.content)
+
+
+@override_settings(RECIPE_RESPONSE_CACHE={
+    'ENABLED': True, 'TIMEOUT': 60, 'LOCK_TIMEOUT': 1,
+})
+class ResponseCacheTests(RecipeDataMixin, TestCase):
+    """Кэш анонимных ответов: версия набора рецептов и блокировка сборки."""
+
+    key = get_response_key('/api/recipes/', QueryDict('tags=lunch'))
+
+    def test_response_key(self):
+        self.assertEqual(
+            get_response_key('/api/recipes/', QueryDict('a=1&b=2&a=3')),
+            get_response_key('/api/recipes/', QueryDict('b=2&a=3&a=1')),
+        )
+        self.assertNotEqual(
+            get_response_key('/api/recipes/', QueryDict('a=1')),
+            get_response_key('/api/recipes/', QueryDict('a=2')),
+        )
+
+    def test_recipes_version(self):
+        version = get_recipes_version()
+        self.assertEqual(get_recipes_version(), version)
+        with self.captureOnCommitCallbacks(execute=True):
+            bump_recipes_version()
+        self.assertGreater(get_recipes_version(), version)
+        # Вытесненная версия не повторяет прежнюю
+        version = get_recipes_version()
+        cache.delete(RECIPES_VERSION_KEY)
+        self.assertGreater(get_recipes_version(), version)
+
+    def test_anonymous_hit(self):
+        path = '/api/recipes/?tags=lunch&tags=breakfast'
+        response = self.client.get(path)
+        with self.assertNumQueries(0):
+            cached = self.client.get('/api/recipes/?tags=breakfast&tags=lunch')
+        self.assertEqual(cached.content, response.content)
+        self.assertEqual(cached['ETag'], response['ETag'])
+
+        token = Token.objects.create(user=self.reader)
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(path, headers={'Authorization': f'Token {token}'})
+        self.assertTrue(queries)
+
+    def test_version_bump(self):
+        count = self.client.get('/api/recipes/').json()['count']
+        with self.captureOnCommitCallbacks(execute=True):
+            # Сигналы удаления сменяют версию набора рецептов
+            self.recipes['Чай'].delete()
+        self.assertEqual(
+            self.client.get('/api/recipes/').json()['count'], count - 1
+        )
+
+    def test_stale_while_locked(self):
+        self.assertEqual(get_or_build_response(self.key, lambda: 'v1'), 'v1')
+        self.assertEqual(get_or_build_response(self.key, lambda: 'v2'), 'v1')
+        with self.captureOnCommitCallbacks(execute=True):
+            bump_recipes_version()
+        # Пересборку начал другой воркер: отдаём предыдущую версию
+        cache.add(f'{self.key}:lock', True)
+        self.assertEqual(get_or_build_response(self.key, lambda: 'v2'), 'v1')
+        cache.delete(f'{self.key}:lock')
+        self.assertEqual(get_or_build_response(self.key, lambda: 'v2'), 'v2')
+        self.assertEqual(get_or_build_response(self.key, lambda: 'v3'), 'v2')
+
+    def test_wait_for_lock(self):
+        cache.add(f'{self.key}:lock', True)
+        build = mock.Mock(return_value='v1')
+        with mock.patch('api.cache.time.sleep') as sleep:
+            # Другой воркер собрал ответ, пока этот ждал
+            sleep.side_effect = lambda seconds: cache.set(
+                self.key, (get_recipes_version(), 'built')
+            )
+            self.assertEqual(get_or_build_response(self.key, build), 'built')
+            build.assert_not_called()
+            # Блокировку так и не отпустили: собираем сами после таймаута
+            cache.delete(self.key)
+            sleep.side_effect = None
+            self.assertEqual(get_or_build_response(self.key, build), 'v1')
+
+    def test_not_cached(self):
+        self.assertIsNone(get_or_build_response(self.key, lambda: None))
+        self.assertEqual(get_or_build_response(self.key, lambda: 'v1'), 'v1')
+        self.assertFalse(cache.get(f'{self.key}:lock'))
+
+
+@override_settings(RECIPE_FRAGMENT_CACHE={
+    **settings.RECIPE_FRAGMENT_CACHE, 'ENABLED': True,
+})
+class FragmentCacheTests(TransactionTestCase):
+    """
+    Документы рецептов из кэша фрагментов сменяются при изменении
+    рецепта, тега, ингредиента и автора. Вне TestCase: внутри транзакции
+    кэш фрагментов не читается.
+    """
+
+    def setUp(self):
+        cache.clear()
+        local_fragments.clear()
+        self.author = User.objects.create_user(
+            email='author@example.com', username='author',
+            first_name='Автор', last_name='Авторов', password='pass12345x',
+        )
+        self.tag = Tag.objects.create(name='Обед', slug='lunch')
+        self.ingredient = Ingredient.objects.create(
+            name='соль', measurement_unit='г'
+        )
+        self.recipe = Recipe.objects.create(
+            author=self.author, name='Суп', text='Суп, описание',
+            image='recipes/images/soup.png', cooking_time=5,
+        )
+        self.recipe.tags.set([self.tag])
+        RecipeIngredient.objects.create(
+            recipe=self.recipe, ingredient=self.ingredient, quantity=1
+        )
+        recipe_saved.send(sender=Recipe, instance=self.recipe)
+        self.client = APIClient()
+        self.client.force_authenticate(self.author)
+
+    def get_recipe(self):
+        with CaptureQueriesContext(connection) as queries:
+            data = self.client.get(f'/api/recipes/{self.recipe.pk}/').json()
+        self.loaded = any(
+            'recipes_recipedocument' in query['sql'] for query in queries
+        )
+        return data
+
+    def test_cached(self):
+        data = self.get_recipe()
+        self.assertTrue(self.loaded)
+        self.assertEqual(self.get_recipe(), data)
+        self.assertFalse(self.loaded)
+        # Другой воркер: LRU процесса пуст, документ из общего кэша
+        local_fragments.clear()
+        shared_hits = get_fragment_stats().get('shared_hits', 0)
+        self.assertEqual(self.get_recipe(), data)
+        self.assertFalse(self.loaded)
+        self.assertEqual(get_fragment_stats()['shared_hits'], shared_hits + 1)
+
+    def test_invalidation(self):
+        def rename_recipe():
+            self.recipe.name = 'Щи'
+            self.recipe.save()
+            recipe_saved.send(sender=Recipe, instance=self.recipe)
+
+        def rename_tag():
+            self.tag.name = 'Ужин'
+            self.tag.save()
+
+        def rename_ingredient():
+            self.ingredient.name = 'перец'
+            self.ingredient.save()
+
+        def rename_author():
+            self.author.first_name = 'Повар'
+            self.author.save()
+
+        for change, value in (
+            (rename_recipe, lambda data: data['name']),
+            (rename_tag, lambda data: data['tags'][0]['name']),
+            (rename_ingredient, lambda data: data['ingredients'][0]['name']),
+            (rename_author, lambda data: data['author']['first_name']),
+        ):
+            with self.subTest(change=change.__name__):
+                before = value(self.get_recipe())
+                self.get_recipe()
+                self.assertFalse(self.loaded)
+
+                change()
+
+                self.assertNotEqual(value(self.get_recipe()), before)
+                self.assertTrue(self.loaded)
+
+    def test_version_evicted(self):
+        data = self.get_recipe()
+        get_shared_cache().delete(get_version_key(self.recipe.pk))
+        self.assertEqual(self.get_recipe(), data)
+        self.assertTrue(self.loaded)
+
+
+@override_settings(COUNT_ESTIMATE_THRESHOLD=3)
+class EstimatedCountPaginatorTests(RecipeDataMixin, TestCase):
+    """Оценка числа строк только на больших выборках, иначе COUNT(*)."""
+
+    def get_paginator(self, estimate, per_page=2):
+        paginator = EstimatedCountPaginator(
+            Recipe.objects.order_by('pk'), per_page
+        )
+        with mock.patch(
+            'foodgram.db.estimates.estimate_count', return_value=estimate
+        ):
+            paginator.count
+        return paginator
+
+    def test_exact_count(self):
+        # None — оценки нет (не PostgreSQL), 2 — меньше порога
+        for estimate in (None, 2):
+            with self.subTest(estimate=estimate):
+                paginator = self.get_paginator(estimate)
+                self.assertEqual(paginator.count, len(self.recipes))
+                self.assertFalse(paginator.is_estimated)
+                with self.assertRaises(EmptyPage):
+                    paginator.page(3)
+        with override_settings(COUNT_ESTIMATE_THRESHOLD=0):
+            paginator = self.get_paginator(100)
+            self.assertEqual(paginator.count, len(self.recipes))
+            self.assertFalse(paginator.is_estimated)
+
+    def test_not_postgresql(self):
+        paginator = EstimatedCountPaginator(Recipe.objects.order_by('pk'), 2)
+        self.assertEqual(paginator.count, len(self.recipes))
+        self.assertFalse(paginator.is_estimated)
+
+    def test_estimated_count(self):
+        paginator = self.get_paginator(3)
+        self.assertEqual(paginator.count, 3)
+        self.assertTrue(paginator.is_estimated)
+        # Оценка занижена: вторая страница всё равно полная
+        self.assertEqual(len(paginator.page(2)), 2)
+        # За концом выборки — пустая страница, а не ошибка
+        self.assertEqual(len(paginator.page(5)), 0)
+        with self.assertRaises(EmptyPage):
+            paginator.page(0)
+
+    def test_list(self):
+        paginator = EstimatedCountPaginator([1, 2, 3], 2)
+        self.assertEqual(paginator.count, 3)
+        self.assertFalse(paginator.is_estimated)
+
+    def test_api_response(self):
+        with mock.patch(
+            'foodgram.db.estimates.estimate_count', return_value=3
+        ):
+            data = self.client.get('/api/recipes/?limit=2').json()
+        self.assertEqual(
+            list(data)[:2], ['count', 'count_is_approximate']
+        )
+        self.assertEqual(data['count'], 3)
+        self.assertNotIn(
+            'count_is_approximate',
+            self.client.get('/api/recipes/?limit=2').json(),
+        )
+
+
+class ORJSONRendererTests(RecipeDataMixin, TestCase):
+    """orjson отдаёт те же байты, что JSONRenderer из DRF."""
+
+    def assertSameJSON(self, data):
+        self.assertEqual(
+            ORJSONRenderer().render(data), JSONRenderer().render(data)
+        )
+
+    def test_types(self):
+        self.assertSameJSON({
+            'text': 'Щи\u2028да\u2029каша "в" \\ печи',
+            'decimal': Decimal('2.50'),
+            'float': 2.5,
+            'datetime': datetime.datetime(
+                2024, 1, 2, 3, 4, 5, 678901, tzinfo=datetime.timezone.utc
+            ),
+            'date': datetime.date(2024, 1, 2),
+            'time': datetime.time(3, 4, 5),
+            'uuid': uuid.UUID(int=1),
+            'lazy': gettext_lazy('Рецепт'),
+            'ids': (1, 2),
+            1: None,
+            'nested': [{'ok': True}, []],
+        })
+        self.assertEqual(ORJSONRenderer().render(None), b'')
+
+    def test_api_responses(self):
+        for path in (
+            '/api/recipes/', f'/api/recipes/{self.recipes["Суп"].pk}/',
+            '/api/users/', '/api/ingredients/',
+        ):
+            with self.subTest(path=path):
+                response = self.client.get(path)
+                self.assertIsInstance(
+                    response.accepted_renderer, ORJSONRenderer
+                )
+                self.assertEqual(
+                    response.content,
+                    JSONRenderer().render(response.data),
+                )
+
+    def test_parser_round_trip(self):
+        data = {'name': 'Щи', 'ingredients': [{'id': 1, 'amount': 2}]}
+        for encoding in ('utf-8', 'cp1251'):
+            with self.subTest(encoding=encoding):
+                stream = BytesIO(
+                    JSONRenderer().render(data).decode().encode(encoding)
+                )
+                self.assertEqual(ORJSONParser().parse(
+                    stream, parser_context={'encoding': encoding}
+                ), data)
+
+
+class BatchTests(RecipeDataMixin, TestCase):
+    """Подзапросы пакета отвечают как отдельные запросы того же клиента."""
+
+    def post_batch(self, paths, token=None, **item):
+        headers = {}
+        if token is not None:
+            headers['Authorization'] = f'Token {token}'
+        return self.client.post(
+            '/api/batch/',
+            {'requests': [{'path': path, **item} for path in paths]},
+            content_type='application/json', headers=headers,
+        )
+
+    def get_responses(self, paths, token=None, **item):
+        response = self.post_batch(paths, token, **item)
+        self.assertEqual(response.status_code, 200)
+        return response.json()['responses']
+
+    def test_authentication(self):
+        paths = [
+            '/api/users/me/', f'/api/recipes/{self.recipes["Каша"].pk}/',
+            '/api/recipes/?is_favorited=1',
+        ]
+        for token in (None, Token.objects.create(user=self.reader)):
+            headers = {'Authorization': f'Token {token}'} if token else {}
+            for path, item in zip(paths, self.get_responses(paths, token)):
+                with self.subTest(path=path, token=token):
+                    expected = self.client.get(path, headers=headers)
+                    self.assertEqual(item['status'], expected.status_code)
+                    self.assertEqual(item['body'], expected.json())
+
+    def test_item_errors(self):
+        tags = self.get_responses(['/api/tags/'])[0]
+        with mock.patch(
+            'api.views.IngredientViewSet.list', side_effect=RuntimeError
+        ), self.assertLogs('api.batch', 'ERROR'):
+            responses = self.get_responses([
+                '/api/tags/', '/api/recipes/0/', '/api/unknown/',
+                '/api/ingredients/', '/api/users/me/',
+            ])
+        self.assertEqual(
+            [item['status'] for item in responses],
+            [200, 404, 404, 500, 401],
+        )
+        self.assertEqual(responses[0], tags)
+        self.assertIn('detail', responses[2]['body'])
+
+    def test_conditional_headers(self):
+        path = f'/api/recipes/{self.recipes["Суп"].pk}/'
+        etag = self.client.get(path)['ETag']
+        item, = self.get_responses(
+            [path], headers={'If-None-Match': etag}
+        )
+        self.assertEqual(item, {
+            'status': 304, 'headers': item['headers'], 'body': None,
+        })
+        self.assertEqual(item['headers']['ETag'], etag)
+
+    def test_validation(self):
+        for paths, item in (
+            (['/admin/'], {}),
+            (['/api/batch/'], {}),
+            (['/api/tags/'], {'method': 'POST'}),
+            (['/api/tags/'], {'headers': {'Authorization': 'Token x'}}),
+            (['/api/tags/'] * (settings.BATCH['MAX_REQUESTS'] + 1), {}),
+        ):
+            with self.subTest(paths=paths[:1], item=item):
+                self.assertEqual(
+                    self.post_batch(paths, **item).status_code, 400
+                )
+
+
+class IngredientSearchTests(TestCase):
+    """Ранжирование поиска ингредиентов по индексу триграмм в памяти."""
+
+    @classmethod
+    def setUpTestData(cls):
+        Ingredient.objects.bulk_create([
+            Ingredient(name=name, measurement_unit='г') for name in (
+                'фасоль', 'морская соль', 'солод', 'соль морская', 'сахар',
+                'соль',
+            )
+        ])
+
+    def setUp(self):
+        cache.clear()
+
+    def search(self, query):
+        return list(self.client.get(
+            '/api/ingredients/', {'name': query}
+        ).json())
+
+    def test_trigrams(self):
+        self.assertEqual(
+            get_trigrams('Соль!'), ['  с', ' со', 'сол', 'оль', 'ль ']
+        )
+        # Пример из документации pg_trgm
+        self.assertAlmostEqual(word_similarity(
+            set(get_trigrams('word')), get_trigrams('two words')
+        ), 0.8)
+
+    def test_ranking(self):
+        self.assertEqual([item['name'] for item in self.search('соль')], [
+            'соль', 'соль морская', 'морская соль', 'фасоль', 'солод',
+        ])
+        # Опечатка
+        self.assertEqual(
+            [item['name'] for item in self.search(' сахор ')], ['сахар']
+        )
+        self.assertEqual(self.search('перец'), [])
+        self.assertEqual(len(self.search('')), 6)
+
+    @override_settings(INGREDIENT_SEARCH_LIMIT=2)
+    def test_limit(self):
+        self.assertEqual(
+            list(search_ingredients(Ingredient.objects.all(), 'соль')
+                 .values_list('name', flat=True)),
+            ['соль', 'соль морская'],
+        )
+
+    def test_catalog_changed(self):
+        self.assertEqual(self.search('перец'), [])
+        with self.captureOnCommitCallbacks(execute=True):
+            Ingredient.objects.create(name='перец', measurement_unit='г')
+        self.assertEqual(
+            [item['name'] for item in self.search('перец')], ['перец']
+        )
+
+
+class PantryTests(TestCase):
+    """Подбор рецептов по продуктам через индекс в памяти."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(
+            email='author@example.com', username='author',
+            first_name='Автор', last_name='Авторов', password='pass12345x',
+        )
+        cls.salt, cls.egg, cls.milk = [
+            Ingredient.objects.create(name=name, measurement_unit='г')
+            for name in ('соль', 'яйцо', 'молоко')
+        ]
+        cls.recipes = {
+            name: cls.create_recipe(name, ingredients)
+            for name, ingredients in (
+                ('Омлет', [cls.egg, cls.milk]),
+                ('Яичница', [cls.egg, cls.salt]),
+                ('Глазунья', [cls.egg]),
+            )
+        }
+
+    @classmethod
+    def create_recipe(cls, name, ingredients):
+        recipe = Recipe.objects.create(
+            author=cls.author, name=name, text=name,
+            image='recipes/images/recipe.png', cooking_time=5,
+        )
+        RecipeIngredient.objects.bulk_create([
+            RecipeIngredient(recipe=recipe, ingredient=ingredient, quantity=1)
+            for ingredient in ingredients
+        ])
+        return recipe
+
+    def get_names(self, index, ingredients, max_missing=1):
+        names = dict(Recipe.objects.values_list('pk', 'name'))
+        matches = PantryMatches(
+            index.recipe_ids,
+            index.match([ingredient.pk for ingredient in ingredients],
+                        max_missing),
+        )
+        return [(names[pk], missing) for pk, missing in matches[:]]
+
+    def test_order(self):
+        index = PantryIndex.build(version=1)
+
+        # Внутри одного числа недостающих — от новых рецептов к старым
+        self.assertEqual(self.get_names(index, [self.egg]), [
+            ('Глазунья', 0), ('Яичница', 1), ('Омлет', 1),
+        ])
+
+    def test_sync_keeps_order(self):
+        index = PantryIndex.build(version=1)
+        omelette = self.recipes['Омлет']
+        omelette.recipeingredient_set.filter(ingredient=self.milk).update(
+            ingredient=self.salt
+        )
+        self.recipes['Глазунья'].delete()
+        self.create_recipe('Болтунья', [self.egg, self.milk])
+
+        synced = index.sync(version=2)
+
+        self.assertEqual(synced.version, 2)
+        self.assertEqual(self.get_names(synced, [self.egg, self.salt]), [
+            ('Яичница', 0), ('Омлет', 0), ('Болтунья', 1),
+        ])
+        # Исходный индекс не изменился
+        self.assertEqual(len(index.slots), 3)
+        self.assertEqual(
+            self.get_names(synced, [self.egg, self.salt]),
+            self.get_names(PantryIndex.build(version=2),
+                           [self.egg, self.salt]),
+        )
+
+    def test_request_does_not_rebuild(self):
+        updater = PantryIndexUpdater()
+        updater.refresh()
+        index = updater.index
+        with self.captureOnCommitCallbacks(execute=True):
+            self.create_recipe('Болтунья', [self.egg, self.milk])
+            bump_recipes_version()
+        with mock.patch.object(updater, 'start'):
+            with self.assertNumQueries(0):
+                self.assertIs(updater.get_index(), index)
+        self.assertTrue(updater.wakeup.is_set())
+
+        updater.refresh()
+
+        self.assertIn('Болтунья', [
+            name for name, _ in self.get_names(updater.index, [self.egg])
+        ])
+
+    def test_bits_descending(self):
+        generator = random.Random(0)
+        bitset = generator.getrandbits(5000)
+        positions = [
+            position for position in range(5000, -1, -1)
+            if bitset >> position & 1
+        ]
+        self.assertEqual(list(iter_bits_descending(bitset)), positions)
+        self.assertEqual(list(iter_bits_descending(0)), [])
+
+        groups = [bitset, generator.getrandbits(5000)]
+        matches = PantryMatches(list(range(5000)), groups)
+        items = matches[:]
+        self.assertEqual(len(items), len(matches))
+        for start in (0, 7, len(positions) - 3, len(positions) + 11):
+            self.assertEqual(matches[start:start + 20],
+                             items[start:start + 20])
+
+
+class TokenCacheTests(TestCase):
+    """Кэш токенов сбрасывается при удалении токена и смене пользователя."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email='author@example.com', username='author',
+            first_name='Автор', last_name='Авторов', password='pass12345x',
+        )
+
+    def get_me(self, key):
+        return self.client.get(
+            '/api/users/me/', headers={'Authorization': f'Token {key}'}
+        )
+
+    def assertInvalidated(self, change):
+        """После `change(token)` закэшированный токен перестаёт работать."""
+        for shared in (False, True):
+            with self.subTest(shared=shared), override_settings(TOKEN_CACHE={
+                'MAX_SIZE': 10, 'TTL': 60, 'LOCAL_TTL': 60, 'SHARED': shared,
+            }):
+                cache.clear()
+                token_cache.clear()
+                key = Token.objects.create(user=self.user).key
+                self.assertEqual(self.get_me(key).status_code, 200)
+                with CaptureQueriesContext(connection) as queries:
+                    self.assertEqual(self.get_me(key).status_code, 200)
+                self.assertFalse(any(
+                    'authtoken_token' in query['sql'] for query in queries
+                ))
+
+                change(Token.objects.get(key=key))
+
+                self.assertEqual(self.get_me(key).status_code, 401)
+                Token.objects.filter(key=key).delete()
+                User.objects.filter(pk=self.user.pk).update(is_active=True)
+
+    def test_token_deleted(self):
+        self.assertInvalidated(lambda token: token.delete())
+
+    def test_user_deactivated(self):
+        def deactivate(token):
+            token.user.is_active = False
+            token.user.save()
+
+        self.assertInvalidated(deactivate)
+
+
+class ProfilingTests(TestCase):
+    """Профилируются только запросы сотрудников с флагом."""
+
+    def setUp(self):
+        self.profiles_dir = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.profiles_dir)
+        settings_override = override_settings(PROFILING={
+            **settings.PROFILING, 'ENABLED': True, 'DIR': self.profiles_dir,
+        })
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.user = User.objects.create_user(
+            email='author@example.com', username='author',
+            first_name='Автор', last_name='Авторов', password='pass12345x',
+        )
+        self.token = Token.objects.create(user=self.user)
+
+    def get(self, path, profile=None):
+        headers = {'Authorization': f'Token {self.token}'}
+        if profile is not None:
+            headers['X-Profile'] = profile
+        return self.client.get(path, headers=headers)
+
+    def assertNotProfiled(self, response):
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('X-Profile-Id', response)
+        self.assertFalse(RequestProfile.objects.exists())
+
+    def test_staff(self):
+        self.user.is_staff = True
+        self.user.save()
+        for response, mode, stats_file in (
+            (self.get('/api/recipes/', profile='1'), 'sample', False),
+            (self.get('/api/recipes/?profile=cprofile'), 'cprofile', True),
+        ):
+            with self.subTest(mode=mode):
+                self.assertEqual(response.status_code, 200)
+                profile = RequestProfile.objects.get(
+                    pk=response['X-Profile-Id']
+                )
+                self.assertEqual(profile.user, self.user)
+                self.assertEqual(profile.mode, mode)
+                self.assertEqual(profile.status_code, 200)
+                self.assertEqual(bool(profile.stats_file), stats_file)
+                self.assertNotEqual(bool(profile.stacks_file), stats_file)
+                for name in filter(None, (
+                    profile.report_file, profile.stats_file,
+                    profile.stacks_file,
+                )):
+                    self.assertTrue((self.profiles_dir / name).exists())
+
+    def test_not_staff(self):
+        self.assertNotProfiled(self.get('/api/recipes/', profile='1'))
+        self.assertNotProfiled(self.client.get('/api/recipes/?profile=1'))
+
+    def test_staff_without_flag(self):
+        self.user.is_staff = True
+        self.user.save()
+        self.assertNotProfiled(self.get('/api/recipes/'))
+        with override_settings(PROFILING={
+            **settings.PROFILING, 'ENABLED': False,
+        }):
+            self.assertNotProfiled(self.get('/api/recipes/', profile='1'))
+
+    def test_busy(self):
+        self.user.is_staff = True
+        self.user.save()
+        with profiling_lock:
+            self.assertNotProfiled(self.get('/api/recipes/', profile='1'))
+
+
+class FastDeleteTests(TestCase):
+    """Быстрое удаление обрабатывает связи, отличные от CASCADE."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email='author@example.com', username='author',
+            first_name='Автор', last_name='Авторов', password='pass12345x',
+        )
+        self.profile = RequestProfile.objects.create(
+            user=self.user, method='GET', path='/api/recipes/',
+            status_code=200, mode='cprofile', duration_ms=1, queries=1,
+            peak_memory=1, report_file='report.txt',
+        )
+
+    def test_set_null(self):
+        deleted = fast_delete(User.objects.filter(pk=self.user.pk))
+
+        self.assertEqual(deleted[User._meta.label], 1)
+        self.assertFalse(User.objects.filter(pk=self.user.pk).exists())
+        self.profile.refresh_from_db()
+        self.assertIsNone(self.profile.user_id)
+
+    def test_raw_delete(self):
+        """
+        fast_delete опирается на приватный QuerySet._raw_delete(using).
+        После обновления Django проверьте, что он по-прежнему удаляет
+        строки одним DELETE без сигналов и возвращает их число, и
+        поправьте версию здесь.
+        """
+        self.assertEqual(
+            django.VERSION[:2], (4, 2), 'Проверьте QuerySet._raw_delete'
+        )
+        self.assertEqual(
+            list(inspect.signature(QuerySet._raw_delete).parameters),
+            ['self', 'using'],
+        )
+        receiver = mock.Mock()
+        post_delete.connect(receiver, sender=RequestProfile)
+        self.addCleanup(
+            post_delete.disconnect, receiver, sender=RequestProfile
+        )
+        with self.assertNumQueries(1):
+            deleted = RequestProfile.objects.filter(
+                user=self.user
+            )._raw_delete('default')
+        self.assertEqual(deleted, 1)
+        self.assertFalse(RequestProfile.objects.exists())
+        receiver.assert_not_called()
+
+    def test_protect(self):
+        relation = RequestProfile._meta.get_field('user').remote_field
+        with mock.patch.object(relation, 'on_delete', models.PROTECT):
+            with self.assertRaises(ProtectedError) as error:
+                fast_delete(User.objects.filter(pk=self.user.pk))
+
+        self.assertEqual(error.exception.protected_objects, {self.profile})
+        self.assertTrue(User.objects.filter(pk=self.user.pk).exists())
+        self.profile.refresh_from_db()
+        self.assertEqual(self.profile.user_id, self.user.pk)
+
+
+class ResizeImageTests(TestCase):
+    """Загруженный аватар уменьшает фоновая задача."""
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        settings_override = override_settings(
+            MEDIA_ROOT=media_root, IMAGE_MAX_SIZE=20
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.user = User.objects.create_user(
+            email='author@example.com', username='author',
+            first_name='Автор', last_name='Авторов', password='pass12345x',
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def put_avatar(self, size):
+        buffer = BytesIO()
+        Image.new('RGB', size, 'red').save(buffer, format='PNG')
+        encoded = base64.b64encode(buffer.getvalue()).decode()
+        response = self.client.put(
+            '/api/users/me/avatar/',
+            {'avatar': f'data:image/png;base64,{encoded}'}, format='json',
+        )
+        self.assertEqual(response.status_code, 200)
+        self.user.refresh_from_db()
+        job = Job.objects.get(name='api.tasks.resize_image')
+        self.assertEqual(
+            job.args, [User._meta.label, self.user.pk, 'avatar']
+        )
+        run_job(job.pk, 'test')
+        with self.user.avatar.open('rb'):
+            return Image.open(self.user.avatar).size
+
+    def test_large(self):
+        self.assertEqual(self.put_avatar((80, 40)), (20, 10))
+
+    def test_small(self):
+        self.assertEqual(self.put_avatar((16, 8)), (16, 8))
+
+
+@mock.patch(
+    'foodgram.db.routers.get_replicas', return_value=['replica_1']
+)
+class ReplicaRouterTests(SimpleTestCase):
+    """Чтение с реплики только по разрешению и без закрепления."""
+
+    def setUp(self):
+        cache.clear()
+        self.router = PrimaryReplicaRouter()
+        self.user = User(pk=1, username='author')
+
+    def db_for_read(self, allowed):
+        token = use_replica.set(allowed)
+        try:
+            return self.router.db_for_read(Recipe)
+        finally:
+            use_replica.reset(token)
+
+    def test_db_for_read(self, get_replicas):
+        self.assertEqual(self.db_for_read(False), DEFAULT_DB_ALIAS)
+        self.assertEqual(self.db_for_read(True), 'replica_1')
+        with mock.patch.object(
+            connections[DEFAULT_DB_ALIAS], 'in_atomic_block', True
+        ):
+            self.assertEqual(self.db_for_read(True), DEFAULT_DB_ALIAS)
+        get_replicas.return_value = []
+        self.assertEqual(self.db_for_read(True), DEFAULT_DB_ALIAS)
+
+    def test_db_for_write(self, get_replicas):
+        token = use_replica.set(True)
+        self.addCleanup(use_replica.reset, token)
+        self.assertEqual(self.router.db_for_write(Recipe), DEFAULT_DB_ALIAS)
+        self.assertFalse(self.router.allow_migrate('replica_1', 'recipes'))
+
+    def call_middleware(self, method, status=200, user=None):
+        request = getattr(RequestFactory(), method)('/api/recipes/')
+        request.user = user or self.user
+        ReplicaPinMiddleware(lambda request: HttpResponse(status=status))(
+            request
+        )
+
+    def test_pin_after_write(self, get_replicas):
+        self.call_middleware('get')
+        self.call_middleware('post', status=400)
+        self.call_middleware('post', user=AnonymousUser())
+        self.assertFalse(is_pinned(self.user))
+
+        self.call_middleware('post', status=201)
+        self.assertTrue(is_pinned(self.user))
+        self.assertFalse(is_pinned(User(pk=2, username='reader')))
+
+
+class TrafficCaptureTests(TestCase):
+    """Запись трафика обезличена, а проигрывание находит её пользователей."""
+
+    email = 'cook@mail.ru'
+
+    def setUp(self):
+        directory = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, directory)
+        self.path = directory / 'capture.jsonl'
+        self.options = {
+            'ENABLED': True, 'FILE': self.path, 'SAMPLE_RATE': 1,
+            'MAX_BODY': 65536, 'MAX_BYTES': 1024 * 1024,
+        }
+        self.capture_file = CaptureFile()
+        patcher = mock.patch('api.traffic.capture_file', self.capture_file)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        if self.capture_file.fd is not None:
+            os.close(self.capture_file.fd)
+
+    def capture(self):
+        user = {
+            'email': self.email, 'username': 'cook',
+            'first_name': 'Иван', 'last_name': 'Поваров',
+            'password': 'Secret-pass-123',
+        }
+        with override_settings(TRAFFIC_CAPTURE=self.options):
+            self.assertEqual(self.client.post(
+                '/api/users/', user, content_type='application/json'
+            ).status_code, 201)
+            token = self.client.post('/api/auth/token/login/', {
+                'email': self.email, 'password': user['password'],
+            }, content_type='application/json').json()['auth_token']
+            self.client.get(
+                '/api/users/me/', headers={'Authorization': f'Token {token}'}
+            )
+            self.client.get('/api/recipes/0/')
+            self.client.get('/admin/login/')
+        return user
+
+    def test_anonymized(self):
+        user = self.capture()
+        text = self.path.read_text(encoding='utf-8')
+        for value in user.values():
+            self.assertNotIn(value.lower(), text.lower())
+        records = load_capture(self.path)
+        self.assertEqual(
+            [(record['method'], record['path']) for record in records], [
+                ('POST', '/api/users/'), ('POST', '/api/auth/token/login/'),
+                ('GET', '/api/users/me/'), ('GET', '/api/recipes/0/'),
+            ]
+        )
+        identity = pseudonymize(self.email)
+        self.assertEqual(identity, pseudonymize(self.email.upper()))
+        self.assertEqual(records[2]['identity'], identity)
+        self.assertIsNone(records[0]['identity'])
+        self.assertEqual(records[0]['body'], {
+            'email': f'{identity}@example.com',
+            'username': pseudonymize('cook'),
+            'first_name': 'Аноним', 'last_name': 'Аноним',
+            'password': REPLAY_PASSWORD,
+        })
+        # Псевдоним — HMAC на SECRET_KEY, без ключа его не подобрать
+        with override_settings(SECRET_KEY='other-secret-key'):
+            self.assertNotEqual(pseudonymize(self.email), identity)
+
+    def test_replay(self):
+        self.capture()
+        records = load_capture(self.path)[1:]
+        tokens = get_tokens(
+            {record['identity'] for record in records} - {None}
+        )
+        results, elapsed = replay(
+            records, lambda: ClientTarget('testserver'), tokens
+        )
+        self.assertEqual([status for _, status, _ in results], [
+            200, 200, 404
+        ])
+        summary = summarize(results, elapsed)
+        self.assertEqual(summary['Всего']['count'], 3)
+        self.assertEqual(summary['GET /api/users/me/']['client_errors'], 0)
+        self.assertEqual(
+            summary['GET /api/recipes/{id}/']['client_errors'], 1
+        )
+        me = User.objects.get(email=f'{pseudonymize(self.email)}@example.com')
+        self.assertTrue(me.check_password(REPLAY_PASSWORD))
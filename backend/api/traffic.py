@@ -0,0 +1,162 @@
+"""
+Запись выборки реальных запросов к API для нагрузочного тестирования.
+
+TrafficCaptureMiddleware записывает долю TRAFFIC_CAPTURE['SAMPLE_RATE']
+запросов к /api/ в JSONL-файл, по строке на запрос: время, метод, путь,
+строка запроса, обезличенное JSON-тело, псевдоним пользователя, статус
+и время ответа. Файл проигрывает команда replay (api.replay).
+
+Персональные данные в файл не попадают. Пользователь записывается
+псевдонимом — HMAC его email на SECRET_KEY, так что запросы одного
+пользователя остаются связаны, а по файлу его не найти. В телах email
+и username заменяются такими же псевдонимами, имена — заглушкой,
+пароли — REPLAY_PASSWORD, изображения — картинкой 1×1; при
+проигрывании пользователи создаются с теми же псевдонимами и паролем,
+поэтому вход и смена пароля из записи работают. Тела не в JSON и
+больше TRAFFIC_CAPTURE['MAX_BODY'] байт не записываются.
+
+Воркеры дописывают строки в один файл: каждая строка уходит одним
+вызовом write() в файл, открытый на дозапись, и строки не
+перемешиваются. Запись прекращается, когда файл дорастает до
+TRAFFIC_CAPTURE['MAX_BYTES'].
+"""
+import hashlib
+import hmac
+import json
+import os
+import random
+import threading
+import time
+from time import perf_counter
+
+from django.conf import settings
+
+from api.authentication import get_request_user
+
+CAPTURE_PREFIX = '/api/'
+REPLAY_PASSWORD = 'Replay-Pa$$w0rd'
+ANONYMOUS_NAME = 'Аноним'
+PLACEHOLDER_IMAGE = (
+    'data:image/png;base64,iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAAAA'
+    'DUlEQVR42mNk+M9QDwADhgGAWjR9awAAAABJRU5ErkJggg=='
+)
+PASSWORD_FIELDS = frozenset(('password', 'current_password', 'new_password'))
+NAME_FIELDS = frozenset(('first_name', 'last_name'))
+IMAGE_FIELDS = frozenset(('image', 'avatar'))
+
+
+def pseudonymize(value):
+    """Постоянный псевдоним строки, по которому её не восстановить."""
+    digest = hmac.new(
+        settings.SECRET_KEY.encode(), value.lower().encode(), hashlib.sha256
+    ).hexdigest()
+    return f'u{digest[:12]}'
+
+
+def get_identity(user):
+    return pseudonymize(user.email) if user is not None else None
+
+
+def anonymize(data):
+    """Копия JSON-тела без персональных данных (см. docstring модуля)."""
+    if isinstance(data, list):
+        return [anonymize(item) for item in data]
+    if not isinstance(data, dict):
+        return data
+    result = {}
+    for key, value in data.items():
+        if not isinstance(value, str):
+            value = anonymize(value)
+        elif key == 'email':
+            value = f'{pseudonymize(value)}@example.com'
+        elif key == 'username':
+            value = pseudonymize(value)
+        elif key in NAME_FIELDS:
+            value = ANONYMOUS_NAME
+        elif key in PASSWORD_FIELDS:
+            value = REPLAY_PASSWORD
+        elif key in IMAGE_FIELDS and value:
+            value = PLACEHOLDER_IMAGE
+        result[key] = value
+    return result
+
+
+def get_body(request):
+    """Обезличенное JSON-тело запроса или None."""
+    if request.content_type != 'application/json':
+        return None
+    try:
+        length = int(request.META.get('CONTENT_LENGTH') or 0)
+    except ValueError:
+        return None
+    if not length or length > settings.TRAFFIC_CAPTURE['MAX_BODY']:
+        return None
+    try:
+        # Тело остаётся в request.body, DRF прочитает его оттуда
+        return anonymize(json.loads(request.body))
+    except ValueError:
+        return None
+
+
+class CaptureFile:
+    """Файл записи, общий для потоков процесса; открывается при записи."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.fd = None
+        self.full = False
+
+    def write(self, record):
+        line = json.dumps(
+            record, ensure_ascii=False, separators=(',', ':')
+        ).encode() + b'\n'
+        options = settings.TRAFFIC_CAPTURE
+        with self.lock:
+            if self.full:
+                return False
+            if self.fd is None:
+                path = options['FILE']
+                path.parent.mkdir(parents=True, exist_ok=True)
+                self.fd = os.open(
+                    path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o600
+                )
+            if os.fstat(self.fd).st_size + len(line) > options['MAX_BYTES']:
+                self.full = True
+                return False
+            os.write(self.fd, line)
+            return True
+
+
+capture_file = CaptureFile()
+
+
+class TrafficCaptureMiddleware:
+    """Записывает выборку запросов к API (TRAFFIC_CAPTURE)."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        options = settings.TRAFFIC_CAPTURE
+        if (
+            not options['ENABLED']
+            or not request.path.startswith(CAPTURE_PREFIX)
+            or random.random() >= options['SAMPLE_RATE']
+        ):
+            return self.get_response(request)
+        # До ответа: после выхода токен уже удалён
+        identity = get_identity(get_request_user(request))
+        body = get_body(request)
+        started = perf_counter()
+        response = self.get_response(request)
+        capture_file.write({
+            'time': round(time.time(), 3),
+            'method': request.method,
+            'path': request.path,
+            'query': request.META.get('QUERY_STRING', ''),
+            'identity': identity,
+            'body': body,
+            'status': response.status_code,
+            'duration_ms': round((perf_counter() - started) * 1000, 2),
+        })
+        return response
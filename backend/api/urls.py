@@ -1,7 +1,10 @@
 from django.urls import include, path
 from rest_framework import routers
 
-from api.views import IngredientViewSet, RecipeViewSet, TagViewSet, UserViewSet
+from api.views import (
+    BatchView, CacheStatsView, IngredientViewSet, JobStatsView, RecipeViewSet,
+    TagViewSet, UserViewSet
+)
 
 
 router = routers.DefaultRouter()
@@ -13,4 +16,7 @@ router.register('users', UserViewSet, basename='users')
 urlpatterns = [
     path('', include(router.urls)),
     path('auth/', include('djoser.urls.authtoken'), name='auth'),
+    path('cache-stats/', CacheStatsView.as_view(), name='cache-stats'),
+    path('job-stats/', JobStatsView.as_view(), name='job-stats'),
+    path('batch/', BatchView.as_view(), name='batch'),
 ]
@@ -7,11 +7,23 @@ from djoser.views import UserViewSet as DjoserUserViewSet
 
 from rest_framework import decorators, permissions, response, status, viewsets
 from rest_framework.response import Response
+from rest_framework.views import APIView
 
 from recipes.utils.shortener import encode_id
+from api.fast_serializers import (
+    RecipeFastReadSerializer, get_recipes_fieldset
+)
 from api.filters import IngredientFilter, RecipeFilter
+from api.fragments import get_fragment_stats
+from api.jobs import get_job_stats
+from api.batch import run_batch
+from api.pantry import match_pantry
+from api.mixins import (
+    AnonymousResponseCacheMixin, ConditionalGetMixin, ReplicaReadMixin
+)
 from api.serializers import (
-    IngredientSerializer, RecipeReadSerializer, RecipeSerializer,
+    BatchSerializer, IngredientSerializer, PantryQuerySerializer,
+    RecipeSerializer,
     RecipeShortSerializer, SubscriptionSerializer, TagSerializer,
     UserSerializer, UserAvatarSerializer
 )
@@ -24,7 +36,7 @@ from users.models import Subscription
 User = get_user_model()
 
 
-class UserViewSet(DjoserUserViewSet):
+class UserViewSet(ReplicaReadMixin, DjoserUserViewSet):
     queryset = User.objects.all()
     pagination_class = RecipePagination
     lookup_field = 'id'
@@ -156,19 +168,20 @@ class UserViewSet(DjoserUserViewSet):
         return response.Response(status=status.HTTP_204_NO_CONTENT)
 
 
-class TagViewSet(viewsets.ReadOnlyModelViewSet):
+class TagViewSet(ReplicaReadMixin, viewsets.ReadOnlyModelViewSet):
     queryset = Tag.objects.all()
     serializer_class = TagSerializer
 
 
-class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
+class IngredientViewSet(ReplicaReadMixin, viewsets.ReadOnlyModelViewSet):
     queryset = Ingredient.objects.all()
     serializer_class = IngredientSerializer
     filter_backends = [DjangoFilterBackend]
     filterset_class = IngredientFilter
 
 
-class RecipeViewSet(viewsets.ModelViewSet):
+class RecipeViewSet(AnonymousResponseCacheMixin, ConditionalGetMixin,
+                    ReplicaReadMixin, viewsets.ModelViewSet):
     queryset = Recipe.objects.all()
     serializer_class = RecipeSerializer
     permission_classes = [
@@ -177,17 +190,23 @@ class RecipeViewSet(viewsets.ModelViewSet):
     pagination_class = RecipePagination
     filter_backends = [DjangoFilterBackend]
     filterset_class = RecipeFilter
+    replica_actions = ('list', 'retrieve', 'similar', 'what_to_cook')
 
     def get_serializer_class(self):
         """
         Возвращает сериализатор в зависимости от типа действия (action).
         """
-        if self.action in ('list', 'retrieve'):  # Чтение рецептов
-            return RecipeReadSerializer
+        # Чтение рецептов
+        if self.action in ('list', 'retrieve', 'similar', 'what_to_cook'):
+            return RecipeFastReadSerializer
         return RecipeSerializer  # Запись/обновление рецептов
 
     def get_queryset(self):
         user = self.request.user
+        if self.action in ('list', 'retrieve', 'similar', 'what_to_cook'):
+            return Recipe.objects.for_fieldset(
+                user, get_recipes_fieldset(self.request)
+            )
         return Recipe.objects.with_user_flags(user)
 
     @decorators.action(detail=True, methods=['get'], url_path='get-link')
@@ -201,6 +220,51 @@ class RecipeViewSet(viewsets.ModelViewSet):
         full_link = request.build_absolute_uri(f'/s/{short_code}')
         return Response({'short-link': full_link})
 
+    @decorators.action(detail=True, methods=['get'])
+    def similar(self, request, pk=None):
+        """
+        Похожие рецепты по ингредиентам, самые похожие первыми.
+        Списки заранее посчитаны, см. recipes.utils.similarity.
+        """
+        recipe = self.get_object()
+        similar_ids = list(
+            recipe.similar_recipes.order_by('-score', 'similar_id')
+            .values_list('similar_id', flat=True)
+        )
+        recipes = self.get_queryset().in_bulk(similar_ids)
+        serializer = self.get_serializer(
+            [recipes[pk] for pk in similar_ids if pk in recipes], many=True
+        )
+        return Response(serializer.data)
+
+    @decorators.action(detail=False, methods=['get'], url_path='what-to-cook')
+    def what_to_cook(self, request):
+        """
+        Рецепты из имеющихся продуктов: сначала те, для которых всего
+        хватает, затем по числу недостающих ингредиентов (поле `missing`).
+        Подбор идёт по индексу в памяти, см. api.pantry.
+        """
+        query = PantryQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        matches = match_pantry(
+            query.validated_data['ingredients'],
+            query.validated_data['max_missing'],
+        )
+        page = self.paginate_queryset(matches)
+        recipes = self.get_queryset().in_bulk(
+            [recipe_id for recipe_id, _ in page]
+        )
+        found = [
+            (recipes[recipe_id], missing)
+            for recipe_id, missing in page if recipe_id in recipes
+        ]
+        data = self.get_serializer(
+            [recipe for recipe, _ in found], many=True
+        ).data
+        for item, (_, missing) in zip(data, found):
+            item['missing'] = missing
+        return self.get_paginated_response(data)
+
     def manage_object(self, model, pk, request, add_message, remove_message):
         """
         Общий метод для добавления и удаления объектов (Favorite, ShoppingList)
@@ -301,3 +365,40 @@ class RecipeViewSet(viewsets.ModelViewSet):
             'attachment; filename="shopping_list.txt"'
         )
         return response
+
+
+class CacheStatsView(APIView):
+    """Счётчики кэша документов рецептов текущего процесса (для staff)."""
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request):
+        return Response({'recipe_fragments': get_fragment_stats()})
+
+
+class JobStatsView(APIView):
+    """Очередь фоновых задач: размер, задержка и время выполнения."""
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request):
+        return Response(get_job_stats())
+
+
+class BatchView(APIView):
+    """
+    Несколько GET-запросов к API одним POST (см. api.batch):
+    {"requests": [{"path": "/api/tags/"}, ...], "concurrent": false}.
+    """
+    # Только чтение: пакет не закрепляет пользователя за основной базой
+    read_only = True
+
+    def post(self, request):
+        serializer = BatchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        return HttpResponse(
+            run_batch(
+                request,
+                serializer.validated_data['requests'],
+                serializer.validated_data['concurrent'],
+            ),
+            content_type='application/json',
+        )
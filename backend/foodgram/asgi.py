@@ -12,5 +12,7 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'foodgram.settings')
+# Под ASGI запросы на чтение обслуживают асинхронные представления
+os.environ.setdefault('DJANGO_ROOT_URLCONF', 'foodgram.urls_asgi')
 
 application = get_asgi_application()
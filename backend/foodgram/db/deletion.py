@@ -0,0 +1,155 @@
+"""
+Быстрое каскадное удаление.
+
+`QuerySet.delete()` собирает в память все связанные объекты (Collector),
+чтобы отправить сигналы и удалить их пачками. У автора с тысячами
+рецептов это десятки тысяч объектов. Здесь каскад проходится по
+метаданным моделей: для каждой пачки первичных ключей сначала
+обрабатываются ссылающиеся строки — с on_delete=CASCADE удаляются
+(рекурсивно), с SET_NULL обнуляются одним UPDATE, PROTECT вызывает
+ProtectedError, — затем сами строки удаляются одним
+DELETE ... WHERE pk IN (...). Таблицы без ссылок, файлов и получателей
+сигнала удаляются одним DELETE по условию, без выборки ключей. Объекты
+в память не загружаются, сигналы pre_delete/post_delete не
+отправляются; вместо них после удаления отправляется `bulk_deleted` с
+моделью и ключами. Файлы из FileField удаляются из хранилища после
+коммита.
+
+Если в каскаде есть другие варианты on_delete (RESTRICT, SET_DEFAULT,
+SET(...)), удаление выполняет обычный `QuerySet.delete()`.
+
+DELETE без выборки объектов делает приватный `QuerySet._raw_delete`;
+его поведение закреплено тестом FastDeleteTests.test_raw_delete, который
+падает при смене версии Django.
+"""
+from collections import Counter
+
+from django.db import models, router, transaction
+from django.db.models.deletion import ProtectedError
+from django.dispatch import Signal
+
+DELETE_BATCH_SIZE = 1000
+
+# Строки удалены через fast_delete, аргументы: pks
+bulk_deleted = Signal()
+
+
+def get_file_fields(model):
+    return [
+        field for field in model._meta.concrete_fields
+        if isinstance(field, models.FileField)
+    ]
+
+
+def delete_files(storage_files):
+    for storage, name in storage_files:
+        storage.delete(name)
+
+
+FAST_ON_DELETE = (models.CASCADE, models.SET_NULL, models.PROTECT)
+
+
+def get_relations(model):
+    """Связи других моделей на `model`, кроме DO_NOTHING."""
+    # include_hidden: связи промежуточных таблиц ManyToManyField скрыты
+    return [
+        relation
+        for relation in model._meta.get_fields(include_hidden=True)
+        if relation.auto_created and not relation.concrete
+        and getattr(relation, 'on_delete', None) not in (
+            None, models.DO_NOTHING
+        )
+    ]
+
+
+def can_fast_delete(model, seen=None):
+    """Все связи в каскаде от `model` — CASCADE, SET_NULL или PROTECT."""
+    seen = set() if seen is None else seen
+    if model in seen:
+        return True
+    seen.add(model)
+    for relation in get_relations(model):
+        if relation.on_delete not in FAST_ON_DELETE:
+            return False
+        if relation.on_delete is models.CASCADE and not can_fast_delete(
+            relation.related_model, seen
+        ):
+            return False
+    return True
+
+
+def handle_relations(relations, pks, using, batch_size, deleted):
+    """Обрабатывает строки, ссылающиеся на удаляемые ключи `pks`."""
+    for relation in relations:
+        related_model = relation.related_model
+        related = related_model._base_manager.using(using).filter(
+            **{f'{relation.field.name}__in': pks}
+        )
+        if relation.on_delete is models.CASCADE:
+            delete_rows(related_model, related, using, batch_size, deleted)
+        elif relation.on_delete is models.SET_NULL:
+            related.update(**{relation.field.name: None})
+        elif related.exists():
+            raise ProtectedError(
+                f'Нельзя удалить {relation.model._meta.verbose_name_plural}: '
+                f'на них ссылаются '
+                f'{related_model._meta.verbose_name_plural} '
+                f'({relation.field.name}, on_delete=PROTECT).',
+                set(related),
+            )
+
+
+def delete_rows(model, queryset, using, batch_size, deleted):
+    relations = get_relations(model)
+    file_fields = get_file_fields(model)
+    if (
+        not relations and not file_fields
+        and not bulk_deleted.has_listeners(model)
+    ):
+        # Листовая таблица: ключи не нужны, хватает одного DELETE
+        deleted[model._meta.label] += queryset._raw_delete(using)
+        return
+    batches = queryset.order_by('pk').values_list('pk', flat=True)
+    while True:
+        # Удалённые строки выпадают из выборки, поэтому всегда первая пачка
+        pks = list(batches[:batch_size])
+        if not pks:
+            return
+        handle_relations(relations, pks, using, batch_size, deleted)
+        rows = model._base_manager.using(using).filter(pk__in=pks)
+        storage_files = [
+            (field.storage, name)
+            for field in file_fields
+            for name in rows.values_list(field.name, flat=True)
+            if name
+        ]
+        deleted[model._meta.label] += rows._raw_delete(using)
+        bulk_deleted.send(sender=model, pks=pks)
+        if storage_files:
+            transaction.on_commit(
+                lambda files=storage_files: delete_files(files), using=using
+            )
+
+
+def fast_delete(queryset, batch_size=DELETE_BATCH_SIZE):
+    """
+    Удаляет строки `queryset` и всё, что на них ссылается с CASCADE.
+    Возвращает словарь {метка модели: число удалённых строк}.
+    """
+    model = queryset.model
+    if not can_fast_delete(model):
+        return {
+            label: count
+            for label, count in queryset.delete()[1].items() if count
+        }
+    using = router.db_for_write(model)
+    deleted = Counter()
+    with transaction.atomic(using=using):
+        delete_rows(
+            model,
+            model._base_manager.using(using).filter(
+                pk__in=queryset.order_by().values('pk')
+            ),
+            using, batch_size, deleted,
+        )
+    return dict(deleted)
@@ -0,0 +1,90 @@
+"""
+Приблизительное число строк вместо точного COUNT(*).
+
+На PostgreSQL с миллионами строк COUNT(*) часто дольше самого запроса
+страницы. Для запроса без фильтров берётся pg_class.reltuples (данные
+последнего ANALYZE), для запроса с фильтрами — оценка планировщика из
+EXPLAIN. Если оценка меньше COUNT_ESTIMATE_THRESHOLD, считаем точно:
+на небольших выборках COUNT(*) дёшев, а ошибка оценки заметна.
+На других СУБД всегда используется точный подсчёт.
+"""
+import json
+
+from django.conf import settings
+from django.core.paginator import EmptyPage, Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+
+
+def estimate_count(queryset):
+    """Оценка числа строк запроса или None, если её не получить."""
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        return None
+    queryset = queryset.order_by()
+    with connection.cursor() as cursor:
+        if not queryset.query.where:
+            cursor.execute(
+                'SELECT reltuples FROM pg_class WHERE oid = %s::regclass',
+                [queryset.model._meta.db_table],
+            )
+            row = cursor.fetchone()
+            # -1: таблицу ещё ни разу не анализировали
+            return int(row[0]) if row and row[0] >= 0 else None
+        sql, params = queryset.query.get_compiler(queryset.db).as_sql()
+        cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+def count_with_estimate(queryset):
+    """
+    Число строк и признак того, что оно приблизительное.
+    Точный подсчёт, если оценка выключена или меньше порога.
+    """
+    threshold = settings.COUNT_ESTIMATE_THRESHOLD
+    if threshold:
+        estimate = estimate_count(queryset)
+        if estimate is not None and estimate >= threshold:
+            return estimate, True
+    return queryset.count(), False
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator с приблизительным count для больших выборок. Страницы за
+    оценённым концом не считаются ошибкой: оценка может быть занижена.
+    """
+
+    @cached_property
+    def count_and_estimated(self):
+        if hasattr(self.object_list, 'query'):
+            return count_with_estimate(self.object_list)
+        return len(self.object_list), False
+
+    @cached_property
+    def count(self):
+        return self.count_and_estimated[0]
+
+    @property
+    def is_estimated(self):
+        return self.count_and_estimated[1]
+
+    def validate_number(self, number):
+        try:
+            return super().validate_number(number)
+        except EmptyPage:
+            if self.is_estimated and int(number) > 1:
+                return int(number)
+            raise
+
+    def page(self, number):
+        if not self.is_estimated:
+            return super().page(number)
+        number = self.validate_number(number)
+        bottom = (number - 1) * self.per_page
+        return self._get_page(
+            self.object_list[bottom:bottom + self.per_page], number, self
+        )
@@ -0,0 +1,36 @@
+"""
+Индексы для поиска админки по началу строки (search_fields = ('^name',)).
+
+Django строит для него UPPER("name"::text) LIKE UPPER('...%'). В
+PostgreSQL с локалью, отличной от C, LIKE по началу строки использует
+только индекс с классом операторов text_pattern_ops, поэтому там индекс
+по UPPER(поле) создаётся с ним; на других базах — обычный индекс по
+выражению. Индекс объявляется в Meta.indexes, и миграции знают о нём.
+"""
+from django.db import models
+from django.db.models.functions import Upper
+
+
+class UpperPatternIndex(models.Index):
+
+    def __init__(self, field_name, *, name):
+        self.field_name = field_name
+        super().__init__(Upper(field_name), name=name)
+
+    def create_sql(self, model, schema_editor, using='', **kwargs):
+        if schema_editor.connection.vendor != 'postgresql':
+            return super().create_sql(model, schema_editor, using, **kwargs)
+        from django.contrib.postgres.indexes import OpClass
+        index = models.Index(
+            OpClass(Upper(self.field_name), name='text_pattern_ops'),
+            name=self.name,
+        )
+        return index.create_sql(model, schema_editor, using, **kwargs)
+
+    def deconstruct(self):
+        path, _, kwargs = super().deconstruct()
+        return path, (self.field_name,), {'name': kwargs['name']}
+
+    def clone(self):
+        _, args, kwargs = self.deconstruct()
+        return self.__class__(*args, **kwargs)
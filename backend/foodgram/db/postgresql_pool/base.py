@@ -0,0 +1,237 @@
+"""
+Бэкенд PostgreSQL с пулом соединений.
+
+Вместо того чтобы открывать новое соединение на каждый запрос
+(CONN_MAX_AGE=0), соединения берутся из пула процесса и возвращаются в него
+при закрытии. Пул потокобезопасен, поэтому работает с воркерами gunicorn
+в режиме gthread. Настройки задаются ключом POOL в DATABASES:
+
+    'POOL': {
+        'MIN_SIZE': 2,         # сколько соединений открыть заранее
+        'MAX_SIZE': 10,        # максимум соединений в процессе
+        'MAX_LIFETIME': 1800,  # секунд, после чего соединение пересоздаётся
+        'HEALTH_CHECK': True,  # проверять соединение при выдаче из пула
+        'HEALTH_CHECK_IDLE': 30,  # ... если оно простояло дольше (секунд)
+        'TIMEOUT': 10,         # сколько ждать свободное соединение
+    }
+
+Соединение, вернувшееся в пул только что, проверять не нужно: SELECT 1
+на каждую выдачу удваивал бы число обращений к серверу у коротких
+запросов. Обрывы бывают у простаивающих соединений (таймауты сервера,
+балансировщика, перезапуск PostgreSQL), поэтому проверяются только они.
+"""
+import os
+import threading
+import time
+from collections import Counter
+
+import psycopg2
+import psycopg2.extras
+from psycopg2 import extensions, pool
+from django.db.backends.postgresql import base
+from django.db.backends.postgresql.psycopg_any import IsolationLevel
+
+POOL_DEFAULTS = {
+    'MIN_SIZE': 2,
+    'MAX_SIZE': 10,
+    'MAX_LIFETIME': 1800,
+    'HEALTH_CHECK': True,
+    'HEALTH_CHECK_IDLE': 30,
+    'TIMEOUT': 10,
+}
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+class ConnectionPool(pool.ThreadedConnectionPool):
+    """
+    ThreadedConnectionPool с ожиданием свободного соединения,
+    проверкой простаивавших соединений при выдаче, ограничением времени
+    жизни и метриками. Метрики и учёт соединений меняются под self._lock
+    пула, как и его списки соединений.
+    """
+
+    def __init__(self, min_size, max_size, max_lifetime, health_check,
+                 timeout, health_check_idle=0, **conn_params):
+        self.max_lifetime = max_lifetime
+        self.health_check = health_check
+        self.health_check_idle = health_check_idle
+        self.timeout = timeout
+        self.pid = os.getpid()
+        self.stats = Counter()
+        self._created = {}
+        self._released = {}
+        self._slots = threading.BoundedSemaphore(max_size)
+        super().__init__(min_size, max_size, **conn_params)
+        # psycopg2 держит свободными не больше minconn соединений, а нам
+        # нужно переиспользовать все: заранее открываем MIN_SIZE,
+        # а в пуле храним до MAX_SIZE
+        self.minconn = max_size
+
+    def _connect(self, key=None):
+        # Вызывается из __init__ и из getconn, который уже держит _lock
+        conn = super()._connect(key)
+        # Как и стандартный бэкенд: JSONField разбирает jsonb сам
+        psycopg2.extras.register_default_jsonb(
+            conn_or_curs=conn, loads=lambda x: x
+        )
+        self._created[id(conn)] = self._released[id(conn)] = time.monotonic()
+        self.stats['created'] += 1
+        return conn
+
+    def _count(self, name, value=1):
+        with self._lock:
+            self.stats[name] += value
+
+    def _is_expired(self, conn):
+        created = self._created.get(id(conn), 0)
+        return time.monotonic() - created > self.max_lifetime
+
+    def _needs_check(self, conn):
+        """Проверять ли соединение: оно простояло в пуле дольше порога."""
+        idle = time.monotonic() - self._released.get(id(conn), 0)
+        return self.health_check and idle > self.health_check_idle
+
+    def _is_healthy(self, conn):
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute('SELECT 1')
+            conn.rollback()
+        except psycopg2.Error:
+            return False
+        return True
+
+    def _discard(self, conn):
+        with self._lock:
+            self._created.pop(id(conn), None)
+            self._released.pop(id(conn), None)
+        self.putconn(conn, close=True)
+
+    def checkout(self):
+        """Выдаёт рабочее соединение, при необходимости ожидая свободное."""
+        started = time.monotonic()
+        if not self._slots.acquire(timeout=self.timeout):
+            self._count('timeouts')
+            raise pool.PoolError(
+                f'Нет свободных соединений в пуле за {self.timeout} с.'
+            )
+        self._count('wait_seconds', time.monotonic() - started)
+        try:
+            while True:
+                conn = self.getconn()
+                if conn.closed or self._is_expired(conn):
+                    self._count('expired')
+                    self._discard(conn)
+                    continue
+                if self._needs_check(conn):
+                    self._count('health_checks')
+                    if not self._is_healthy(conn):
+                        self._count('broken')
+                        self._discard(conn)
+                        continue
+                self._count('checkouts')
+                return conn
+        except Exception:
+            self._slots.release()
+            raise
+
+    def release(self, conn):
+        """Возвращает соединение в пул в чистом состоянии."""
+        try:
+            close = conn.closed or self._is_expired(conn)
+            if not close:
+                status = conn.info.transaction_status
+                if status == extensions.TRANSACTION_STATUS_UNKNOWN:
+                    close = True
+                elif status != extensions.TRANSACTION_STATUS_IDLE:
+                    conn.rollback()
+            if close:
+                self._discard(conn)
+            else:
+                with self._lock:
+                    self._released[id(conn)] = time.monotonic()
+                self.putconn(conn)
+        finally:
+            self._slots.release()
+
+    def get_stats(self):
+        with self._lock:
+            stats = dict(self.stats)
+            in_use, idle = len(self._used), len(self._pool)
+        return {**stats, 'in_use': in_use, 'idle': idle}
+
+
+def get_pool(wrapper, conn_params=None):
+    """
+    Пул для алиаса БД в текущем процессе. После fork (preload в gunicorn)
+    унаследованный пул не используется: сокеты принадлежат родителю.
+    """
+    settings_dict = wrapper.settings_dict
+    key = (
+        wrapper.alias, settings_dict['NAME'],
+        settings_dict['HOST'], settings_dict['PORT'],
+    )
+    with _pools_lock:
+        connection_pool = _pools.get(key)
+        if connection_pool is not None and connection_pool.pid == os.getpid():
+            return connection_pool
+        if conn_params is None:
+            return None
+        options = {**POOL_DEFAULTS, **settings_dict.get('POOL', {})}
+        connection_pool = ConnectionPool(
+            min_size=options['MIN_SIZE'],
+            max_size=options['MAX_SIZE'],
+            max_lifetime=options['MAX_LIFETIME'],
+            health_check=options['HEALTH_CHECK'],
+            health_check_idle=options['HEALTH_CHECK_IDLE'],
+            timeout=options['TIMEOUT'],
+            **conn_params,
+        )
+        _pools[key] = connection_pool
+        return connection_pool
+
+
+def get_pool_stats():
+    """Метрики всех пулов текущего процесса."""
+    with _pools_lock:
+        pools = list(_pools.items())
+    return {
+        key[0]: connection_pool.get_stats()
+        for key, connection_pool in pools
+        if connection_pool.pid == os.getpid()
+    }
+
+
+def close_pools():
+    """Закрывает соединения всех пулов процесса (например, перед fork)."""
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for connection_pool in pools:
+        if connection_pool.pid == os.getpid():
+            connection_pool.closeall()
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    def get_new_connection(self, conn_params):
+        connection = get_pool(self, conn_params).checkout()
+        options = self.settings_dict['OPTIONS']
+        try:
+            isolation_level_value = options['isolation_level']
+        except KeyError:
+            self.isolation_level = IsolationLevel.READ_COMMITTED
+        else:
+            self.isolation_level = IsolationLevel(isolation_level_value)
+            connection.isolation_level = self.isolation_level
+        return connection
+
+    def _close(self):
+        if self.connection is None:
+            return
+        connection_pool = get_pool(self)
+        with self.wrap_database_errors:
+            if connection_pool is None:
+                # Соединение осталось от другого процесса или пул уже закрыт
+                return self.connection.close()
+            return connection_pool.release(self.connection)
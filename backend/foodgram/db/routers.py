@@ -0,0 +1,88 @@
+"""
+Маршрутизация запросов между основной базой и репликами.
+
+Запись всегда идёт в `default`. Чтение уходит на реплику только там, где
+это явно разрешено (ReplicaReadMixin для list/retrieve вьюсетов) и только
+вне transaction.atomic. После того как пользователь что-то изменил, он на
+REPLICA_PIN_SECONDS закрепляется за основной базой, чтобы сразу видеть
+свои изменения несмотря на задержку репликации. Закрепление хранится в
+общем кэше, поэтому реплики без него не включаются (см. settings).
+"""
+import random
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+
+PIN_KEY_PREFIX = 'db-pin'
+
+use_replica = ContextVar('use_replica', default=False)
+
+
+def get_replicas():
+    return [alias for alias in settings.DATABASES if alias != DEFAULT_DB_ALIAS]
+
+
+def get_pin_key(user):
+    return f'{PIN_KEY_PREFIX}:{user.pk}'
+
+
+def pin_to_primary(user):
+    cache.set(get_pin_key(user), True, settings.REPLICA_PIN_SECONDS)
+
+
+def is_pinned(user):
+    return user.is_authenticated and bool(cache.get(get_pin_key(user)))
+
+
+def is_read_only_view(request):
+    """
+    Представление только читает данные, хотя вызвано не GET
+    (атрибут read_only у класса, например пакетные запросы).
+    """
+    match = getattr(request, 'resolver_match', None)
+    view_class = getattr(getattr(match, 'func', None), 'view_class', None)
+    return getattr(view_class, 'read_only', False)
+
+
+class PrimaryReplicaRouter:
+    def db_for_read(self, model, **hints):
+        replicas = get_replicas()
+        if not replicas or not use_replica.get():
+            return DEFAULT_DB_ALIAS
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            # Внутри транзакции читаем то, что в ней же и записали
+            return DEFAULT_DB_ALIAS
+        return random.choice(replicas)
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # На всех базах одни и те же данные
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Реплики получают схему через репликацию
+        return db == DEFAULT_DB_ALIAS
+
+
+class ReplicaPinMiddleware:
+    """Закрепляет пользователя за основной базой после успешной записи."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if (
+            request.method not in ('GET', 'HEAD', 'OPTIONS')
+            and response.status_code < 400
+            and get_replicas()
+            and not is_read_only_view(request)
+        ):
+            user = getattr(request, 'user', None)
+            if user is not None and user.is_authenticated:
+                pin_to_primary(user)
+        return response
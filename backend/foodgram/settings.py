@@ -2,6 +2,7 @@ from dotenv import load_dotenv
 import os
 from pathlib import Path
 
+from django.core.exceptions import ImproperlyConfigured
 from django.core.management.utils import get_random_secret_key
 
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -24,6 +25,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'django_filters',
     'rest_framework',
     'rest_framework.authtoken',
@@ -41,11 +43,14 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'foodgram.db.routers.ReplicaPinMiddleware',
+    'api.profiling.ProfilingMiddleware',
+    'api.traffic.TrafficCaptureMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
-ROOT_URLCONF = 'foodgram.urls'
+ROOT_URLCONF = os.getenv('DJANGO_ROOT_URLCONF', 'foodgram.urls')
 
 TEMPLATES = [
     {
@@ -84,9 +89,72 @@ else:
             'PASSWORD': os.getenv('DB_PASSWORD', 'django_password'),
             'HOST': os.getenv('DB_HOST', '127.0.0.1'),
             'PORT': os.getenv('DB_PORT', 5432),
+            # Используется бэкендом foodgram.db.postgresql_pool
+            'POOL': {
+                'MIN_SIZE': int(os.getenv('DB_POOL_MIN_SIZE', 2)),
+                'MAX_SIZE': int(os.getenv('DB_POOL_MAX_SIZE', 10)),
+                'MAX_LIFETIME': int(os.getenv('DB_POOL_MAX_LIFETIME', 1800)),
+                'HEALTH_CHECK': os.getenv('DB_POOL_HEALTH_CHECK', 'True').lower() in ('true', '1', 't'),
+                'HEALTH_CHECK_IDLE': float(os.getenv('DB_POOL_HEALTH_CHECK_IDLE', 30)),
+                'TIMEOUT': float(os.getenv('DB_POOL_TIMEOUT', 10)),
+            },
         }
     }
 
+# Сброс кэшей при изменении данных виден всем воркерам только с общим
+# бэкендом (Redis, Memcached, база); LocMemCache подходит для разработки
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv(
+            'CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': os.getenv('CACHE_LOCATION', ''),
+    }
+}
+
+# Кэши в памяти процесса: сброс версии в одном воркере не виден другим,
+# поэтому кэши ответов и документов с ними не включаются
+LOCAL_CACHE_BACKENDS = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+def is_shared_cache(alias):
+    return CACHES[alias]['BACKEND'] not in LOCAL_CACHE_BACKENDS
+
+
+# Реплики для чтения: для PostgreSQL — хосты (host или host:port),
+# для SQLite — имена файлов, например DB_REPLICAS=db_replica.sqlite3
+for index, replica in enumerate(
+    filter(None, os.getenv('DB_REPLICAS', '').split(',')), start=1
+):
+    if DATABASES['default']['ENGINE'] == 'django.db.backends.sqlite3':
+        replica_settings = {'NAME': BASE_DIR / replica}
+    else:
+        host, _, port = replica.partition(':')
+        replica_settings = {
+            'HOST': host, 'PORT': port or DATABASES['default']['PORT']
+        }
+    DATABASES[f'replica_{index}'] = {
+        **DATABASES['default'],
+        **replica_settings,
+        'TEST': {'MIRROR': 'default'},
+    }
+
+# Закрепление за основной базой после записи хранится в кэше и должно
+# быть видно всем воркерам, иначе следующий запрос может попасть в другой
+# процесс и прочитать с реплики данные без только что сделанной записи
+if len(DATABASES) > 1 and not is_shared_cache('default'):
+    raise ImproperlyConfigured(
+        'DB_REPLICAS требует общего CACHE_BACKEND (Redis, Memcached, база)'
+    )
+
+DATABASE_ROUTERS = ['foodgram.db.routers.PrimaryReplicaRouter']
+
+# Сколько секунд после записи пользователь читает только из основной базы
+REPLICA_PIN_SECONDS = int(os.getenv('DB_REPLICA_PIN_SECONDS', 5))
+
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
 
@@ -105,14 +173,30 @@ AUTH_PASSWORD_VALIDATORS = [
     },
 ]
 
+# Библиотека для JSON в API: orjson (быстрее) или стандартный json из DRF
+JSON_BACKENDS = {
+    'orjson': ('api.renderers.ORJSONRenderer', 'api.parsers.ORJSONParser'),
+    'json': ('rest_framework.renderers.JSONRenderer', 'rest_framework.parsers.JSONParser'),
+}
+JSON_RENDERER, JSON_PARSER = JSON_BACKENDS[os.getenv('API_JSON_BACKEND', 'orjson')]
+
 REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.AllowAny',  # Это дефолтное значение, разрешающее всё
     ),
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework.authentication.TokenAuthentication',
+        'api.authentication.CachedTokenAuthentication',
     ),
     'DEFAULT_FILTER_BACKENDS': ['django_filters.rest_framework.DjangoFilterBackend'],
+    'DEFAULT_RENDERER_CLASSES': (
+        JSON_RENDERER,
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
+    'DEFAULT_PARSER_CLASSES': (
+        JSON_PARSER,
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ),
 }
 
 # Internationalization
@@ -187,5 +271,99 @@ CORS_ALLOWED_ORIGINS = [
 
 CSRF_TRUSTED_ORIGINS = os.getenv('CSRF_TRUSTED', '').split(',')
 
+# Кэш токенов авторизации. SHARED — хранить в общем кэше
+# (CACHES['default']) TTL секунд, отзыв токена сразу виден всем воркерам.
+# Без него — LRU процесса на MAX_SIZE записей по LOCAL_TTL секунд: столько
+# отозванный токен ещё действует в других воркерах
+TOKEN_CACHE = {
+    'MAX_SIZE': int(os.getenv('TOKEN_CACHE_MAX_SIZE', 1024)),
+    'TTL': int(os.getenv('TOKEN_CACHE_TTL', 60)),
+    'LOCAL_TTL': int(os.getenv('TOKEN_CACHE_LOCAL_TTL', 5)),
+    'SHARED': os.getenv('TOKEN_CACHE_SHARED', 'False').lower() in ('true', '1', 't'),
+}
+
+# Кэш ответов /api/recipes/ для анонимных пользователей: сколько хранить
+# ответ (сек.) и сколько один воркер может пересобирать страницу, пока
+# остальные отдают предыдущую версию. Только с общим CACHES['default']
+RECIPE_RESPONSE_CACHE = {
+    'ENABLED': (
+        os.getenv('RECIPE_RESPONSE_CACHE', 'True').lower() in ('true', '1', 't')
+        and is_shared_cache('default')
+    ),
+    'TIMEOUT': int(os.getenv('RECIPE_RESPONSE_CACHE_TIMEOUT', 300)),
+    'LOCK_TIMEOUT': int(os.getenv('RECIPE_RESPONSE_CACHE_LOCK_TIMEOUT', 10)),
+}
+
+# Кэш документов рецептов: LRU процесса (записей и секунд жизни) перед
+# общим кэшем с алиасом ALIAS из CACHES. Версии рецептов хранятся в
+# общем кэше, поэтому с кэшем в памяти процесса он не включается
+RECIPE_FRAGMENT_CACHE = {
+    'ENABLED': os.getenv('RECIPE_FRAGMENT_CACHE', 'True').lower() in ('true', '1', 't'),
+    'ALIAS': os.getenv('RECIPE_FRAGMENT_CACHE_ALIAS', 'default'),
+    'LOCAL_SIZE': int(os.getenv('RECIPE_FRAGMENT_CACHE_LOCAL_SIZE', 2048)),
+    'LOCAL_TTL': int(os.getenv('RECIPE_FRAGMENT_CACHE_LOCAL_TTL', 300)),
+    'TIMEOUT': int(os.getenv('RECIPE_FRAGMENT_CACHE_TIMEOUT', 86400)),
+}
+RECIPE_FRAGMENT_CACHE['ENABLED'] &= is_shared_cache(
+    RECIPE_FRAGMENT_CACHE['ALIAS']
+)
+
+# С какого числа строк пагинация и админка показывают оценку PostgreSQL
+# вместо точного COUNT(*); 0 — всегда считать точно
+COUNT_ESTIMATE_THRESHOLD = int(os.getenv('COUNT_ESTIMATE_THRESHOLD', 100000))
+
+# Профилирование запросов по требованию: сотрудник добавляет заголовок
+# X-Profile или параметр ?profile= (sample — сэмплирование стеков,
+# cprofile — детерминированный профилировщик). Отчёты пишутся в DIR
+# и доступны в админке
+PROFILING = {
+    'ENABLED': os.getenv('PROFILING', 'True').lower() in ('true', '1', 't'),
+    'DIR': Path(os.getenv('PROFILING_DIR') or BASE_DIR / 'profiles'),
+    'INTERVAL': float(os.getenv('PROFILING_INTERVAL', 0.001)),
+    'TRACEMALLOC_FRAMES': int(os.getenv('PROFILING_TRACEMALLOC_FRAMES', 10)),
+    'TOP_ALLOCATIONS': int(os.getenv('PROFILING_TOP_ALLOCATIONS', 30)),
+}
+
+# Пакетные запросы /api/batch/: сколько GET-подзапросов в одном пакете
+# и сколько из них выполняется одновременно, если клиент попросил
+# concurrent (1 — всегда по очереди)
+BATCH = {
+    'MAX_REQUESTS': int(os.getenv('BATCH_MAX_REQUESTS', 20)),
+    'MAX_WORKERS': int(os.getenv('BATCH_MAX_WORKERS', 4)),
+}
+
+# Фоновые задачи (api.jobs) в таблице api_job, их выполняет run_worker.
+# EAGER — выполнять сразу после коммита в том же процессе, без воркера
+# (для разработки). TIMEOUT — через сколько секунд незавершённая задача
+# снова отдаётся воркерам; RETRY_DELAY удваивается с каждой попыткой
+JOBS = {
+    'EAGER': os.getenv('JOBS_EAGER', 'False').lower() in ('true', '1', 't'),
+    'CONCURRENCY': int(os.getenv('JOBS_CONCURRENCY', 2)),
+    'POLL_INTERVAL': float(os.getenv('JOBS_POLL_INTERVAL', 1)),
+    'MAX_ATTEMPTS': int(os.getenv('JOBS_MAX_ATTEMPTS', 5)),
+    'RETRY_DELAY': float(os.getenv('JOBS_RETRY_DELAY', 10)),
+    'MAX_RETRY_DELAY': float(os.getenv('JOBS_MAX_RETRY_DELAY', 3600)),
+    'TIMEOUT': int(os.getenv('JOBS_TIMEOUT', 600)),
+    'KEEP_DONE_HOURS': int(os.getenv('JOBS_KEEP_DONE_HOURS', 24)),
+}
+
+# Загруженные изображения рецептов и аватары уменьшаются задачей
+# api.tasks.resize_image до этого размера по большей стороне
+IMAGE_MAX_SIZE = int(os.getenv('IMAGE_MAX_SIZE', 1200))
+
+# Запись выборки запросов к API для нагрузочных тестов (api.traffic,
+# проигрывает команда replay): доля записываемых запросов, файл JSONL,
+# предел размера тела и всего файла в байтах
+TRAFFIC_CAPTURE = {
+    'ENABLED': os.getenv('TRAFFIC_CAPTURE', 'False').lower() in ('true', '1', 't'),
+    'FILE': Path(os.getenv('TRAFFIC_CAPTURE_FILE') or BASE_DIR / 'traffic' / 'capture.jsonl'),
+    'SAMPLE_RATE': float(os.getenv('TRAFFIC_CAPTURE_SAMPLE_RATE', 0.01)),
+    'MAX_BODY': int(os.getenv('TRAFFIC_CAPTURE_MAX_BODY', 65536)),
+    'MAX_BYTES': int(os.getenv('TRAFFIC_CAPTURE_MAX_BYTES', 100 * 1024 * 1024)),
+}
+
+# Сколько ингредиентов возвращает поиск /api/ingredients/?name=
+INGREDIENT_SEARCH_LIMIT = int(os.getenv('INGREDIENT_SEARCH_LIMIT', 20))
+
 PAGE_SIZE = 6
 MAX_LIMIT = 100
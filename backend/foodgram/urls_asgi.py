@@ -0,0 +1,23 @@
+"""
+URL-конфигурация для запуска под ASGI (см. asgi.py).
+
+Перед обычными маршрутами подключаются асинхронные представления для
+чтения рецептов, тегов, ингредиентов и коротких ссылок; всё остальное
+обрабатывается так же, как в foodgram/urls.py.
+"""
+from django.urls import path
+
+from api import async_views
+from recipes.views import aredirect_short_link
+
+from .urls import urlpatterns as sync_urlpatterns
+
+urlpatterns = [
+    path('api/tags/', async_views.tag_list),
+    path('api/tags/<int:pk>/', async_views.tag_detail),
+    path('api/ingredients/', async_views.ingredient_list),
+    path('api/ingredients/<int:pk>/', async_views.ingredient_detail),
+    path('api/recipes/', async_views.recipe_list),
+    path('api/recipes/<int:pk>/', async_views.recipe_detail),
+    path('s/<str:code>/', aredirect_short_link),
+] + sync_urlpatterns
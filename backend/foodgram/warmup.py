@@ -0,0 +1,113 @@
+"""
+Прогрев процесса перед приёмом запросов.
+
+Многое в Django и DRF строится лениво при первом обращении: индексы
+URL-резолвера, кэши _meta моделей, поля сериализаторов, шаблоны,
+словари тегов. Без прогрева эту работу делает первый запрос каждого
+воркера. Gunicorn с preload_app выполняет прогрев один раз в мастере
+(см. gunicorn.conf.py), после чего воркеры наследуют готовые объекты
+через copy-on-write.
+"""
+import gc
+from time import perf_counter
+
+from django.apps import apps
+from django.conf import settings
+from django.db import connections
+from django.test import Client
+from django.urls import get_resolver
+
+# Запросы через весь стек: middleware, представления, рендерер
+WARM_UP_PATHS = (
+    '/api/tags/',
+    '/api/ingredients/?name=а',
+    '/api/recipes/',
+)
+
+
+def get_warm_up_host():
+    for host in settings.ALLOWED_HOSTS:
+        if host and host != '*' and not host.startswith('.'):
+            return host
+    return 'localhost'
+
+
+def warm_models():
+    for model in apps.get_models():
+        model._meta.get_fields()
+        model._meta.related_objects
+
+
+def warm_urls():
+    resolver = get_resolver()
+    resolver.reverse_dict
+    resolver.resolve('/api/recipes/')
+
+
+def warm_serializers():
+    from api import serializers
+
+    for serializer_class in (
+        serializers.UserSerializer,
+        serializers.TagSerializer,
+        serializers.IngredientSerializer,
+        serializers.RecipeSerializer,
+        serializers.RecipeShortSerializer,
+        serializers.SubscriptionSerializer,
+    ):
+        serializer_class().fields
+
+
+def warm_data():
+    from api.cache import get_tag_map
+    from api.pantry import pantry_updater
+    from recipes.utils.tags_mask import get_tag_masks
+
+    get_tag_map()
+    get_tag_masks()
+    pantry_updater.refresh()
+
+
+def warm_requests():
+    client = Client(
+        HTTP_HOST=get_warm_up_host(), raise_request_exception=False
+    )
+    return {path: client.get(path).status_code for path in WARM_UP_PATHS}
+
+
+def warm_up():
+    """
+    Выполняет шаги прогрева и возвращает {шаг: (время в мс, ошибка)}.
+    Ошибка шага (например, БД ещё не мигрирована) не мешает запуску.
+    """
+    report = {}
+    for step in (
+        warm_models, warm_urls, warm_serializers, warm_data, warm_requests
+    ):
+        started = perf_counter()
+        try:
+            result = step()
+        except Exception as error:
+            result = error
+        report[step.__name__] = (
+            (perf_counter() - started) * 1000, result
+        )
+    return report
+
+
+def prepare_fork():
+    """
+    Закрывает соединения с БД перед fork: сокет, унаследованный
+    несколькими воркерами, ломает протокол. Объекты, созданные к этому
+    моменту, переносятся в постоянное поколение сборщика мусора, чтобы
+    его проходы в воркерах не трогали их страницы и не копировали их.
+    """
+    connections.close_all()
+    if any(
+        connection.settings_dict['ENGINE'] == 'foodgram.db.postgresql_pool'
+        for connection in connections.all()
+    ):
+        from foodgram.db.postgresql_pool.base import close_pools
+        close_pools()
+    gc.collect()
+    gc.freeze()
@@ -0,0 +1,86 @@
+"""
+Настройки gunicorn. Значения по умолчанию можно переопределить
+переменными окружения GUNICORN_*.
+
+Приложение загружается и прогревается в мастере (preload_app,
+foodgram.warmup) до запуска воркеров. Воркеры получают его через fork
+и делят память с мастером по copy-on-write, а первый запрос воркера не
+платит за импорт Django, DRF, djoser и import_export. Воркеры
+перезапускаются после max_requests запросов со случайным разбросом,
+чтобы не перезапускаться одновременно.
+"""
+import os
+
+
+def env_bool(name, default):
+    return os.getenv(name, default).lower() in ('true', '1', 't')
+
+
+def cpu_count():
+    # Учитывает ограничение CPU контейнера через affinity
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def has_shared_cache():
+    # Как is_shared_cache в settings: сбросы версий, масок тегов и индексов
+    # идут через CACHES['default'], кэш в памяти процесса другим воркерам
+    # их не передаст
+    return os.getenv('CACHE_BACKEND', '') not in (
+        '',
+        'django.core.cache.backends.locmem.LocMemCache',
+        'django.core.cache.backends.dummy.DummyCache',
+    )
+
+
+wsgi_app = os.getenv('GUNICORN_APP', 'foodgram.wsgi:application')
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:8000')
+worker_class = os.getenv('GUNICORN_WORKER_CLASS', 'gthread')
+# Без общего кэша — один воркер (с потоками), иначе данные устаревали бы
+workers = int(
+    os.getenv('GUNICORN_WORKERS')
+    or (cpu_count() * 2 + 1 if has_shared_cache() else 1)
+)
+threads = int(os.getenv('GUNICORN_THREADS', 4))
+preload_app = env_bool('GUNICORN_PRELOAD', 'True')
+max_requests = int(os.getenv('GUNICORN_MAX_REQUESTS', 1000))
+max_requests_jitter = int(os.getenv('GUNICORN_MAX_REQUESTS_JITTER', 100))
+timeout = int(os.getenv('GUNICORN_TIMEOUT', 30))
+graceful_timeout = int(os.getenv('GUNICORN_GRACEFUL_TIMEOUT', 30))
+keepalive = int(os.getenv('GUNICORN_KEEPALIVE', 5))
+# Файлы heartbeat воркеров в памяти, а не на overlayfs контейнера
+worker_tmp_dir = os.getenv('GUNICORN_WORKER_TMP_DIR', '/dev/shm')
+accesslog = os.getenv('GUNICORN_ACCESS_LOG') or None
+warm_up_enabled = env_bool('GUNICORN_WARM_UP', 'True')
+
+
+def log_warm_up(log, report):
+    for step, (elapsed, result) in report.items():
+        if isinstance(result, Exception):
+            log.warning('Прогрев %s: ошибка %r', step, result)
+        elif result is None:
+            log.info('Прогрев %s: %.1f мс', step, elapsed)
+        else:
+            log.info('Прогрев %s: %.1f мс, %s', step, elapsed, result)
+
+
+def when_ready(server):
+    # Вызывается в мастере после загрузки приложения, до запуска воркеров
+    if not server.cfg.preload_app:
+        return
+    from foodgram.warmup import prepare_fork, warm_up
+
+    if warm_up_enabled:
+        log_warm_up(server.log, warm_up())
+    prepare_fork()
+
+
+def post_worker_init(worker):
+    # Без preload каждый воркер загружает и прогревает приложение сам
+    if worker.cfg.preload_app or not warm_up_enabled:
+        return
+    from foodgram.warmup import warm_up
+
+    log_warm_up(worker.log, warm_up())
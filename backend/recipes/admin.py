@@ -1,18 +1,32 @@
-from django.db.models import Count
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
 from django.contrib import admin
 from import_export import resources
 from import_export.admin import ImportExportModelAdmin
 
+from foodgram.admin_actions import fast_delete_selected
+from foodgram.db.estimates import EstimatedCountPaginator
+from .admin_filters import (
+    AuthorInputFilter, RecipeInputFilter, UserInputFilter
+)
 from .models import (
     Favorite, Ingredient, Recipe, RecipeIngredient, ShoppingList, Tag
 )
+from .signals import recipe_saved
 
 
 class BaseAdmin(admin.ModelAdmin):
+    # Оценка числа строк на больших таблицах и без второго COUNT(*)
+    # по всей таблице рядом с отфильтрованным
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
     list_display = ('id', 'user', 'recipe')  # Поля для отображения в списке
-    list_filter = ('user', 'recipe')  # Фильтры для навигации
-    # Поиск по связанным полям
-    search_fields = ('user__username', 'recipe__name')
+    list_select_related = ('user', 'recipe')
+    # Поля ввода вместо списка всех пользователей и рецептов
+    list_filter = (UserInputFilter, RecipeInputFilter)
+    # Поиск по началу строки использует индексы по UPPER(...)
+    search_fields = ('^user__username', '^recipe__name')
+    autocomplete_fields = ('user', 'recipe')
     ordering = ('id',)  # Сортировка по ID
 
 
@@ -32,26 +46,49 @@ class RecipeIngredientInline(admin.TabularInline):
     model = RecipeIngredient
     extra = 1
     min_num = 1
+    autocomplete_fields = ('ingredient',)
 
 
 @admin.register(Recipe)
 class RecipeAdmin(admin.ModelAdmin):
     list_display = ('id', 'name', 'author', 'get_favorites_count')
-    list_filter = ('tags', 'author')
-    search_fields = ('name', 'author__username', 'tags__name')
+    list_select_related = ('author',)
+    list_filter = ('tags', AuthorInputFilter)
+    search_fields = ('^name', '^author__username')
+    autocomplete_fields = ('author',)
     inlines = [RecipeIngredientInline]
     readonly_fields = ('get_favorites_count',)
+    actions = [fast_delete_selected]
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
 
     def get_queryset(self, request):
-        # Аннотация для подсчёта избранных
+        # Подзапрос считается только для строк страницы, а не GROUP BY
+        # по всей таблице рецептов
         queryset = super().get_queryset(request)
-        queryset = queryset.annotate(favorites_count=Count('favorite_set'))
-        return queryset
+        return queryset.annotate(favorites_count=Coalesce(
+            Subquery(
+                Favorite.objects.filter(recipe=OuterRef('pk'))
+                .order_by().values('recipe')
+                .annotate(count=Count('pk')).values('count'),
+                output_field=IntegerField(),
+            ),
+            0,
+        ))
 
     @admin.display(description='В избранном')
     def get_favorites_count(self, obj):
         return obj.favorites_count
 
+    def save_related(self, request, form, formsets, change):
+        super().save_related(request, form, formsets, change)
+        recipe_saved.send(
+            sender=Recipe, instance=form.instance,
+            ingredients_changed=not change or any(
+                formset.has_changed() for formset in formsets
+            ),
+        )
+
 
 @admin.register(Tag)
 class TagAdmin(admin.ModelAdmin):
@@ -0,0 +1,60 @@
+from django.contrib import admin
+
+
+class InputFilter(admin.SimpleListFilter):
+    """
+    Фильтр с полем ввода вместо списка значений: список всех
+    пользователей или рецептов на большой базе не построить.
+    """
+    template = 'admin/input_filter.html'
+    placeholder = ''
+
+    def lookups(self, request, model_admin):
+        # Без непустых lookups SimpleListFilter не отображается
+        return ((None, None),)
+
+    def choices(self, changelist):
+        all_choice = next(super().choices(changelist))
+        all_choice['query_parts'] = [
+            (name, value)
+            for name, value in changelist.get_filters_params().items()
+            if name != self.parameter_name
+        ]
+        yield all_choice
+
+
+class UserInputFilter(InputFilter):
+    """Точное совпадение никнейма или id: поиск по уникальному индексу."""
+    title = 'пользователю'
+    parameter_name = 'user'
+    placeholder = 'никнейм или id'
+    field_name = 'user'
+
+    def queryset(self, request, queryset):
+        value = (self.value() or '').strip()
+        if not value:
+            return queryset
+        if value.isdigit():
+            return queryset.filter(**{f'{self.field_name}_id': value})
+        return queryset.filter(**{f'{self.field_name}__username': value})
+
+
+class AuthorInputFilter(UserInputFilter):
+    title = 'автору'
+    parameter_name = 'author'
+    field_name = 'author'
+
+
+class RecipeInputFilter(InputFilter):
+    """id рецепта или начало названия (индекс по UPPER(name))."""
+    title = 'рецепту'
+    parameter_name = 'recipe'
+    placeholder = 'название или id'
+
+    def queryset(self, request, queryset):
+        value = (self.value() or '').strip()
+        if not value:
+            return queryset
+        if value.isdigit():
+            return queryset.filter(recipe_id=value)
+        return queryset.filter(recipe__name__istartswith=value)
@@ -6,3 +6,6 @@ class RecipesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'recipes'
     verbose_name = _("Рецепты")
+
+    def ready(self):
+        from recipes import signals  # noqa: F401
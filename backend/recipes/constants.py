@@ -4,3 +4,23 @@ MAX_LENGHT_TAG = 32
 MAX_LENGHT_INGREDIENT_NAME = 128
 MAX_LENGHT_MEASUREMENT = 64
 MIN_COOKING_TIME = 1
+# Теги с id от 1 до 63 кодируются битами в Recipe.tags_mask (BigInteger)
+MAX_TAG_MASK_BITS = 63
+# Если различных масок больше, фильтр по тегам проверяет биты напрямую
+MAX_KNOWN_TAG_MASKS = 1000
+# Сколько похожих рецептов хранится для каждого рецепта
+SIMILAR_RECIPES_COUNT = 10
+# Сколько ближайших рецептов проверяется при обновлении одного рецепта,
+# чтобы добавить его в их списки похожих
+SIMILAR_RECIPES_CANDIDATES = 200
+# Ингредиенты, которые есть больше чем в этой доле рецептов (и больше чем
+# в COMMON_MIN рецептах), не учитываются в близости: как соль, они почти
+# ничего не говорят о рецепте, а пересечения по ним — основная стоимость
+# расчёта
+SIMILAR_RECIPES_COMMON_SHARE = 0.05
+SIMILAR_RECIPES_COMMON_MIN = 1000
+# Подбор рецептов по продуктам (api.pantry): сколько продуктов можно
+# передать и сколько ингредиентов рецепту может не хватать
+PANTRY_MAX_INGREDIENTS = 100
+PANTRY_MAX_MISSING = 5
+PANTRY_DEFAULT_MISSING = 2
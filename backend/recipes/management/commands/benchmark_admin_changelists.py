@@ -0,0 +1,103 @@
+from time import perf_counter
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import Client
+
+from recipes.models import Favorite, Recipe, ShoppingList
+
+User = get_user_model()
+
+CHANGELISTS = (
+    '/admin/recipes/recipe/',
+    '/admin/recipes/recipe/?q=Рецепт 1',
+    '/admin/recipes/favorite/',
+    '/admin/recipes/favorite/?user=bench-admin-1',
+    '/admin/recipes/shoppinglist/',
+    '/admin/users/user/?q=bench',
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Во временной транзакции наполняет базу всё большим числом '
+        'пользователей, рецептов и избранного и после каждого шага меряет '
+        'время загрузки и число запросов списков в админке.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes', type=int, nargs='+', default=[1000, 10000, 50000],
+            help='Сколько рецептов должно быть в базе на каждом шаге.'
+        )
+        parser.add_argument('--iterations', type=int, default=5)
+
+    def seed(self, start, stop):
+        """Добавляет рецепты с номерами [start, stop) и связанные строки."""
+        users = User.objects.bulk_create(
+            User(
+                email=f'bench-admin-{index}@example.com',
+                username=f'bench-admin-{index}',
+                first_name='Имя', last_name='Фамилия',
+            )
+            for index in range(start // 10, stop // 10)
+        )
+        recipes = Recipe.objects.bulk_create(
+            Recipe(
+                author=users[index % len(users)],
+                name=f'Рецепт {start + index}',
+                text='Описание',
+                cooking_time=10,
+            )
+            for index in range(stop - start)
+        )
+        for model in (Favorite, ShoppingList):
+            model.objects.bulk_create(
+                model(user=user, recipe=recipe)
+                for user in users
+                for recipe in recipes[:20]
+            )
+
+    def measure(self, client, url, iterations):
+        # CaptureQueriesContext не подходит: список запросов
+        # сбрасывается в начале каждого запроса к серверу
+        queries = []
+
+        def count_query(execute, sql, params, many, context):
+            queries.append(sql)
+            return execute(sql, params, many, context)
+
+        with connection.execute_wrapper(count_query):
+            response = client.get(url)
+        if response.status_code != 200:
+            raise CommandError(f'{url}: код ответа {response.status_code}')
+        started = perf_counter()
+        for _ in range(iterations):
+            client.get(url)
+        return (perf_counter() - started) / iterations, len(queries)
+
+    def handle(self, *args, **options):
+        host = next(filter(None, settings.ALLOWED_HOSTS), 'localhost')
+        with transaction.atomic():
+            admin = User.objects.create_superuser(
+                email='bench-admin@example.com', username='bench-admin',
+                password='bench-admin', first_name='A', last_name='A',
+            )
+            client = Client(SERVER_NAME=host)
+            client.force_login(admin)
+            seeded = 0
+            for size in sorted(options['sizes']):
+                self.seed(seeded, size)
+                seeded = size
+                self.stdout.write(f'Рецептов: {size}')
+                for url in CHANGELISTS:
+                    elapsed, queries = self.measure(
+                        client, url, options['iterations']
+                    )
+                    self.stdout.write(
+                        f'  {url}: {elapsed * 1000:.1f} мс, '
+                        f'{queries} запросов'
+                    )
+            transaction.set_rollback(True)
@@ -0,0 +1,104 @@
+import tracemalloc
+from time import perf_counter
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from foodgram.db.deletion import fast_delete
+from recipes.models import (
+    Favorite, Ingredient, Recipe, RecipeIngredient, ShoppingList, Tag
+)
+from users.models import Subscription
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        'Во временной транзакции создаёт двух одинаковых авторов с N '
+        'рецептами и удаляет одного через QuerySet.delete(), другого через '
+        'fast_delete; сравнивает время и пик памяти Python.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--recipes', type=int, default=2000)
+
+    def create_author(self, name, count, ingredients, tags, readers):
+        author = User.objects.create(
+            email=f'{name}@example.com', username=name,
+            first_name='Имя', last_name='Фамилия',
+        )
+        recipes = Recipe.objects.bulk_create(
+            Recipe(author=author, name=f'{name} {index}', text='Описание',
+                   cooking_time=10)
+            for index in range(count)
+        )
+        RecipeIngredient.objects.bulk_create(
+            RecipeIngredient(recipe=recipe, ingredient=ingredient,
+                             quantity=1)
+            for recipe in recipes for ingredient in ingredients
+        )
+        Recipe.tags.through.objects.bulk_create(
+            Recipe.tags.through(recipe=recipe, tag=tag)
+            for recipe in recipes for tag in tags
+        )
+        for model in (Favorite, ShoppingList):
+            model.objects.bulk_create(
+                model(user=reader, recipe=recipe)
+                for reader in readers for recipe in recipes
+            )
+        Subscription.objects.bulk_create(
+            Subscription(user=reader, subscribed_to=author)
+            for reader in readers
+        )
+        return author
+
+    def measure(self, delete):
+        tracemalloc.start()
+        started = perf_counter()
+        delete()
+        elapsed = perf_counter() - started
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        return elapsed, peak
+
+    def handle(self, *args, **options):
+        count = options['recipes']
+        with transaction.atomic():
+            ingredients = Ingredient.objects.bulk_create(
+                Ingredient(name=f'bench-delete-{index}', measurement_unit='г')
+                for index in range(10)
+            )
+            tags = Tag.objects.bulk_create(
+                Tag(name=f'bench-delete-{index}', slug=f'bench-delete-{index}')
+                for index in range(3)
+            )
+            readers = User.objects.bulk_create(
+                User(email=f'bench-reader-{index}@example.com',
+                     username=f'bench-reader-{index}')
+                for index in range(5)
+            )
+            results = []
+            for name, delete in (
+                ('QuerySet.delete()', lambda author: User.objects.filter(
+                    pk=author.pk
+                ).delete()),
+                ('fast_delete', lambda author: fast_delete(
+                    User.objects.filter(pk=author.pk)
+                )),
+            ):
+                author = self.create_author(
+                    f'bench-delete-{len(results)}', count,
+                    ingredients, tags, readers,
+                )
+                results.append(
+                    (name, *self.measure(lambda: delete(author)))
+                )
+            transaction.set_rollback(True)
+        rows = count * (1 + len(ingredients) + len(tags) + 2 * len(readers))
+        self.stdout.write(f'Автор с {count} рецептами, ~{rows} строк')
+        for name, elapsed, peak in results:
+            self.stdout.write(
+                f'{name}: {elapsed:.2f} с, пик памяти {peak / 2 ** 20:.1f} МБ'
+            )
@@ -0,0 +1,58 @@
+import tracemalloc
+from time import perf_counter
+
+import numpy as np
+from django.core.management.base import BaseCommand
+
+from recipes.utils.similarity_matrix import build_matrix, iter_neighbors
+
+
+class Command(BaseCommand):
+    help = (
+        'Измеряет расчёт похожих рецептов (построение TF-IDF матрицы и '
+        'поиск соседей) на синтетических данных: популярность '
+        'ингредиентов распределена по закону Ципфа, как у соли и редких '
+        'специй. База данных не используется.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--recipes', type=int, default=100000)
+        parser.add_argument('--ingredients', type=int, default=2186)
+        parser.add_argument('--per-recipe', type=int, default=10)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def make_pairs(self, options):
+        generator = np.random.default_rng(options['seed'])
+        popularity = 1 / np.arange(1, options['ingredients'] + 1)
+        popularity /= popularity.sum()
+        sizes = generator.integers(
+            options['per_recipe'] // 2, options['per_recipe'] * 3 // 2 + 1,
+            size=options['recipes'],
+        )
+        recipes = np.repeat(np.arange(1, options['recipes'] + 1), sizes)
+        ingredients = generator.choice(
+            options['ingredients'], size=len(recipes), p=popularity
+        ) + 1
+        return np.column_stack((recipes, ingredients))
+
+    def handle(self, *args, **options):
+        pairs = self.make_pairs(options)
+        self.stdout.write(
+            f'Рецептов {options["recipes"]}, связей с ингредиентами '
+            f'{len(pairs)}'
+        )
+        tracemalloc.start()
+        started = perf_counter()
+        matrix, _, _ = build_matrix(pairs)
+        built = perf_counter()
+        neighbors = sum(
+            int((values > 0).sum()) for _, _, values in iter_neighbors(matrix)
+        )
+        finished = perf_counter()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        self.stdout.write(
+            f'Матрица {(built - started):.2f} с, соседи '
+            f'{(finished - built):.2f} с ({neighbors} пар), '
+            f'пик памяти {peak / 2 ** 20:.0f} МБ'
+        )
@@ -0,0 +1,49 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from foodgram.db.deletion import DELETE_BATCH_SIZE, fast_delete
+from recipes.models import Recipe
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        'Удаляет пользователей или рецепты со всеми зависимыми строками '
+        'и файлами набором DELETE ... WHERE без загрузки объектов в память.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('model', choices=['users', 'recipes'])
+        parser.add_argument('--ids', type=int, nargs='+', default=[])
+        parser.add_argument(
+            '--usernames', nargs='+', default=[],
+            help='Пользователи или авторы удаляемых рецептов.'
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=DELETE_BATCH_SIZE
+        )
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Только показать, сколько объектов будет удалено.'
+        )
+
+    def handle(self, *args, **options):
+        if not options['ids'] and not options['usernames']:
+            raise CommandError('Укажите --ids или --usernames.')
+        if options['model'] == 'users':
+            queryset = User.objects.filter(pk__in=options['ids']) | (
+                User.objects.filter(username__in=options['usernames'])
+            )
+        else:
+            queryset = Recipe.objects.filter(pk__in=options['ids']) | (
+                Recipe.objects.filter(
+                    author__username__in=options['usernames']
+                )
+            )
+        if options['dry_run']:
+            self.stdout.write(f'Будет удалено: {queryset.count()}')
+            return
+        deleted = fast_delete(queryset, options['batch_size'])
+        for label, count in sorted(deleted.items()):
+            self.stdout.write(f'{label}: {count}')
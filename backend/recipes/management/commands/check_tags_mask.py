@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand
+
+from recipes.models import Recipe
+from recipes.utils.tags_mask import compute_tags_masks, update_tags_masks
+
+
+class Command(BaseCommand):
+    help = (
+        'Сверяет Recipe.tags_mask с таблицей связей рецепт-тег; '
+        'с --fix пересчитывает расходящиеся маски.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--fix', action='store_true')
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        broken = []
+        last_id = 0
+        while True:
+            batch = dict(
+                Recipe.objects.filter(pk__gt=last_id).order_by('pk')
+                .values_list('pk', 'tags_mask')[:batch_size]
+            )
+            if not batch:
+                break
+            last_id = max(batch)
+            broken.extend(
+                recipe_id
+                for recipe_id, mask in compute_tags_masks(batch).items()
+                if batch[recipe_id] != mask
+            )
+        self.stdout.write(f'Рецептов с неверной маской: {len(broken)}')
+        if broken and options['fix']:
+            for start in range(0, len(broken), batch_size):
+                update_tags_masks(broken[start:start + batch_size])
+            self.stdout.write(self.style.SUCCESS('Маски пересчитаны.'))
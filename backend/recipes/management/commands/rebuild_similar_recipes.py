@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from recipes.utils.similarity_matrix import rebuild_similar_recipes
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает похожие рецепты всех рецептов по TF-IDF векторам '
+        'ингредиентов. Запускайте периодически: обновления после '
+        'изменения отдельных рецептов приблизительны.'
+    )
+
+    def handle(self, *args, **options):
+        timings, saved = rebuild_similar_recipes()
+        self.stdout.write(
+            f'Загрузка {timings["load"]:.2f} с, '
+            f'расчёт {timings["compute"]:.2f} с, '
+            f'запись {timings["write"]:.2f} с'
+        )
+        self.stdout.write(self.style.SUCCESS(f'Сохранено пар: {saved}'))
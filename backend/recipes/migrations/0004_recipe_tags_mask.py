@@ -0,0 +1,44 @@
+# Generated by Django 4.2.23 on 2026-10-19 08:34
+
+from collections import defaultdict
+
+from django.db import migrations, models
+
+# Копия recipes.utils.tags_mask.get_tag_bit на момент миграции
+MAX_TAG_MASK_BITS = 63
+
+
+def get_tag_bit(tag_id):
+    if 1 <= tag_id <= MAX_TAG_MASK_BITS:
+        return 1 << (tag_id - 1)
+    return 0
+
+
+def fill_tags_masks(apps, schema_editor):
+    Recipe = apps.get_model('recipes', 'Recipe')
+    masks = defaultdict(int)
+    for recipe_id, tag_id in Recipe.tags.through.objects.values_list(
+        'recipe_id', 'tag_id'
+    ):
+        masks[recipe_id] |= get_tag_bit(tag_id)
+    recipes_by_mask = defaultdict(list)
+    for recipe_id, mask in masks.items():
+        recipes_by_mask[mask].append(recipe_id)
+    for mask, ids in recipes_by_mask.items():
+        Recipe.objects.filter(pk__in=ids).update(tags_mask=mask)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0003_alter_favorite_options_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='tags_mask',
+            field=models.BigIntegerField(db_index=True, default=0, editable=False, verbose_name='Маска тегов'),
+        ),
+        migrations.RunPython(fill_tags_masks, migrations.RunPython.noop),
+    ]
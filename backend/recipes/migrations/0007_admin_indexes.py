@@ -0,0 +1,24 @@
+# Generated by Django 4.2.23 on 2026-10-19 08:46
+
+from django.db import migrations, models
+
+import foodgram.db.indexes
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0006_recipe_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(fields=['-created_at'], name='recipe_created_at_idx'),
+        ),
+        # Поиск админки по началу названия ('^name'), см. foodgram.db.indexes
+        migrations.AddIndex(
+            model_name='recipe',
+            index=foodgram.db.indexes.UpperPatternIndex('name', name='recipe_name_upper_idx'),
+        ),
+    ]
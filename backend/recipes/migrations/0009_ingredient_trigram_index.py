@@ -0,0 +1,41 @@
+from django.db import migrations
+
+# Поиск ингредиентов (api.ingredient_search): icontains (UPPER(name)
+# LIKE '%...%'), similarity (%) и word_similarity (%>) по триграммам.
+# На других базах поиск идёт по индексу в памяти
+INDEXES = {
+    'ingredient_name_trgm_idx': '"name"',
+    'ingredient_name_upper_trgm_idx': 'UPPER("name"::text)',
+}
+
+
+def create_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    # С PostgreSQL 13 pg_trgm доверенное: хватает прав владельца базы
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    for name, expression in INDEXES.items():
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS {schema_editor.quote_name(name)} '
+            f'ON "recipes_ingredient" USING gin ({expression} gin_trgm_ops)'
+        )
+
+
+def drop_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name in INDEXES:
+        schema_editor.execute(
+            f'DROP INDEX IF EXISTS {schema_editor.quote_name(name)}'
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0008_similar_recipes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_trigram_indexes, drop_trigram_indexes),
+    ]
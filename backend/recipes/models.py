@@ -2,6 +2,7 @@ from django.contrib.auth import get_user_model
 from django.core.validators import MinValueValidator
 from django.db import models
 
+from foodgram.db.indexes import UpperPatternIndex
 from .constants import (
     MAX_LENGHT_NAME, MAX_LENGHT_SLUG, MAX_LENGHT_TAG,
     MAX_LENGHT_INGREDIENT_NAME, MAX_LENGHT_MEASUREMENT,
@@ -35,35 +36,50 @@ class BaseUserRecipe(models.Model):
         ]
 
 
+USER_FLAGS = ('is_favorited', 'is_in_shopping_cart')
+
+
 class RecipeQuerySet(models.QuerySet):
-    def with_user_flags(self, user):
+    def with_user_flags(self, user, flags=USER_FLAGS):
         """
-        Добавляет аннотации:
+        Добавляет аннотации из `flags`:
         - is_favorited: True, если рецепт в избранном у пользователя.
         - is_in_shopping_cart: True, если рецепт добавлен в корзину.
         """
         if user.is_authenticated:
-            return self.annotate(
-                is_favorited=models.Exists(
+            annotations = {
+                'is_favorited': models.Exists(
                     Favorite.objects.filter(
                         user=user, recipe=models.OuterRef('pk')
                     )
                 ),
-                is_in_shopping_cart=models.Exists(
+                'is_in_shopping_cart': models.Exists(
                     ShoppingList.objects.filter(
                         user=user, recipe=models.OuterRef('pk')
                     )
-                )
-            )
-        # Для неавторизованных пользователей
-        return self.annotate(
-            is_favorited=models.Value(
-                False, output_field=models.BooleanField()
-            ),
-            is_in_shopping_cart=models.Value(
+                ),
+            }
+        else:
+            # Для неавторизованных пользователей
+            annotations = dict.fromkeys(USER_FLAGS, models.Value(
                 False, output_field=models.BooleanField()
-            )
+            ))
+        return self.annotate(**{
+            flag: annotation for flag, annotation in annotations.items()
+            if flag in flags
+        })
+
+    def for_fieldset(self, user, fieldset):
+        """
+        Рецепты для представления с полями `fieldset` (api.fieldsets):
+        без ненужных флагов пользователя и без текста, если он не нужен.
+        """
+        queryset = self.with_user_flags(
+            user, [flag for flag in USER_FLAGS if flag in fieldset]
         )
+        if 'text' not in fieldset:
+            queryset = queryset.defer('text')
+        return queryset
 
 
 class Tag(models.Model):
@@ -132,17 +148,87 @@ class Recipe(models.Model):
         verbose_name="Время приготовления"
     )
     created_at = models.DateTimeField(auto_now_add=True)
+    # Меняется и при пересборке документа рецепта (теги, ингредиенты,
+    # профиль автора), см. api.documents
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="Изменён")
+    # Биты тегов рецепта (см. recipes.utils.tags_mask), чтобы фильтровать
+    # по тегам без соединения с recipes_recipe_tags
+    tags_mask = models.BigIntegerField(
+        default=0, db_index=True, editable=False, verbose_name="Маска тегов"
+    )
+    # Длина TF-IDF вектора ингредиентов для косинусной близости при
+    # обновлении похожих рецептов (см. recipes.utils.similarity)
+    ingredients_norm = models.FloatField(
+        default=0, editable=False, verbose_name="Норма вектора ингредиентов"
+    )
     objects = RecipeQuerySet.as_manager()
 
     class Meta:
         verbose_name = "Рецепт"
         verbose_name_plural = "Рецепты"
         ordering = ['-created_at']
+        indexes = [
+            # Сортировка по умолчанию в API и админке
+            models.Index(fields=['-created_at'], name='recipe_created_at_idx'),
+            # Max('updated_at') для ETag анонимных ответов (api.mixins)
+            models.Index(fields=['updated_at'], name='recipe_updated_at_idx'),
+            # Поиск в админке по началу названия
+            UpperPatternIndex('name', name='recipe_name_upper_idx'),
+        ]
 
     def __str__(self):
         return self.name
 
 
+class RecipeDocument(models.Model):
+    """
+    Готовая к выдаче часть рецепта, не зависящая от пользователя:
+    автор, теги, ингредиенты с названиями и единицами измерения.
+    Пересобирается при изменении рецепта и связанных с ним объектов.
+    """
+    recipe = models.OneToOneField(
+        Recipe, on_delete=models.CASCADE, primary_key=True,
+        related_name='document', verbose_name="Рецепт"
+    )
+    data = models.JSONField(verbose_name="Документ")
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Документ рецепта"
+        verbose_name_plural = "Документы рецептов"
+
+    def __str__(self):
+        return f"Документ рецепта {self.recipe_id}"
+
+
+class SimilarRecipe(models.Model):
+    """
+    Рецепт из списка похожих: ближайшие соседи по косинусной близости
+    TF-IDF векторов ингредиентов, не больше SIMILAR_RECIPES_COUNT.
+    """
+    recipe = models.ForeignKey(
+        Recipe, on_delete=models.CASCADE, related_name='similar_recipes',
+        verbose_name="Рецепт"
+    )
+    similar = models.ForeignKey(
+        Recipe, on_delete=models.CASCADE, related_name='+',
+        verbose_name="Похожий рецепт"
+    )
+    score = models.FloatField(verbose_name="Близость")
+
+    class Meta:
+        verbose_name = "Похожий рецепт"
+        verbose_name_plural = "Похожие рецепты"
+        constraints = [
+            models.UniqueConstraint(
+                fields=['recipe', 'similar'], name='unique_similar_recipe'
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.recipe_id} ~ {self.similar_id}: {self.score:.3f}"
+
+
 class RecipeIngredient(models.Model):
     recipe = models.ForeignKey(Recipe, on_delete=models.CASCADE)
     ingredient = models.ForeignKey(
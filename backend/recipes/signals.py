@@ -0,0 +1,46 @@
+from django.db import transaction
+from django.db.models import F
+from django.db.models.signals import m2m_changed, post_delete
+from django.dispatch import Signal, receiver
+
+from recipes.models import Recipe, Tag
+from recipes.utils.tags_mask import (
+    get_tag_bit, invalidate_tag_masks, update_tags_masks
+)
+
+# Рецепт сохранён целиком, вместе с тегами и ингредиентами
+# (отправляют сериализатор API и админка), аргументы: instance,
+# ingredients_changed — изменился ли набор ингредиентов
+recipe_saved = Signal()
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def update_recipe_tags_mask(sender, instance, action, reverse, pk_set,
+                            **kwargs):
+    """Пересчитывает Recipe.tags_mask при любом изменении тегов рецепта."""
+    if action == 'pre_clear' and reverse:
+        # После очистки тег уже не знает своих рецептов
+        instance._cleared_recipe_ids = list(
+            instance.recipes.values_list('id', flat=True)
+        )
+        return
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        masks = update_tags_masks([instance.pk])
+        instance.tags_mask = next(iter(masks))
+    elif action == 'post_clear':
+        update_tags_masks(getattr(instance, '_cleared_recipe_ids', []))
+    else:
+        update_tags_masks(pk_set)
+
+
+@receiver(post_delete, sender=Tag)
+def remove_tag_bit(sender, instance, **kwargs):
+    """Связи с удалённым тегом удаляются каскадом, снимаем его бит."""
+    bit = get_tag_bit(instance.pk)
+    if bit:
+        Recipe.objects.alias(
+            tag_bit=F('tags_mask').bitand(bit)
+        ).exclude(tag_bit=0).update(tags_mask=F('tags_mask') - bit)
+        transaction.on_commit(invalidate_tag_masks)
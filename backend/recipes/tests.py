@@ -0,0 +1,67 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase
+
+from recipes.models import Recipe, Tag
+from recipes.utils.tags_mask import TAG_MASKS_KEY, get_tag_bit
+
+User = get_user_model()
+
+
+class CheckTagsMaskTests(TestCase):
+    """Команда check_tags_mask находит и исправляет неверные маски."""
+
+    @classmethod
+    def setUpTestData(cls):
+        author = User.objects.create_user(
+            email='author@example.com', username='author',
+            first_name='Автор', last_name='Авторов', password='pass12345x',
+        )
+        cls.tags = [
+            Tag.objects.create(name=slug, slug=slug)
+            for slug in ('breakfast', 'lunch')
+        ]
+        cls.recipes = []
+        for name, tags in (('Каша', cls.tags), ('Чай', [])):
+            recipe = Recipe.objects.create(
+                author=author, name=name, text=name,
+                image='recipes/images/recipe.png', cooking_time=5,
+            )
+            recipe.tags.set(tags)
+            cls.recipes.append(recipe)
+        cls.mask = get_tag_bit(cls.tags[0].pk) | get_tag_bit(cls.tags[1].pk)
+
+    def check(self, *args):
+        out = StringIO()
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('check_tags_mask', *args, stdout=out)
+        return out.getvalue()
+
+    def get_masks(self):
+        return dict(Recipe.objects.values_list('name', 'tags_mask'))
+
+    def test_valid(self):
+        self.assertEqual(self.get_masks(), {'Каша': self.mask, 'Чай': 0})
+        self.assertIn('Рецептов с неверной маской: 0', self.check())
+
+    def test_report_only(self):
+        Recipe.objects.filter(name='Каша').update(tags_mask=0)
+        Recipe.objects.filter(name='Чай').update(tags_mask=self.mask)
+
+        output = self.check('--batch-size', '1')
+
+        self.assertIn('Рецептов с неверной маской: 2', output)
+        self.assertEqual(self.get_masks(), {'Каша': 0, 'Чай': self.mask})
+
+    def test_fix(self):
+        Recipe.objects.filter(name='Каша').update(tags_mask=0)
+        cache.set(TAG_MASKS_KEY, [0])
+
+        output = self.check('--fix')
+
+        self.assertIn('Рецептов с неверной маской: 1', output)
+        self.assertEqual(self.get_masks(), {'Каша': self.mask, 'Чай': 0})
+        self.assertIsNone(cache.get(TAG_MASKS_KEY))
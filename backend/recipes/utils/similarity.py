@@ -0,0 +1,147 @@
+"""
+Похожие рецепты по ингредиентам.
+
+Рецепт — вектор над ингредиентами с весом ингредиента
+idf = ln((1 + N) / (1 + df)) + 1, где N — число рецептов, df — число
+рецептов с этим ингредиентом: соль и вода почти ничего не значат,
+редкие ингредиенты — много. Самые частые ингредиенты (см.
+SIMILAR_RECIPES_COMMON_SHARE) не учитываются вовсе. Близость рецептов —
+косинус векторов, то есть сумма idf² общих ингредиентов, делённая на
+произведение норм.
+
+Полную матрицу считает rebuild_similar_recipes (NumPy и SciPy, см.
+similarity_matrix). Здесь — обновление после изменения ингредиентов
+одного рецепта: его список пересчитывается одним запросом с суммой
+по общим ингредиентам, а сам рецепт добавляется в списки ближайших
+SIMILAR_RECIPES_CANDIDATES рецептов. Списки, из которых рецепт выпал,
+остаются короче до следующей полной пересборки; нормы других рецептов
+не пересчитываются при изменении df.
+"""
+import math
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import (
+    Case, Count, ExpressionWrapper, F, FloatField, Min, Q, Sum, Value, When
+)
+
+from foodgram.db.estimates import count_with_estimate
+from recipes.constants import (
+    SIMILAR_RECIPES_CANDIDATES, SIMILAR_RECIPES_COMMON_MIN,
+    SIMILAR_RECIPES_COMMON_SHARE, SIMILAR_RECIPES_COUNT
+)
+from recipes.models import Recipe, RecipeIngredient, SimilarRecipe
+
+
+def idf(total, df):
+    return math.log((1 + total) / (1 + df)) + 1
+
+
+def get_common_threshold(total):
+    """Ингредиенты, которые есть в большем числе рецептов, не учитываются."""
+    return max(
+        total * SIMILAR_RECIPES_COMMON_SHARE, SIMILAR_RECIPES_COMMON_MIN
+    )
+
+
+def get_weights(ingredient_ids):
+    """Квадраты idf ингредиентов по текущим данным, без частых."""
+    total = count_with_estimate(Recipe.objects.all())[0]
+    df = dict(
+        RecipeIngredient.objects.filter(ingredient_id__in=ingredient_ids)
+        .values_list('ingredient_id')
+        .annotate(df=Count('recipe_id', distinct=True))
+        .order_by()
+    )
+    threshold = get_common_threshold(total)
+    return {
+        ingredient_id: idf(total, df.get(ingredient_id, 0)) ** 2
+        for ingredient_id in ingredient_ids
+        if df.get(ingredient_id, 0) <= threshold
+    }
+
+
+def score_candidates(recipe_id, weights, norm, limit):
+    """Ближайшие рецепты [(id, близость)] по убыванию близости."""
+    shared = Sum(Case(
+        *[
+            When(ingredient_id=ingredient_id, then=Value(weight))
+            for ingredient_id, weight in weights.items()
+        ],
+        output_field=FloatField(),
+    ))
+    return list(
+        RecipeIngredient.objects
+        .filter(
+            ingredient_id__in=weights, recipe__ingredients_norm__gt=0
+        )
+        .exclude(recipe_id=recipe_id)
+        .values('recipe_id')
+        .annotate(score=ExpressionWrapper(
+            shared / (F('recipe__ingredients_norm') * norm),
+            output_field=FloatField(),
+        ))
+        .order_by('-score', 'recipe_id')
+        .values_list('recipe_id', 'score')[:limit]
+    )
+
+
+def add_to_neighbors(recipe_id, candidates):
+    """Добавляет рецепт в списки кандидатов, где он ближе последнего."""
+    stats = {
+        candidate_id: (count, lowest)
+        for candidate_id, count, lowest in SimilarRecipe.objects.filter(
+            recipe_id__in=[candidate_id for candidate_id, _ in candidates]
+        ).values_list('recipe_id').annotate(
+            count=Count('pk'), lowest=Min('score')
+        ).order_by()
+    }
+    added = []
+    full = []
+    for candidate_id, score in candidates:
+        count, lowest = stats.get(candidate_id, (0, 0))
+        if count >= SIMILAR_RECIPES_COUNT:
+            if score <= lowest:
+                continue
+            full.append(candidate_id)
+        added.append(SimilarRecipe(
+            recipe_id=candidate_id, similar_id=recipe_id, score=score
+        ))
+    SimilarRecipe.objects.bulk_create(added)
+    if not full:
+        return
+    # У заполненных списков убираем самых далёких соседей сверх лимита
+    rows = defaultdict(list)
+    for pk, candidate_id in SimilarRecipe.objects.filter(
+        recipe_id__in=full
+    ).order_by('recipe_id', '-score', 'similar_id').values_list(
+        'pk', 'recipe_id'
+    ):
+        rows[candidate_id].append(pk)
+    SimilarRecipe.objects.filter(pk__in=[
+        pk for pks in rows.values() for pk in pks[SIMILAR_RECIPES_COUNT:]
+    ]).delete()
+
+
+@transaction.atomic
+def update_similar_recipes(recipe_id):
+    """Пересчитывает похожие рецепты после изменения ингредиентов."""
+    weights = get_weights(list(
+        RecipeIngredient.objects.filter(recipe_id=recipe_id)
+        .values_list('ingredient_id', flat=True).distinct()
+    ))
+    norm = math.sqrt(sum(weights.values()))
+    Recipe.objects.filter(pk=recipe_id).update(ingredients_norm=norm)
+    SimilarRecipe.objects.filter(
+        Q(recipe_id=recipe_id) | Q(similar_id=recipe_id)
+    ).delete()
+    if not weights:
+        return
+    candidates = score_candidates(
+        recipe_id, weights, norm, SIMILAR_RECIPES_CANDIDATES
+    )
+    SimilarRecipe.objects.bulk_create([
+        SimilarRecipe(recipe_id=recipe_id, similar_id=similar_id, score=score)
+        for similar_id, score in candidates[:SIMILAR_RECIPES_COUNT]
+    ])
+    add_to_neighbors(recipe_id, candidates)
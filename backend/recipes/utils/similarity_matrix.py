@@ -0,0 +1,171 @@
+"""
+Полная пересборка похожих рецептов на NumPy и SciPy.
+
+Связи рецепт-ингредиент превращаются в разреженную матрицу
+рецепты × ингредиенты с весами idf (см. recipes.utils.similarity),
+строки нормируются, и косинусы считаются произведением матрицы на
+транспонированную блоками строк. Ненулевые близости каждой строки блока
+выкладываются в плотный массив шириной с самую длинную строку, и
+argpartition выбирает SIMILAR_RECIPES_COUNT ближайших: это линейно по
+числу пересечений, а не по числу рецептов.
+
+Модуль импортируется только командами: веб-воркерам NumPy не нужен,
+поэтому NumPy и SciPy вынесены в requirements-commands.txt.
+"""
+import itertools
+from time import perf_counter
+
+from django.db import transaction
+
+try:
+    import numpy as np
+    from scipy import sparse
+except ImportError as exc:
+    raise ImportError(
+        'Для пересчёта похожих рецептов нужны NumPy и SciPy: '
+        'pip install -r requirements-commands.txt'
+    ) from exc
+
+from recipes.constants import SIMILAR_RECIPES_COUNT
+from recipes.models import Recipe, RecipeIngredient, SimilarRecipe
+from recipes.utils.similarity import get_common_threshold
+
+BLOCK_SIZE = 256
+LOAD_CHUNK_SIZE = 20000
+WRITE_BATCH_SIZE = 5000
+
+
+def load_pairs():
+    """Массив пар (id рецепта, id ингредиента) без загрузки объектов."""
+    rows = RecipeIngredient.objects.order_by().values_list(
+        'recipe_id', 'ingredient_id'
+    ).iterator(chunk_size=LOAD_CHUNK_SIZE)
+    return np.fromiter(
+        itertools.chain.from_iterable(rows), dtype=np.int64
+    ).reshape(-1, 2)
+
+
+def build_matrix(pairs):
+    """
+    Нормированная TF-IDF матрица рецептов, id рецептов по строкам
+    и нормы строк до нормирования.
+    """
+    recipe_ids, rows = np.unique(pairs[:, 0], return_inverse=True)
+    ingredient_ids, columns = np.unique(pairs[:, 1], return_inverse=True)
+    matrix = sparse.csr_matrix(
+        (np.ones(len(pairs), dtype=np.float32), (rows, columns)),
+        shape=(len(recipe_ids), len(ingredient_ids)),
+    )
+    # Повторы ингредиента в рецепте считаются одним вхождением
+    matrix.sum_duplicates()
+    matrix.data[:] = 1
+    df = np.diff(matrix.tocsc().indptr)
+    idf = np.log((1 + len(recipe_ids)) / (1 + df)) + 1
+    idf[df > get_common_threshold(len(recipe_ids))] = 0
+    matrix = matrix.multiply(idf.astype(np.float32)).tocsr()
+    matrix.eliminate_zeros()
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1))).ravel()
+    # Рецепты только из частых ингредиентов остаются нулевыми строками
+    scale = np.divide(1, norms, out=np.zeros_like(norms), where=norms > 0)
+    matrix = sparse.diags(scale).dot(matrix).tocsr()
+    return matrix.astype(np.float32), recipe_ids, norms
+
+
+def top_per_row(block, count):
+    """
+    Номера столбцов и значения `count` наибольших элементов каждой строки
+    CSR-блока по убыванию. Недостающие до `count` значения — нули.
+    """
+    lengths = np.diff(block.indptr)
+    rows = np.repeat(np.arange(block.shape[0]), lengths)
+    positions = np.arange(block.nnz) - block.indptr[:-1][rows]
+    values = np.zeros(
+        (block.shape[0], max(int(lengths.max()), count)), dtype=np.float32
+    )
+    values[rows, positions] = block.data
+    top = np.argpartition(-values, count - 1, axis=1)[:, :count]
+    top_values = np.take_along_axis(values, top, axis=1)
+    order = np.argsort(-top_values, axis=1, kind='stable')
+    top = np.take_along_axis(top, order, axis=1)
+    # Позиция в строке -> индекс в data; пустые ячейки дают нулевые значения
+    columns = block.indices[
+        np.minimum(block.indptr[:-1, None] + top, block.nnz - 1)
+    ]
+    return columns, np.take_along_axis(top_values, order, axis=1)
+
+
+def iter_neighbors(matrix, count=SIMILAR_RECIPES_COUNT,
+                   block_size=BLOCK_SIZE):
+    """
+    Для каждого блока строк: (номера строк, номера соседей, близости),
+    соседи упорядочены по убыванию близости, нулевые близости — не соседи.
+    """
+    transposed = matrix.T.tocsr()
+    for start in range(0, matrix.shape[0], block_size):
+        stop = min(start + block_size, matrix.shape[0])
+        scores = matrix[start:stop].dot(transposed).tocsr()
+        if not scores.nnz:
+            continue
+        # Рецепт не похож сам на себя
+        rows = np.repeat(np.arange(start, stop), np.diff(scores.indptr))
+        scores.data[scores.indices == rows] = 0
+        columns, values = top_per_row(scores, count)
+        yield np.arange(start, stop), columns, values
+
+
+def iter_neighbor_rows(pairs, count=SIMILAR_RECIPES_COUNT):
+    """
+    Соседи рецептов пачками по блоку строк: [(id, id похожего, близость)].
+    Первым значением отдаются нормы векторов {id рецепта: норма}.
+    """
+    matrix, recipe_ids, norms = build_matrix(pairs)
+    yield dict(zip(recipe_ids.tolist(), norms.tolist()))
+    for rows, top, scores in iter_neighbors(matrix, count):
+        yield [
+            (int(recipe_ids[row]), int(recipe_ids[column]), float(score))
+            for row, columns, values in zip(rows, top, scores)
+            for column, score in zip(columns, values)
+            if score > 0
+        ]
+
+
+def rebuild_similar_recipes():
+    """
+    Пересчитывает похожие рецепты и нормы векторов всех рецептов.
+    Возвращает время этапов в секундах и число сохранённых пар.
+    """
+    timings = dict.fromkeys(('load', 'compute', 'write'), 0)
+    started = perf_counter()
+    pairs = load_pairs()
+    timings['load'] = perf_counter() - started
+    saved = 0
+    with transaction.atomic():
+        SimilarRecipe.objects.all().delete()
+        started = perf_counter()
+        batches = iter_neighbor_rows(pairs)
+        norms = next(batches)
+        for neighbors in batches:
+            timings['compute'] += perf_counter() - started
+            started = perf_counter()
+            SimilarRecipe.objects.bulk_create([
+                SimilarRecipe(
+                    recipe_id=recipe_id, similar_id=similar_id, score=score
+                )
+                for recipe_id, similar_id, score in neighbors
+            ], batch_size=WRITE_BATCH_SIZE)
+            saved += len(neighbors)
+            timings['write'] += perf_counter() - started
+            started = perf_counter()
+        timings['compute'] += perf_counter() - started
+        started = perf_counter()
+        Recipe.objects.update(ingredients_norm=0)
+        Recipe.objects.bulk_update(
+            [
+                Recipe(pk=recipe_id, ingredients_norm=norm)
+                for recipe_id, norm in norms.items()
+            ],
+            ['ingredients_norm'],
+            batch_size=WRITE_BATCH_SIZE,
+        )
+        timings['write'] += perf_counter() - started
+    return timings, saved
@@ -0,0 +1,78 @@
+from collections import defaultdict
+
+from django.core.cache import cache
+from django.db import transaction
+
+from recipes.constants import MAX_KNOWN_TAG_MASKS, MAX_TAG_MASK_BITS
+
+TAG_MASKS_KEY = 'recipe-tag-masks'
+# Страховка на случай кэша, не общего для воркеров (LocMemCache)
+TAG_MASKS_TIMEOUT = 60
+
+
+def get_tag_bit(tag_id):
+    """Бит тега в Recipe.tags_mask; 0, если тег в маску не помещается."""
+    if 1 <= tag_id <= MAX_TAG_MASK_BITS:
+        return 1 << (tag_id - 1)
+    return 0
+
+
+def tags_to_mask(tag_ids):
+    """Маска для набора тегов или None, если какой-то тег без бита."""
+    mask = 0
+    for tag_id in tag_ids:
+        bit = get_tag_bit(tag_id)
+        if not bit:
+            return None
+        mask |= bit
+    return mask
+
+
+def compute_tags_masks(recipe_ids):
+    """Маски рецептов по текущим связям рецепт-тег."""
+    from recipes.models import Recipe
+
+    masks = dict.fromkeys(recipe_ids, 0)
+    for recipe_id, tag_id in Recipe.tags.through.objects.filter(
+        recipe_id__in=recipe_ids
+    ).values_list('recipe_id', 'tag_id'):
+        masks[recipe_id] |= get_tag_bit(tag_id)
+    return masks
+
+
+def update_tags_masks(recipe_ids):
+    """Пересчитывает Recipe.tags_mask у рецептов, одним UPDATE на маску."""
+    from recipes.models import Recipe
+
+    recipes_by_mask = defaultdict(list)
+    for recipe_id, mask in compute_tags_masks(recipe_ids).items():
+        recipes_by_mask[mask].append(recipe_id)
+    for mask, ids in recipes_by_mask.items():
+        Recipe.objects.filter(pk__in=ids).update(tags_mask=mask)
+    # До коммита другой воркер положил бы в кэш старый набор масок
+    transaction.on_commit(invalidate_tag_masks)
+    return recipes_by_mask
+
+
+def get_tag_masks():
+    """
+    Все встречающиеся у рецептов маски. Их немного (это комбинации тегов),
+    и фильтр по тегам превращается в `tags_mask IN (...)` по индексу.
+    Возвращает None, если масок слишком много.
+    """
+    from recipes.models import Recipe
+
+    masks = cache.get(TAG_MASKS_KEY)
+    if masks is None:
+        masks = list(
+            Recipe.objects.order_by().values_list('tags_mask', flat=True)
+            .distinct()[:MAX_KNOWN_TAG_MASKS + 1]
+        )
+        if len(masks) > MAX_KNOWN_TAG_MASKS:
+            masks = False
+        cache.set(TAG_MASKS_KEY, masks, TAG_MASKS_TIMEOUT)
+    return masks or None
+
+
+def invalidate_tag_masks():
+    cache.delete(TAG_MASKS_KEY)
@@ -12,3 +12,11 @@ def redirect_short_link(request, code):
     except Recipe.DoesNotExist:
         return redirect('/404')
     return HttpResponseRedirect(f'/recipes/{recipe_id}')
+
+
+async def aredirect_short_link(request, code):
+    """Асинхронный вариант redirect_short_link для запуска под ASGI."""
+    recipe_id = decode_code(code)
+    if not await Recipe.objects.filter(id=recipe_id).aexists():
+        return redirect('/404')
+    return HttpResponseRedirect(f'/recipes/{recipe_id}')
@@ -2,10 +2,17 @@ from django.contrib import admin
 from django.contrib.auth import get_user_model
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
 
+from foodgram.admin_actions import fast_delete_selected
+from foodgram.db.estimates import EstimatedCountPaginator
+
 
 User = get_user_model()
 
 
 @admin.register(User)
 class UserAdmin(BaseUserAdmin):
-    pass
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    # Поиск по началу строки использует индексы по UPPER(...)
+    search_fields = ('^username', '^email', '^first_name', '^last_name')
+    actions = [fast_delete_selected]
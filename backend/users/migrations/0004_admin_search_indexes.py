@@ -0,0 +1,25 @@
+# Generated by Django 4.2.23 on 2026-10-19 08:46
+
+from django.db import migrations
+
+import foodgram.db.indexes
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0003_alter_user_username'),
+    ]
+
+    operations = [
+        # Поиск админки по началу ('^username', '^email'), см.
+        # foodgram.db.indexes
+        migrations.AddIndex(
+            model_name='user',
+            index=foodgram.db.indexes.UpperPatternIndex('username', name='user_username_upper_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='user',
+            index=foodgram.db.indexes.UpperPatternIndex('email', name='user_email_upper_idx'),
+        ),
+    ]
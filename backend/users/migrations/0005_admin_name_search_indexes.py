@@ -0,0 +1,25 @@
+# Generated by Django 4.2.23 on 2026-10-19 10:50
+
+from django.db import migrations
+
+import foodgram.db.indexes
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0004_admin_search_indexes'),
+    ]
+
+    operations = [
+        # Поиск админки по началу имени и фамилии ('^first_name',
+        # '^last_name'), см. foodgram.db.indexes
+        migrations.AddIndex(
+            model_name='user',
+            index=foodgram.db.indexes.UpperPatternIndex('first_name', name='user_first_name_upper_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='user',
+            index=foodgram.db.indexes.UpperPatternIndex('last_name', name='user_last_name_upper_idx'),
+        ),
+    ]
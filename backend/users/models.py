@@ -2,6 +2,8 @@ from django.db import models
 from django.db.models import Q, F
 from django.contrib.auth.models import AbstractUser
 
+from foodgram.db.indexes import UpperPatternIndex
+
 from users.constants import (EMAIL_LENGTH, NAME_LENGTH)
 from users.validators import username_validation
 
@@ -40,6 +42,15 @@ class User(AbstractUser):
         verbose_name = 'Пользователь'
         verbose_name_plural = 'Пользователи'
         ordering = ('username',)
+        indexes = [
+            # Поиск в админке по началу никнейма, почты, имени и фамилии
+            UpperPatternIndex('username', name='user_username_upper_idx'),
+            UpperPatternIndex('email', name='user_email_upper_idx'),
+            UpperPatternIndex(
+                'first_name', name='user_first_name_upper_idx'
+            ),
+            UpperPatternIndex('last_name', name='user_last_name_upper_idx'),
+        ]
 
     def __str__(self):
         return self.username